@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inverse-distance-weighted AQI raster over Delhi NCR, a per-cell Python loop
+versus the NumPy broadcast in utils/aqi_raster.py (idw_grid).
+
+Interpolates synthetic station readings onto the default 256 x 256 raster and a coarse
+64 x 64 one; the loop is timed on the coarse grid only and scaled up.
+
+    cd backend && python benchmarks/bench_aqi_raster.py [stations]
+"""
+
+import os
+import sys
+import math
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.aqi_raster import idw_grid, NCR_BOUNDS, KM_PER_DEG_LAT, KM_PER_DEG_LNG
+
+STATIONS = int(sys.argv[1]) if len(sys.argv) > 1 else 80
+REPEAT = 5
+
+
+def idw_loop(lats, lngs, values, bounds, rows, cols, power=2.0):
+    min_lng, min_lat, max_lng, max_lat = bounds
+    kx = KM_PER_DEG_LNG * math.cos(math.radians((min_lat + max_lat) / 2))
+    grid = np.empty((rows, cols), dtype=np.float32)
+    for i in range(rows):
+        lat = max_lat - (i + 0.5) * (max_lat - min_lat) / rows
+        for j in range(cols):
+            lng = min_lng + (j + 0.5) * (max_lng - min_lng) / cols
+            total = weight_sum = 0.0
+            for s_lat, s_lng, value in zip(lats, lngs, values):
+                d2 = ((lat - s_lat) * KM_PER_DEG_LAT) ** 2 + ((lng - s_lng) * kx) ** 2
+                weight = d2 ** (-power / 2) if d2 > 1e-12 else 1e12
+                total += weight * value
+                weight_sum += weight
+            grid[i, j] = total / weight_sum
+    return grid
+
+
+def timed(label, run, repeat=REPEAT):
+    best = float('inf')
+    for _ in range(repeat):
+        began = time.perf_counter()
+        result = run()
+        best = min(best, time.perf_counter() - began)
+    print(f"  {label:<36} {best * 1000:10.2f} ms")
+    return result, best
+
+
+def main():
+    rng = np.random.default_rng(0)
+    min_lng, min_lat, max_lng, max_lat = NCR_BOUNDS
+    lats = rng.uniform(min_lat, max_lat, STATIONS)
+    lngs = rng.uniform(min_lng, max_lng, STATIONS)
+    values = rng.uniform(60, 420, STATIONS)
+    station_lists = lats.tolist(), lngs.tolist(), values.tolist()
+
+    print(f"{STATIONS} stations")
+    print("64 x 64")
+    loop, loop_s = timed("python loop", lambda: idw_loop(*station_lists, NCR_BOUNDS, 64, 64), repeat=1)
+    vectorized, _ = timed("numpy broadcast", lambda: idw_grid(lats, lngs, values, NCR_BOUNDS, 64, 64))
+    assert np.allclose(loop, vectorized, rtol=1e-4)
+    print("256 x 256")
+    print(f"  {'python loop (scaled from 64 x 64)':<36} {loop_s * 16 * 1000:10.2f} ms")
+    timed("numpy broadcast", lambda: idw_grid(lats, lngs, values, NCR_BOUNDS, 256, 256))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: per-call feature assembly overhead, pandas (before) vs. precompiled NumPy layout (after).
+
+Runs without model files; the feature lists below mirror artifact_wrapper.pkl and the
+random-forest training columns.
+
+    cd backend && python benchmarks/bench_feature_assembly.py
+"""
+
+import os
+import sys
+import timeit
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models.aqi_forecaster import forecaster, ForecastEnsemble, FORECAST_FEATURES
+from ml_models.source_attribution import attribution_model, AttributionModel
+
+AQI_DATA = {
+    'aqi': 182,
+    'idx': 1,
+    'iaqi': {'pm25': {'v': 91}, 'pm10': {'v': 160}, 'no2': {'v': 38},
+             'so2': {'v': 6}, 'co': {'v': 12}, 'o3': {'v': 21}}
+}
+POLLUTANTS = {k: v['v'] for k, v in AQI_DATA['iaqi'].items()}
+
+
+def legacy_forecast_features(aqi_data, current_aqi, features, lat=28.6139, lon=77.2090):
+    """prepare_features as it was: dict -> DataFrame -> reindex"""
+    now = datetime.now()
+    iaqi = aqi_data.get('iaqi', {})
+
+    def get_val(key, default=0.0):
+        return iaqi.get(key, {}).get('v', default)
+
+    pm25, pm10, no2, co = get_val('pm25'), get_val('pm10'), get_val('no2'), get_val('co')
+    row = {
+        "pm2_5_ugm3": pm25, "pm10_ugm3": pm10, "no2_ugm3": no2,
+        "so2_ugm3": get_val('so2'), "co_ugm3": co, "o3_ugm3": get_val('o3'),
+        "hour": now.hour, "day": now.day, "month": now.month,
+        "day_of_week": now.weekday(), "is_weekend": 1 if now.weekday() >= 5 else 0,
+        "month_sin": np.sin(2 * np.pi * now.month / 12), "month_cos": np.cos(2 * np.pi * now.month / 12),
+        "hour_sin": np.sin(2 * np.pi * now.hour / 24), "hour_cos": np.cos(2 * np.pi * now.hour / 24),
+        "lat": lat, "lon": lon,
+        "AQI_t-1": current_aqi, "AQI_t-6": current_aqi, "AQI_t-12": current_aqi,
+        "AQI_t-24": current_aqi, "rolling_mean_24h": current_aqi, "rolling_mean_72h": current_aqi,
+        "pm_ratio": pm10 / (pm25 + 1), "traffic_ratio": no2 / (co + 1),
+    }
+    return pd.DataFrame([row])[features]
+
+
+def legacy_attribution_input(pollutants):
+    """prepare_input as it was: dict -> DataFrame"""
+    now = datetime.now()
+    pm25, pm10 = pollutants.get('pm25', 0), pollutants.get('pm10', 0)
+    no2, co = pollutants.get('no2', 0), pollutants.get('co', 0)
+    return pd.DataFrame([{
+        'PM2.5': pm25, 'PM10': pm10, 'NO2': no2, 'SO2': pollutants.get('so2', 0),
+        'CO': co, 'O3': pollutants.get('o3', 0), 'pm_ratio': pm10 / (pm25 + 1),
+        'no2_co_ratio': no2 / (co + 1), 'month': now.month, 'hour': now.hour
+    }])
+
+
+def report(label, func, number):
+    best = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"  {label:<44} {best * 1e6:10.1f} µs/call")
+    return best
+
+
+def main():
+    # Model-specific column order, shuffled to exercise the index mapping
+    features = list(FORECAST_FEATURES)
+    np.random.default_rng(0).shuffle(features)
+    forecaster.publish(ForecastEnsemble([], features, 'bench'))
+    attribution_model.publish(AttributionModel(None, 'bench'))
+
+    current = float(AQI_DATA['aqi'])
+    legacy = legacy_forecast_features(AQI_DATA, current, features).to_numpy(dtype=np.float32)
+    assert np.allclose(legacy, forecaster.prepare_features(AQI_DATA, current), rtol=1e-5)
+    legacy = legacy_attribution_input(POLLUTANTS).to_numpy(dtype=np.float32)
+    assert np.allclose(legacy, attribution_model.prepare_input(POLLUTANTS), rtol=1e-5)
+
+    print("AQI forecaster (1 row)")
+    before = report("pandas dict -> DataFrame -> reindex", lambda: legacy_forecast_features(AQI_DATA, current, features), 2000)
+    after = report("precompiled layout -> float32 array", lambda: forecaster.prepare_features(AQI_DATA, current), 20000)
+    print(f"  speedup: {before / after:.1f}x")
+
+    coords = np.random.default_rng(1).uniform([28.4, 76.8], [28.9, 77.4], size=(1000, 2))
+    print("AQI forecaster (1000 rows)")
+    before = report("pandas, one DataFrame per point + concat",
+                    lambda: pd.concat([legacy_forecast_features(AQI_DATA, current, features, lat, lon) for lat, lon in coords]), 3)
+    after = report("precompiled layout, prepare_batch", lambda: forecaster.prepare_batch(AQI_DATA, current, coords), 2000)
+    print(f"  speedup: {before / after:.1f}x")
+
+    print("Source attribution (1 row)")
+    before = report("pandas dict -> DataFrame", lambda: legacy_attribution_input(POLLUTANTS), 2000)
+    after = report("precompiled layout -> float32 array", lambda: attribution_model.prepare_input(POLLUTANTS), 20000)
+    print(f"  speedup: {before / after:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: forecast inference throughput with and without micro-batching.
+
+For 1, 10, 100 and 1000 concurrent callers, each submitting one feature row, compares
+one executor call per caller against MicroBatcher coalescing. Uses the boosters in
+ml_models/model1 when present, otherwise trains a small synthetic 5-booster ensemble
+with the same feature layout so the script runs anywhere.
+
+    cd backend && python benchmarks/bench_inference_batching.py
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+import numpy as np
+import xgboost as xgb
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models.aqi_forecaster import forecaster, run_ensemble, ForecastEnsemble, FORECAST_FEATURES
+from ml_models.inference_executor import inference_executor
+from ml_models.inference_scheduler import MicroBatcher
+
+CONCURRENCY = (1, 10, 100, 1000)
+ROUNDS = 3
+
+
+def synthetic_ensemble():
+    rng = np.random.default_rng(0)
+    features = list(FORECAST_FEATURES)
+    X = rng.uniform(0, 300, size=(5000, len(features))).astype(np.float32)
+    y = np.stack([X[:, 0] * 0.5 + X[:, 17], X[:, 21] + 10, X[:, 22] + 20], axis=1)
+    dtrain = xgb.DMatrix(X, label=y, feature_names=features)
+    boosters = [
+        xgb.train({'tree_method': 'hist', 'max_depth': 8, 'seed': seed, 'subsample': 0.8}, dtrain, num_boost_round=300)
+        for seed in (42, 53, 64, 75, 86)
+    ]
+    forecaster.publish(ForecastEnsemble(boosters, features, 'synthetic'))
+
+
+async def run_callers(n, rows, predict):
+    start = time.perf_counter()
+    await asyncio.gather(*[predict(rows[i:i + 1]) for i in range(n)])
+    return time.perf_counter() - start
+
+
+async def main():
+    forecaster.load_model()
+    if not forecaster.model_loaded:
+        print("Model files not found; using a synthetic 5-booster ensemble (300 rounds, depth 8)")
+        synthetic_ensemble()
+
+    inference_executor.max_queue = max(CONCURRENCY) * 2
+    await inference_executor.start()
+    batcher = MicroBatcher('bench', run_ensemble, window_ms=2, max_rows=256)
+
+    rng = np.random.default_rng(1)
+    coords = rng.uniform([28.4, 76.8], [28.9, 77.4], size=(max(CONCURRENCY), 2))
+    aqi_data = {'aqi': 182, 'iaqi': {'pm25': {'v': 91}, 'pm10': {'v': 160}, 'no2': {'v': 38}}}
+    rows = forecaster.prepare_batch(aqi_data, 182.0, coords)
+
+    async def unbatched(X):
+        return await inference_executor.run(run_ensemble, X)
+
+    print(f"executor: {inference_executor.mode}, {inference_executor.workers} workers")
+    print(f"{'callers':>8} {'unbatched req/s':>16} {'batched req/s':>14} {'speedup':>8} {'batches':>8}")
+    for n in CONCURRENCY:
+        await run_callers(n, rows, unbatched)  # warm-up
+        plain = min([await run_callers(n, rows, unbatched) for _ in range(ROUNDS)])
+        batches_before = batcher.batches
+        batched = min([await run_callers(n, rows, batcher.submit) for _ in range(ROUNDS)])
+        batches = (batcher.batches - batches_before) // ROUNDS
+        print(f"{n:>8} {n / plain:>16.0f} {n / batched:>14.0f} {plain / batched:>7.1f}x {batches:>8}")
+
+    inference_executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory of N forked workers when every worker loads the models itself versus
+when the parent preloads them before forking (gunicorn.conf.py's preload mode).
+
+Each worker runs predictions for a while, then reports its RSS/USS/PSS. Uses the files in
+ML_MODEL1_DIR/ML_MODEL2_DIR (default ml_models/model1, model2) when present, otherwise
+writes a synthetic 5-booster ensemble and random forest to a temp directory first.
+Linux only (reads /proc/<pid>/smaps_rollup).
+
+    cd backend && python benchmarks/bench_preload_memory.py [workers]
+"""
+
+import gc
+import os
+import sys
+import json
+import tempfile
+
+import numpy as np
+import xgboost as xgb
+import joblib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ml_models.aqi_forecaster import forecaster, FORECAST_FEATURES
+from ml_models.source_attribution import attribution_model, ATTRIBUTION_FEATURES
+from ml_models.model_registry import model_registry
+from utils.memory_report import process_memory
+
+WORKERS = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+PREDICTIONS = 100
+
+
+def synthetic_models(root):
+    from sklearn.ensemble import RandomForestRegressor
+
+    rng = np.random.default_rng(0)
+    model1 = os.path.join(root, 'model1')
+    model2 = os.path.join(root, 'model2')
+    os.makedirs(model1)
+    os.makedirs(model2)
+
+    features = list(FORECAST_FEATURES)
+    X = rng.uniform(0, 300, size=(20000, len(features))).astype(np.float32)
+    y = np.stack([X[:, 0] * 0.5 + X[:, 17], X[:, 21] + 10, X[:, 22] + 20], axis=1)
+    dtrain = xgb.DMatrix(X, label=y, feature_names=features)
+    paths = []
+    for seed in (42, 53, 64, 75, 86):
+        path = os.path.join(model1, f'booster_seed{seed}.json')
+        xgb.train({'tree_method': 'hist', 'max_depth': 10, 'seed': seed, 'subsample': 0.8}, dtrain,
+                  num_boost_round=200).save_model(path)
+        paths.append(path)
+    joblib.dump({'features': features, 'model_paths': paths}, os.path.join(model1, 'artifact_wrapper.pkl'))
+
+    X2 = rng.uniform(0, 200, size=(20000, len(ATTRIBUTION_FEATURES)))
+    forest = RandomForestRegressor(n_estimators=50, max_depth=14, random_state=0).fit(X2, rng.uniform(0, 1, (20000, 5)))
+    joblib.dump(forest, os.path.join(model2, 'pollution_source_regression_model.pkl'))
+    return model1, model2
+
+
+def use_models(preload_in_worker):
+    if preload_in_worker:
+        model_registry.preload()
+    rows = forecaster.active.layout.allocate(8)
+    pollutants = attribution_model.active.layout.allocate(8)
+    for _ in range(PREDICTIONS):
+        forecaster.active.predict(rows)
+        attribution_model.active.predict(pollutants)
+    gc.collect()
+
+
+def run_workers(preload_in_worker):
+    children = []
+    for _ in range(WORKERS):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            use_models(preload_in_worker)
+            with os.fdopen(write_fd, 'w') as out:
+                out.write(json.dumps(process_memory()))
+            os._exit(0)
+        os.close(write_fd)
+        children.append((pid, read_fd))
+
+    reports = []
+    for pid, read_fd in children:
+        with os.fdopen(read_fd) as result:
+            reports.append(json.loads(result.read()))
+        os.waitpid(pid, 0)
+    return reports
+
+
+def summarize(label, reports):
+    uss = sum(r['uss_mb'] for r in reports)
+    pss = sum(r['pss_mb'] for r in reports)
+    rss = sum(r['rss_mb'] for r in reports)
+    print(f"  {label:<28} USS {uss:8.1f} MB   PSS {pss:8.1f} MB   RSS {rss:8.1f} MB   "
+          f"(per worker USS {uss / len(reports):.1f} MB)")
+    return uss
+
+
+def main():
+    tmp = None
+    if not os.path.exists(forecaster.artifact_path) or not os.path.exists(attribution_model.model_path):
+        tmp = tempfile.TemporaryDirectory()
+        print("Model files not found; writing a synthetic ensemble (5 x 200 rounds, depth 10) and random forest")
+        forecaster.model_dir, attribution_model.model_dir = synthetic_models(tmp.name)
+        forecaster.artifact_path = os.path.join(forecaster.model_dir, 'artifact_wrapper.pkl')
+        attribution_model.model_path = os.path.join(attribution_model.model_dir, 'pollution_source_regression_model.pkl')
+
+    print(f"{WORKERS} forked workers, {PREDICTIONS} predictions each")
+    per_worker = summarize("load in every worker", run_workers(preload_in_worker=True))
+
+    model_registry.preload()
+    gc.collect()
+    gc.freeze()
+    print(f"  master after preload: RSS {process_memory()['rss_mb']:.1f} MB")
+    shared = summarize("preload in master, fork", run_workers(preload_in_worker=False))
+    print(f"  private memory saved: {per_worker - shared:.1f} MB ({per_worker / max(shared, 0.1):.1f}x less)")
+
+    if tmp is not None:
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
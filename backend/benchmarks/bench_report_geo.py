@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Benchmark: map viewport and radius queries over the SQLite pollution_reports table, full
+scan versus the (latitude, longitude) index versus the R-tree from utils/report_geo.py,
+or, for viewports dense with reports (report_geo.dense_cap), a walk of the created_at
+index. The report endpoints read Mongo and make the same choice between its 2dsphere
+and created_at indexes; this shows the crossover on the SQLite table.
+
+Fills a temporary SQLite database with synthetic reports spread over Delhi NCR (1M by
+default; rows go through the R-tree triggers just as inserts would), then times one page
+of each query shape.
+
+    cd backend && python benchmarks/bench_report_geo.py [reports]
+"""
+
+import os
+import sys
+import math
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+REPORTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+PAGE = 100
+REPEAT = 5
+# Delhi NCR
+MIN_LAT, MAX_LAT, MIN_LNG, MAX_LNG = 28.2, 28.9, 76.8, 77.6
+
+tmp = tempfile.TemporaryDirectory()
+os.environ['SQLITE_DB_URL'] = f"sqlite:///{tmp.name}/bench_geo.db"
+
+from database import engine, init_db, SessionLocal
+from utils.report_geo import RTREE_TABLE, EARTH_RADIUS_M, dense_cap
+
+RTREE_MATCH = ("r.min_lat <= :max_lat AND r.max_lat >= :min_lat "
+               "AND r.min_lng <= :max_lng AND r.max_lng >= :min_lng")
+
+
+def fill():
+    rng = random.Random(0)
+    start = datetime(2024, 1, 1)
+    began = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        cursor = raw.cursor()
+        batch = []
+        for i in range(REPORTS):
+            batch.append((f"report-{i:08d}", 'Bench Reporter', '9876543210', 'reporter@example.com', 'Delhi',
+                          rng.uniform(MIN_LAT, MAX_LAT), rng.uniform(MIN_LNG, MAX_LNG), rng.randint(1, 5),
+                          rng.choice(['pending', 'viewed', 'processing', 'completed']),
+                          start + timedelta(seconds=rng.randrange(2 * 365 * 86400))))
+            if len(batch) == 50_000:
+                cursor.executemany(
+                    "INSERT INTO pollution_reports (report_id, name, mobile, email, location, latitude, longitude, "
+                    "severity, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+                batch = []
+        if batch:
+            cursor.executemany(
+                "INSERT INTO pollution_reports (report_id, name, mobile, email, location, latitude, longitude, "
+                "severity, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", batch)
+        raw.commit()
+        cursor.execute("ANALYZE")
+    finally:
+        raw.close()
+    print(f"Inserted {REPORTS:,} reports in {time.perf_counter() - began:.1f}s")
+
+
+def full_scan(session, bbox):
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return session.execute(text(
+        "SELECT * FROM pollution_reports NOT INDEXED WHERE latitude BETWEEN :a AND :b AND longitude BETWEEN :c AND :d "
+        "ORDER BY created_at DESC, report_id DESC LIMIT :limit"),
+        {"a": min_lat, "b": max_lat, "c": min_lng, "d": max_lng, "limit": PAGE}).fetchall()
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def radius_bbox(latitude, longitude, radius_m):
+    dlat = math.degrees(radius_m / EARTH_RADIUS_M)
+    dlng = dlat / max(math.cos(math.radians(latitude)), 1e-6)
+    return longitude - dlng, latitude - dlat, longitude + dlng, latitude + dlat
+
+
+def dense(session, params):
+    """Whether the box holds more reports than dense_cap; the R-tree count stops there"""
+    total = session.execute(text("SELECT MAX(id) FROM pollution_reports")).scalar() or 0
+    cap = dense_cap(PAGE, total)
+    candidates = session.execute(text(
+        f"SELECT COUNT(*) FROM (SELECT 1 FROM {RTREE_TABLE} r WHERE {RTREE_MATCH} LIMIT :cap)"),
+        {**params, "cap": cap}).scalar()
+    return candidates >= cap
+
+
+def reports_within(session, bbox, after=None, rtree=True):
+    """One page of reports inside `bbox`, newest first, after the (created_at, report_id) key"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    params = {"min_lat": min_lat, "max_lat": max_lat, "min_lng": min_lng, "max_lng": max_lng, "limit": PAGE}
+    if not rtree:
+        sql = "SELECT p.* FROM pollution_reports p WHERE 1 = 1 "
+    elif dense(session, params):
+        sql = "SELECT p.* FROM pollution_reports p INDEXED BY ix_pollution_reports_created WHERE 1 = 1 "
+    else:
+        sql = f"SELECT p.* FROM {RTREE_TABLE} r JOIN pollution_reports p ON p.id = r.id WHERE {RTREE_MATCH} "
+    # Exact bounds on the stored floats: R-tree boxes are rounded outward to 32 bits
+    sql += ("AND p.latitude BETWEEN :min_lat AND :max_lat "
+            "AND p.longitude BETWEEN :min_lng AND :max_lng ")
+    if after is not None:
+        sql += ("AND (p.created_at < :after_created "
+                "OR (p.created_at = :after_created AND p.report_id < :after_id)) ")
+        params["after_created"], params["after_id"] = after
+    sql += "ORDER BY p.created_at DESC, p.report_id DESC LIMIT :limit"
+    return [dict(row) for row in session.execute(text(sql), params).mappings()]
+
+
+def reports_near(session, latitude, longitude, radius_m, rtree=True):
+    """One page of reports within `radius_m`: box pages filtered by exact distance"""
+    bbox = radius_bbox(latitude, longitude, radius_m)
+    rows, after = [], None
+    while len(rows) < PAGE:
+        page = reports_within(session, bbox, after, rtree)
+        rows.extend(row for row in page
+                    if haversine_m(latitude, longitude, row['latitude'], row['longitude']) <= radius_m)
+        if len(page) < PAGE:
+            break
+        after = (page[-1]['created_at'], page[-1]['report_id'])
+    return rows[:PAGE]
+
+
+def timed(label, run):
+    best = float('inf')
+    for _ in range(REPEAT):
+        began = time.perf_counter()
+        rows = run()
+        best = min(best, time.perf_counter() - began)
+    print(f"  {label:<40} {best * 1000:9.2f} ms   {len(rows):4d} rows")
+
+
+def main():
+    init_db()
+    fill()
+    session = SessionLocal()
+    street = (77.20, 28.61, 77.22, 28.63)       # ~2 km viewport around Connaught Place
+    district = (77.10, 28.55, 77.30, 28.70)     # ~20 km viewport
+    try:
+        for name, bbox in (("street viewport", street), ("district viewport", district)):
+            print(name)
+            timed("full scan", lambda: full_scan(session, bbox))
+            timed("(latitude, longitude) index", lambda: reports_within(session, bbox, rtree=False))
+            timed("R-tree, or created_at walk when dense", lambda: reports_within(session, bbox))
+        print("1 km radius")
+        timed("full scan (bounding box)", lambda: full_scan(session, radius_bbox(28.62, 77.21, 1000)))
+        timed("(latitude, longitude) index", lambda: reports_near(session, 28.62, 77.21, 1000, rtree=False))
+        timed("R-tree, or created_at walk when dense", lambda: reports_near(session, 28.62, 77.21, 1000))
+    finally:
+        session.close()
+        engine.dispose()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Benchmark: listing pollution reports from a large collection, before and after the
+REPORT_INDEXES and keyset pagination used by GET /api/reports.
+
+Fills a scratch database on a local mongod with synthetic reports (1M by default), then
+times the old unindexed `sort("created_at", -1)` listing, offset paging, a last-24h range,
+map viewport and radius queries and the id lookup of update_report_status, followed by
+the same reads with the indexes in place and keyset cursors. Docs examined per query come
+from explain().
+
+    cd backend && python benchmarks/bench_report_pagination.py [reports]
+
+MONGO_URL (default mongodb://localhost:27017) and BENCH_DB (default bench_reports) pick
+the server and database; the database is dropped when the run finishes.
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+from datetime import datetime, timedelta, timezone
+
+from pymongo import MongoClient
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+os.environ.setdefault('DB_NAME', 'bench_reports')
+os.environ.setdefault('AQI_INGEST_ENABLED', '0')
+
+from server import (REPORT_INDEXES, REPORT_SORT, REPORT_LIST_PROJECTION,
+                    encode_report_cursor, report_cursor_filter)
+from utils.report_geo import geo_point, within_filter, bbox_polygon, near_filter
+
+REPORTS = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+BATCH = 10_000
+PAGE = 100
+REPEAT = 5
+STATUSES = ['pending'] * 5 + ['viewed'] * 2 + ['processing'] * 2 + ['completed'] * 11
+
+
+def synthetic_reports(count, start):
+    rng = random.Random(0)
+    span = 2 * 365 * 24 * 3600
+    for _ in range(count):
+        created = start + timedelta(seconds=rng.randrange(span))
+        latitude, longitude = 28.4 + rng.random() * 0.5, 76.8 + rng.random() * 0.6
+        yield {
+            'id': str(uuid.UUID(int=rng.getrandbits(128))),
+            'name': 'Bench Reporter',
+            'mobile': '9876543210',
+            'email': 'reporter@example.com',
+            'location': f'Ward {rng.randrange(272)}',
+            'latitude': latitude,
+            'longitude': longitude,
+            'geo': geo_point(latitude, longitude),
+            'severity': rng.randint(1, 5),
+            'description': 'Open burning of garbage near the main road',
+            'image_url': 'data:image/jpeg;base64,' + 'A' * 2048,
+            'status': rng.choice(STATUSES),
+            'created_at': created
+        }
+
+
+def fill(collection):
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    batch = []
+    began = time.perf_counter()
+    for doc in synthetic_reports(REPORTS, start):
+        batch.append(doc)
+        if len(batch) == BATCH:
+            collection.insert_many(batch, ordered=False)
+            batch = []
+    if batch:
+        collection.insert_many(batch, ordered=False)
+    print(f"Inserted {REPORTS:,} reports in {time.perf_counter() - began:.1f}s")
+
+
+def timed(label, run, explain=None):
+    """Best of REPEAT runs, plus docs examined from explain() when given"""
+    best = float('inf')
+    for _ in range(REPEAT):
+        began = time.perf_counter()
+        try:
+            run()
+        except Exception as e:
+            print(f"  {label:<44} failed: {str(e).splitlines()[0][:80]}")
+            return
+        best = min(best, time.perf_counter() - began)
+    examined = ''
+    if explain is not None:
+        stats = explain()['executionStats']
+        examined = f"docs examined {stats['totalDocsExamined']:>9,}"
+    print(f"  {label:<44} {best * 1000:9.2f} ms   {examined}")
+
+
+def main():
+    client = MongoClient(os.environ['MONGO_URL'], tz_aware=True)
+    db = client[os.environ.get('BENCH_DB', 'bench_reports')]
+    db.pollution_reports.drop()
+    reports = db.pollution_reports
+
+    try:
+        fill(reports)
+        # A cursor into the middle of the listing, as a client paging through would hold
+        middle = encode_report_cursor(next(reports.find({}, {'created_at': 1, 'id': 1}).sort(REPORT_SORT).skip(REPORTS // 2).limit(1)))
+        some_id = next(reports.find({}, {'id': 1}).skip(REPORTS // 3).limit(1))['id']
+        newest = next(reports.find({}, {'created_at': 1}).sort(REPORT_SORT).limit(1))['created_at']
+        last_day = {'created_at': {'$gte': newest - timedelta(hours=24)}}
+        viewport = within_filter(bbox_polygon((77.20, 28.61, 77.22, 28.63)))
+        district = within_filter(bbox_polygon((77.10, 28.55, 77.30, 28.70)))
+        nearby = near_filter(28.62, 77.21, 1000)
+
+        def legacy():
+            return list(reports.find({}, {'_id': 0}).sort('created_at', -1).limit(1000))
+
+        def legacy_status():
+            return list(reports.find({'status': 'pending'}, {'_id': 0}).sort('created_at', -1).limit(1000))
+
+        def offset_page():
+            return list(reports.find({}, REPORT_LIST_PROJECTION).sort(REPORT_SORT).skip(REPORTS // 2).limit(PAGE))
+
+        def keyset_first():
+            return list(reports.find({}, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1))
+
+        def keyset_middle():
+            return list(reports.find(report_cursor_filter(middle), REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1))
+
+        def keyset_status():
+            query = {'status': 'pending', **report_cursor_filter(middle)}
+            return list(reports.find(query, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1))
+
+        def range_page():
+            return list(reports.find(last_day, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1))
+
+        def viewport_page():
+            return list(reports.find(viewport, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1))
+
+        def district_page():
+            return list(reports.find(district, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1))
+
+        def district_walk():
+            # What find_reports_in_area does once the area passes dense_cap
+            return list(reports.find(district, REPORT_LIST_PROJECTION).sort(REPORT_SORT).hint('created_at_id').limit(PAGE + 1))
+
+        def nearby_page():
+            return list(reports.find(nearby, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1))
+
+        def by_id():
+            return reports.find_one({'id': some_id}, {'_id': 0})
+
+        def run_all(title):
+            print(title)
+            timed("old listing, 1000 newest", legacy,
+                  lambda: reports.find({}, {'_id': 0}).sort('created_at', -1).limit(1000).explain())
+            timed("old listing, 1000 newest pending", legacy_status,
+                  lambda: reports.find({'status': 'pending'}, {'_id': 0}).sort('created_at', -1).limit(1000).explain())
+            timed(f"offset page at {REPORTS // 2:,}", offset_page,
+                  lambda: reports.find({}, REPORT_LIST_PROJECTION).sort(REPORT_SORT).skip(REPORTS // 2).limit(PAGE).explain())
+            timed(f"keyset page, first ({PAGE})", keyset_first,
+                  lambda: reports.find({}, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1).explain())
+            timed(f"keyset page at {REPORTS // 2:,}", keyset_middle,
+                  lambda: reports.find(report_cursor_filter(middle), REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1).explain())
+            timed(f"keyset page at {REPORTS // 2:,}, pending", keyset_status,
+                  lambda: reports.find({'status': 'pending', **report_cursor_filter(middle)}, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1).explain())
+            timed("keyset page, last 24h", range_page,
+                  lambda: reports.find(last_day, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1).explain())
+            timed("~2 km viewport (/reports/within)", viewport_page,
+                  lambda: reports.find(viewport, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1).explain())
+            timed("~20 km viewport, 2dsphere + in-memory sort", district_page,
+                  lambda: reports.find(district, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1).explain())
+            timed("~20 km viewport, created_at_id walk", district_walk,
+                  lambda: reports.find(district, REPORT_LIST_PROJECTION).sort(REPORT_SORT).hint('created_at_id').limit(PAGE + 1).explain())
+            timed("1 km radius (/reports/near)", nearby_page,
+                  lambda: reports.find(nearby, REPORT_LIST_PROJECTION).sort(REPORT_SORT).limit(PAGE + 1).explain())
+            timed("find_one by id (status update)", by_id,
+                  lambda: reports.find({'id': some_id}).limit(1).explain())
+
+        run_all("Without indexes")
+
+        began = time.perf_counter()
+        for keys, options in REPORT_INDEXES:
+            reports.create_index(keys, **options)
+        print(f"Built {len(REPORT_INDEXES)} indexes in {time.perf_counter() - began:.1f}s")
+
+        run_all("With REPORT_INDEXES")
+    finally:
+        client.drop_database(db.name)
+        client.close()
+
+
+if __name__ == "__main__":
+    main()
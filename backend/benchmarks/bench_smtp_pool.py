@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark: email throughput, one connection per message (aiosmtplib.send, the old
+send_email) versus the pooled sessions of email_service.smtp_pool, one by one and via
+send_many.
+
+Runs against the in-process local SMTP stand-in (utils/smtp_stub.py). CONNECT_DELAY_MS
+stands in for the TCP + STARTTLS + AUTH setup a real server costs per connection, and
+MESSAGE_DELAY_MS for its per-message processing time.
+
+    cd backend && python benchmarks/bench_smtp_pool.py [messages]
+"""
+
+import os
+import sys
+import time
+import asyncio
+
+import aiosmtplib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.smtp_stub import LocalSMTPServer
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+CONNECT_DELAY_MS = 40
+MESSAGE_DELAY_MS = 2
+PORT = 10259
+
+os.environ.update({
+    'EMAIL_HOST': '127.0.0.1',
+    'EMAIL_PORT': str(PORT),
+    'EMAIL_STARTTLS': 'false',
+    'EMAIL_USER': 'bench@example.com',
+    'EMAIL_PASSWORD': 'bench',
+    'EMAIL_FROM': 'bench@example.com'
+})
+
+from utils.email_service import SMTPPool, build_message, report_confirmation_email
+
+
+def messages():
+    return [build_message(f'citizen{i}@example.com', *report_confirmation_email('Citizen', f'report-{i}'))
+            for i in range(MESSAGES)]
+
+
+async def per_message_connections(batch):
+    await asyncio.gather(*[
+        aiosmtplib.send(message, hostname='127.0.0.1', port=PORT, username='bench@example.com',
+                        password='bench', start_tls=False)
+        for message in batch
+    ])
+
+
+async def pooled_individual(pool, batch):
+    await asyncio.gather(*[pool.send(message) for message in batch])
+
+
+async def pooled_bulk(pool, batch):
+    errors = await pool.send_many(batch)
+    assert not any(errors)
+
+
+async def run(label, scenario, server, *args):
+    received, sessions = len(server.messages), server.sessions
+    batch = messages()
+    start = time.perf_counter()
+    await scenario(*args, batch)
+    elapsed = time.perf_counter() - start
+    assert len(server.messages) - received == MESSAGES
+    print(f"  {label:<36} {elapsed * 1000:9.1f} ms   {MESSAGES / elapsed:8.1f} msg/s   "
+          f"{server.sessions - sessions:4d} connections")
+
+
+async def main():
+    server = await LocalSMTPServer(port=PORT, delay_ms=MESSAGE_DELAY_MS, connect_delay_ms=CONNECT_DELAY_MS).start()
+    print(f"{MESSAGES} messages, {CONNECT_DELAY_MS} ms connection setup, {MESSAGE_DELAY_MS} ms per message")
+    try:
+        await run("aiosmtplib.send per message", per_message_connections, server)
+
+        pool = SMTPPool()
+        await run(f"pool ({pool.size} sessions), send each", pooled_individual, server, pool)
+        await run(f"pool ({pool.size} sessions), warm, send each", pooled_individual, server, pool)
+        await pool.close()
+
+        pool = SMTPPool()
+        await run(f"pool ({pool.size} sessions), send_many", pooled_bulk, server, pool)
+        await pool.close()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark: ingesting every NCR station, one detail feed after another versus the bounded
+fan-out of utils/station_ingester.py (one map/bounds call, then the detail feeds under a
+semaphore).
+
+Runs against the in-process WAQI stand-in (utils/waqi_stub.py) serving the recorded
+payloads; UPSTREAM_DELAY_MS stands in for WAQI's per-request latency.
+
+    cd backend && python benchmarks/bench_station_ingest.py [upstream_delay_ms]
+"""
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+UPSTREAM_DELAY_MS = float(sys.argv[1]) if len(sys.argv) > 1 else 80
+PORT = 10265
+
+tmp = tempfile.TemporaryDirectory()
+os.environ.update({
+    'SQLITE_DB_URL': f"sqlite:///{tmp.name}/bench_stations.db",
+    'WAQI_BASE_URL': f"http://127.0.0.1:{PORT}",
+    'WAQI_API_TOKEN': 'bench',
+})
+
+from database import init_db
+from utils.waqi_client import waqi_client
+from utils.waqi_stub import LocalWAQIServer
+from utils.station_ingester import StationIngester
+
+
+async def sequential(ingester):
+    listing = await waqi_client.fetch_bounds(ingester.bounds)
+    for station in listing:
+        await waqi_client.fetch(f"feed/@{station['uid']}")
+    return len(listing)
+
+
+async def fan_out(ingester):
+    return len(await ingester.refresh())
+
+
+async def run(label, scenario, server, ingester):
+    waqi_client.invalidate()
+    server.max_concurrent = 0
+    requests = sum(server.requests.values())
+    start = time.perf_counter()
+    stations = await scenario(ingester)
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<32} {elapsed * 1000:9.1f} ms   {stations:3d} stations   "
+          f"{sum(server.requests.values()) - requests:3d} requests   {server.max_concurrent:2d} concurrent")
+
+
+async def main():
+    init_db()
+    server = await LocalWAQIServer(port=PORT, delay_ms=UPSTREAM_DELAY_MS).start()
+    print(f"{UPSTREAM_DELAY_MS:.0f} ms per upstream request")
+    try:
+        ingester = StationIngester()
+        await run("one detail feed at a time", sequential, server, ingester)
+        for concurrency in (4, 8, 16):
+            ingester.concurrency = concurrency
+            await run(f"fan-out, semaphore {concurrency}", fan_out, server, ingester)
+    finally:
+        await waqi_client.close()
+        await server.stop()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,11 @@
-from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text, Boolean
+from sqlalchemy import create_engine, Column, String, Integer, Float, DateTime, Text, Boolean, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
 import os
 from pathlib import Path
+from utils.report_geo import install_sqlite_rtree
+from utils.report_clusters import install_sqlite_clusters
 
 ROOT_DIR = Path(__file__).parent
 DATABASE_URL = os.environ.get('SQLITE_DB_URL', f'sqlite:///{ROOT_DIR}/aqi_data.db')
@@ -33,6 +35,12 @@ class AdminUser(Base):
 class PollutionReportDB(Base):
     """Pollution report model - compatible with PostgreSQL"""
     __tablename__ = "pollution_reports"
+    __table_args__ = (
+        # Box queries where the SQLite R-tree (utils/report_geo.py) is unavailable, and
+        # newest-first walks over viewports too dense for it
+        Index('ix_pollution_reports_lat_lng', 'latitude', 'longitude'),
+        Index('ix_pollution_reports_created', 'created_at', 'report_id'),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     report_id = Column(String(255), unique=True, index=True, nullable=False)
@@ -80,10 +88,43 @@ class SourceAttributionLog(Base):
     prediction_type = Column(String(50))
     created_at = Column(DateTime, default=datetime.utcnow)
 
+class AQISnapshotDB(Base):
+    """Ingested WAQI feed snapshots - lets a restarted worker serve warm data"""
+    __tablename__ = "aqi_snapshots"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    version = Column(Integer, nullable=False, index=True)
+    station = Column(String(255), nullable=False, index=True)
+    aqi = Column(Float, nullable=True)
+    payload = Column(Text, nullable=False)
+    fetched_at = Column(DateTime, nullable=False, index=True)
+
+class AQIStationDB(Base):
+    """Latest reading of each WAQI station in the NCR bounds - lets a restarted worker start warm"""
+    __tablename__ = "aqi_stations"
+    
+    uid = Column(Integer, primary_key=True)
+    name = Column(String(255), nullable=True)
+    latitude = Column(Float, nullable=False)
+    longitude = Column(Float, nullable=False)
+    aqi = Column(Float, nullable=True)
+    pm25 = Column(Float, nullable=True)
+    pm10 = Column(Float, nullable=True)
+    no2 = Column(Float, nullable=True)
+    so2 = Column(Float, nullable=True)
+    co = Column(Float, nullable=True)
+    o3 = Column(Float, nullable=True)
+    observed_at = Column(DateTime, nullable=True)
+    payload = Column(Text, nullable=True)  # station detail feed, when fetched
+    version = Column(Integer, nullable=False)
+    fetched_at = Column(DateTime, nullable=False)
+
 # Create all tables
 def init_db():
     """Initialize database tables"""
     Base.metadata.create_all(bind=engine)
+    install_sqlite_rtree(engine)
+    install_sqlite_clusters(engine)
     print("✅ Database tables created successfully")
 
 # Dependency for FastAPI
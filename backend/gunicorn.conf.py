@@ -0,0 +1,35 @@
+"""
+Gunicorn settings: several uvicorn workers sharing one copy of the ML models.
+
+The models are deserialized and warmed once in the master before it forks, so the
+booster and random-forest pages are shared copy-on-write by every worker instead of
+being loaded per worker. Per-worker RSS/USS is reported at GET /api/metrics/memory.
+
+    cd backend && gunicorn server:app -c gunicorn.conf.py
+
+Keep INFERENCE_EXECUTOR=thread here: process-mode inference workers load private copies.
+A hot reload (POST /api/models/reload or the directory watcher) loads the new version in
+each worker separately; restart gunicorn afterwards to share it again.
+"""
+
+import gc
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8001')
+workers = int(os.environ.get('WEB_CONCURRENCY', '4'))
+worker_class = 'uvicorn.workers.UvicornWorker'
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+
+
+def on_starting(server):
+    """Runs once in the master, before any worker is forked"""
+    os.environ['GUNICORN_MASTER_PID'] = str(os.getpid())
+
+    from ml_models.model_registry import model_registry
+    model_registry.preload()
+
+    # Move everything allocated so far out of the collector's reach: a full collection in a
+    # worker would otherwise write to the GC headers of the shared objects and un-share their pages
+    gc.collect()
+    gc.freeze()
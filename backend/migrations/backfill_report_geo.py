@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+One-time migration: add the GeoJSON `geo` point to pollution reports stored before it existed.
+
+/api/reports/near and /api/reports/within query `geo` through its 2dsphere index, so
+reports that only carry latitude/longitude are invisible to them until this runs.
+Walks those reports in _id order and sets `geo` in batched, unordered bulk_write calls;
+reports with coordinates outside the valid range are counted and left alone. Safe to re-run.
+
+    cd backend && python migrations/backfill_report_geo.py [--batch-size 1000] [--dry-run]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+load_dotenv(ROOT_DIR / '.env')
+
+from utils.report_geo import geo_point
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('backfill_report_geo')
+
+
+def backfill(collection, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    counts = {'scanned': 0, 'updated': 0, 'invalid': 0}
+    query = {"geo": {"$exists": False}, "latitude": {"$type": "number"}, "longitude": {"$type": "number"}}
+    last_id = None
+
+    while True:
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(collection.find(query, {"_id": 1, "latitude": 1, "longitude": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        counts['scanned'] += len(batch)
+
+        operations = []
+        for doc in batch:
+            if not (-90 <= doc["latitude"] <= 90 and -180 <= doc["longitude"] <= 180):
+                counts['invalid'] += 1
+                logger.warning(f"⚠️  Coordinates out of range on {doc['_id']}: {doc['latitude']}, {doc['longitude']}")
+                continue
+            operations.append(UpdateOne(
+                {"_id": doc["_id"], "geo": {"$exists": False}},
+                {"$set": {"geo": geo_point(doc["latitude"], doc["longitude"])}}
+            ))
+
+        if operations and not dry_run:
+            counts['updated'] += collection.bulk_write(operations, ordered=False).modified_count
+        elif operations:
+            counts['updated'] += len(operations)
+        logger.info(f"📦 {counts['scanned']} scanned, {counts['updated']} updated")
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help='count the reports to update without writing')
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ['MONGO_URL'])
+    try:
+        start = time.perf_counter()
+        counts = backfill(client[os.environ['DB_NAME']].pollution_reports, args.batch_size, args.dry_run)
+        logger.info(f"✅ Done in {time.perf_counter() - start:.1f}s{' (dry run)' if args.dry_run else ''}: {counts}")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+One-time migration: pollution_reports.created_at from ISO strings to native BSON dates.
+
+Reports written before created_at was stored as a date hold it as an isoformat() string.
+Strings and dates never compare with each other in Mongo, so until this runs such reports
+sort after every dated one and fall outside `since`/`until` range filters.
+
+Walks the string-dated reports in _id order and rewrites them in batched, unordered
+bulk_write calls. Each update only applies if created_at still holds the string it was
+read with, so the migration can run against a live collection and be re-run safely.
+
+    cd backend && python migrations/migrate_report_dates.py [--batch-size 1000] [--dry-run]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from pathlib import Path
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+from pymongo import MongoClient, UpdateOne
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('migrate_report_dates')
+
+
+def parse_created_at(value: str):
+    """Stored isoformat() string as an aware UTC datetime, None when unparseable"""
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc)
+
+
+def migrate(collection, batch_size: int = 1000, dry_run: bool = False) -> dict:
+    counts = {'scanned': 0, 'converted': 0, 'skipped': 0, 'unparseable': 0}
+    query = {"created_at": {"$type": "string"}}
+    last_id = None
+
+    while True:
+        if last_id is not None:
+            query["_id"] = {"$gt": last_id}
+        batch = list(collection.find(query, {"_id": 1, "created_at": 1}).sort("_id", 1).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        counts['scanned'] += len(batch)
+
+        operations = []
+        for doc in batch:
+            created_at = parse_created_at(doc["created_at"])
+            if created_at is None:
+                counts['unparseable'] += 1
+                logger.warning(f"⚠️  Unparseable created_at on {doc['_id']}: {doc['created_at']!r}")
+                continue
+            operations.append(UpdateOne(
+                {"_id": doc["_id"], "created_at": doc["created_at"]},
+                {"$set": {"created_at": created_at}}
+            ))
+
+        if operations and not dry_run:
+            result = collection.bulk_write(operations, ordered=False)
+            counts['converted'] += result.modified_count
+            counts['skipped'] += len(operations) - result.modified_count
+        elif operations:
+            counts['converted'] += len(operations)
+        logger.info(f"📦 {counts['scanned']} scanned, {counts['converted']} converted")
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--dry-run', action='store_true', help='count the reports to convert without writing')
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ['MONGO_URL'])
+    collection = client[os.environ['DB_NAME']].pollution_reports
+    try:
+        start = time.perf_counter()
+        counts = migrate(collection, args.batch_size, args.dry_run)
+        remaining = collection.count_documents({"created_at": {"$type": "string"}})
+        logger.info(f"✅ Done in {time.perf_counter() - start:.1f}s{' (dry run)' if args.dry_run else ''}: "
+                    f"{counts}, {remaining} string dates remaining")
+    finally:
+        client.close()
+    return 0 if remaining == counts['unparseable'] or args.dry_run else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
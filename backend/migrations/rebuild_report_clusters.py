@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Migration: recompute the per-cell report counters behind /api/reports/clusters.
+
+The counters in `report_clusters` are updated incrementally on every report create and
+status change. Run this once to seed them from the reports stored before they existed,
+or again at any time to correct drift (e.g. after a counter update failed and was only
+logged). Each level is cleared and recomputed server-side by one aggregation that
+$merges into the collection; nothing is pulled into this process. Safe to re-run.
+
+    cd backend && python migrations/rebuild_report_clusters.py [--dry-run]
+"""
+
+import os
+import sys
+import time
+import argparse
+import logging
+from pathlib import Path
+
+from dotenv import load_dotenv
+from pymongo import MongoClient
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+load_dotenv(ROOT_DIR / '.env')
+
+from utils.report_clusters import CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM, CLUSTER_INDEX, rebuild_pipeline
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('rebuild_report_clusters')
+
+
+def rebuild(db, dry_run: bool = False) -> dict:
+    counts = {}
+    keys, options = CLUSTER_INDEX
+    if not dry_run:
+        db.report_clusters.create_index(keys, **options)
+
+    for level in range(CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM + 1):
+        if dry_run:
+            counts[level] = db.report_clusters.count_documents({"z": level})
+            logger.info(f"📦 Level {level}: {counts[level]} cells stored")
+            continue
+        db.report_clusters.delete_many({"z": level})
+        list(db.pollution_reports.aggregate(rebuild_pipeline(level, "report_clusters"), allowDiskUse=True))
+        counts[level] = db.report_clusters.count_documents({"z": level})
+        logger.info(f"📦 Level {level}: {counts[level]} cells")
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dry-run', action='store_true', help='count the stored cells per level without writing')
+    args = parser.parse_args()
+
+    client = MongoClient(os.environ['MONGO_URL'])
+    try:
+        start = time.perf_counter()
+        counts = rebuild(client[os.environ['DB_NAME']], args.dry_run)
+        logger.info(f"✅ Done in {time.perf_counter() - start:.1f}s{' (dry run)' if args.dry_run else ''}: {counts}")
+    finally:
+        client.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
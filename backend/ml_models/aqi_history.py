@@ -0,0 +1,204 @@
+import math
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LAGS = (1, 6, 12, 24)
+SHORT_WINDOW = 24
+LONG_WINDOW = 72
+MEMORY_FEATURES = ("AQI_t-1", "AQI_t-6", "AQI_t-12", "AQI_t-24", "rolling_mean_24h", "rolling_mean_72h")
+
+
+class HourlyRingBuffer:
+    """Fixed-size hourly AQI series for one station.
+
+    Slot `i` holds the reading for one epoch hour; missing hours are NaN. The 24h and
+    72h windows keep running sums and counts, so adding an observation and reading
+    lags or rolling means are all O(1).
+    """
+
+    def __init__(self, capacity: int = LONG_WINDOW):
+        self.capacity = max(capacity, LONG_WINDOW, max(LAGS) + 1)
+        self.values = np.full(self.capacity, np.nan, dtype=np.float64)
+        self.head = 0
+        self.last_hour: Optional[int] = None
+
+        self._sum_short = 0.0
+        self._n_short = 0
+        self._sum_long = 0.0
+        self._n_long = 0
+
+    def _slot(self, hours_ago: int) -> int:
+        return (self.head - hours_ago) % self.capacity
+
+    def _window_update(self, hours_ago: int, old: float, new: float):
+        """Apply a change of one slot's value to the window sums it belongs to"""
+        delta_sum = (0.0 if math.isnan(new) else new) - (0.0 if math.isnan(old) else old)
+        delta_n = (0 if math.isnan(new) else 1) - (0 if math.isnan(old) else 1)
+        if hours_ago < SHORT_WINDOW:
+            self._sum_short += delta_sum
+            self._n_short += delta_n
+        if hours_ago < LONG_WINDOW:
+            self._sum_long += delta_sum
+            self._n_long += delta_n
+
+    def _advance(self):
+        """Move head forward one hour; the values leaving each window are dropped from its sum"""
+        leaving_short = self.values[self._slot(SHORT_WINDOW - 1)]
+        if not math.isnan(leaving_short):
+            self._sum_short -= leaving_short
+            self._n_short -= 1
+        leaving_long = self.values[self._slot(LONG_WINDOW - 1)]
+        if not math.isnan(leaving_long):
+            self._sum_long -= leaving_long
+            self._n_long -= 1
+
+        self.head = (self.head + 1) % self.capacity
+        self.values[self.head] = np.nan
+        self.last_hour += 1
+
+    def reset(self):
+        self.values.fill(np.nan)
+        self.head = 0
+        self.last_hour = None
+        self._sum_short = self._sum_long = 0.0
+        self._n_short = self._n_long = 0
+
+    def push(self, hour: int, value: float):
+        """Record `value` for epoch hour `hour`; a repeat of the same hour replaces it"""
+        value = float(value)
+        if self.last_hour is None:
+            self.last_hour = hour
+        elif hour > self.last_hour:
+            gap = hour - self.last_hour
+            if gap >= self.capacity:
+                self.reset()
+                self.last_hour = hour
+            else:
+                for _ in range(gap):
+                    self._advance()
+
+        hours_ago = self.last_hour - hour
+        if hours_ago >= self.capacity:
+            return  # older than anything we keep
+
+        slot = self._slot(hours_ago)
+        old = self.values[slot]
+        self.values[slot] = value
+        self._window_update(hours_ago, old, value)
+
+    def lag(self, hours: int, now_hour: int = None) -> float:
+        """Reading `hours` before `now_hour` (default: the latest hour), NaN if unknown"""
+        if self.last_hour is None:
+            return np.nan
+        hours_ago = hours + ((now_hour - self.last_hour) if now_hour is not None else 0)
+        if hours_ago < 0 or hours_ago >= self.capacity:
+            return np.nan
+        return self.values[self._slot(hours_ago)]
+
+    def rolling_mean(self, window: int) -> float:
+        if window == SHORT_WINDOW:
+            total, count = self._sum_short, self._n_short
+        elif window == LONG_WINDOW:
+            total, count = self._sum_long, self._n_long
+        else:
+            raise ValueError(f"Unsupported window: {window}")
+        return total / count if count else np.nan
+
+    def __len__(self) -> int:
+        return self._n_long
+
+
+def station_key(aqi_data: dict) -> str:
+    """Stable per-station key from a WAQI feed payload"""
+    idx = aqi_data.get('idx')
+    if idx is not None:
+        return str(idx)
+    return str(aqi_data.get('city', {}).get('name', 'default'))
+
+
+def observation_hour(aqi_data: dict, default: datetime = None) -> int:
+    """Epoch hour of a WAQI reading, from its `time.iso` stamp when available"""
+    ts = None
+    iso = aqi_data.get('time', {}).get('iso') if isinstance(aqi_data.get('time'), dict) else None
+    if iso:
+        try:
+            ts = datetime.fromisoformat(iso)
+            if ts.tzinfo is None:
+                ts = ts.replace(tzinfo=timezone.utc)
+        except ValueError:
+            ts = None
+    if ts is None:
+        ts = default or datetime.now(timezone.utc)
+    return int(ts.timestamp() // 3600)
+
+
+class AQIHistory:
+    """Per-station hourly ring buffers that supply the forecaster's lag/rolling features"""
+
+    def __init__(self, capacity: int = LONG_WINDOW):
+        self.capacity = capacity
+        self.buffers = {}
+
+    def buffer(self, station: str) -> HourlyRingBuffer:
+        buf = self.buffers.get(station)
+        if buf is None:
+            buf = HourlyRingBuffer(self.capacity)
+            self.buffers[station] = buf
+        return buf
+
+    def observe(self, aqi_data: dict, observed_at: datetime = None):
+        """Add one WAQI feed payload to its station's buffer"""
+        try:
+            aqi = float(aqi_data.get('aqi'))
+        except (TypeError, ValueError):
+            return
+        self.buffer(station_key(aqi_data)).push(observation_hour(aqi_data, observed_at), aqi)
+
+    def observe_snapshot(self, snapshot):
+        """AQIIngester listener"""
+        self.observe(snapshot.data, snapshot.fetched_at)
+
+    def backfill(self, rows):
+        """Load persisted (payload, fetched_at) rows, oldest first"""
+        count = 0
+        for data, fetched_at in rows:
+            self.observe(data, fetched_at)
+            count += 1
+        if count:
+            logger.info(f"✅ AQI history backfilled with {count} readings across {len(self.buffers)} station(s)")
+
+    def feature_values(self, aqi_data: dict, current_aqi: float) -> tuple:
+        """MEMORY_FEATURES values for the station in `aqi_data`; unknown hours fall back to `current_aqi`"""
+        buf = self.buffers.get(station_key(aqi_data))
+        if buf is None:
+            return (current_aqi,) * len(MEMORY_FEATURES)
+
+        now_hour = observation_hour(aqi_data)
+
+        def or_current(value):
+            return current_aqi if value is None or math.isnan(value) else float(value)
+
+        return (
+            *(or_current(buf.lag(k, now_hour)) for k in LAGS),
+            or_current(buf.rolling_mean(SHORT_WINDOW)),
+            or_current(buf.rolling_mean(LONG_WINDOW)),
+        )
+
+    def features(self, aqi_data: dict, current_aqi: float) -> dict:
+        """MEMORY_FEATURES as a name -> value dict"""
+        return dict(zip(MEMORY_FEATURES, self.feature_values(aqi_data, current_aqi)))
+
+    def stats(self) -> dict:
+        return {
+            'stations': len(self.buffers),
+            'capacity_hours': self.capacity,
+            'observations': {station: len(buf) for station, buf in self.buffers.items()}
+        }
+
+
+aqi_history = AQIHistory()
@@ -0,0 +1,72 @@
+from datetime import datetime
+from functools import lru_cache
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Calendar features shared by both models, in the order time_features() returns them
+TIME_FEATURES = (
+    "hour", "day", "month", "day_of_week", "is_weekend",
+    "month_sin", "month_cos", "hour_sin", "hour_cos",
+)
+
+
+@lru_cache(maxsize=64)
+def _time_block(year: int, month: int, day: int, hour: int) -> np.ndarray:
+    weekday = datetime(year, month, day).weekday()
+    block = np.array([
+        hour,
+        day,
+        month,
+        weekday,
+        1 if weekday >= 5 else 0,
+        np.sin(2 * np.pi * month / 12),
+        np.cos(2 * np.pi * month / 12),
+        np.sin(2 * np.pi * hour / 24),
+        np.cos(2 * np.pi * hour / 24),
+    ], dtype=np.float32)
+    block.setflags(write=False)
+    return block
+
+
+def feature_hour(now: datetime = None) -> tuple:
+    """The local calendar hour time_features() reads from `now`. Anything computed from
+    those features stays valid while this is unchanged, so caches key on it."""
+    now = now or datetime.now()
+    return now.year, now.month, now.day, now.hour
+
+
+def time_features(now: datetime = None) -> np.ndarray:
+    """TIME_FEATURES values for `now`, computed once per calendar hour"""
+    return _time_block(*feature_hour(now))
+
+
+class FeatureLayout:
+    """Feature name -> column index for a loaded model, resolved once at load time.
+
+    `compile(source_names)` returns index arrays that scatter a vector of values in
+    `source_names` order into the model's column order with one NumPy assignment.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.width = len(self.names)
+
+    def column(self, name: str):
+        return self.index.get(name)
+
+    def compile(self, source_names):
+        source_names = list(source_names)
+        missing = [name for name in self.names if name not in source_names]
+        if missing:
+            logger.warning(f"⚠️  Model expects features that are not produced (filled with 0): {missing}")
+        pairs = [(src, self.index[name]) for src, name in enumerate(source_names) if name in self.index]
+        src = np.array([p[0] for p in pairs], dtype=np.intp)
+        dst = np.array([p[1] for p in pairs], dtype=np.intp)
+        return src, dst
+
+    def allocate(self, n_rows: int) -> np.ndarray:
+        return np.zeros((n_rows, self.width), dtype=np.float32)
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import logging
+from collections import OrderedDict
+
+from ml_models.feature_layout import feature_hour
+
+logger = logging.getLogger(__name__)
+
+
+def _approx_size(value) -> int:
+    """Rough deep size of a result dict of primitives/dicts/lists, for the memory report"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(sys.getsizeof(k) + _approx_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(_approx_size(v) for v in value)
+    return size
+
+
+class ForecastCache:
+    """LRU + TTL cache of forecast results.
+
+    Keys combine a quantized location cell (FORECAST_CACHE_CELL_DEG degrees, ~1.1 km at
+    0.01), the ingested snapshot version and the local hour the calendar features are
+    computed for, so a result is reused only while its inputs are unchanged. Publishing a new snapshot clears the cache.
+    """
+
+    def __init__(self):
+        self.max_entries = int(os.environ.get('FORECAST_CACHE_MAX_ENTRIES', '4096'))
+        self.ttl = float(os.environ.get('FORECAST_CACHE_TTL_SECONDS', '3600'))
+        self.cell_deg = float(os.environ.get('FORECAST_CACHE_CELL_DEG', '0.01'))
+
+        self._entries = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def key(self, kind: str, lat: float, lon: float, version: int, model_version: str = None) -> tuple:
+        return (
+            kind,
+            round(lat / self.cell_deg),
+            round(lon / self.cell_deg),
+            version,
+            model_version,
+            feature_hour()
+        )
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, value, size = entry
+        if expires_at <= time.monotonic():
+            self._drop(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if key in self._entries:
+            self._drop(key)
+        size = _approx_size(value)
+        self._entries[key] = (time.monotonic() + self.ttl, value, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _drop(self, key):
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+    def invalidate(self):
+        if self._entries:
+            self.invalidations += 1
+        self._entries.clear()
+        self._bytes = 0
+
+    def on_snapshot(self, snapshot):
+        """AQIIngester listener: results for older snapshots can no longer be hit"""
+        self.invalidate()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        avg_entry = self._bytes / len(self._entries) if self._entries else 0
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'approx_bytes': self._bytes,
+            'approx_max_bytes': int(avg_entry * self.max_entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'ttl_seconds': self.ttl,
+            'cell_deg': self.cell_deg
+        }
+
+
+forecast_cache = ForecastCache()
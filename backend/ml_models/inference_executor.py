@@ -0,0 +1,136 @@
+import os
+import time
+import asyncio
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue is at INFERENCE_MAX_QUEUE"""
+
+
+def _preload_models():
+    """Process-pool initializer: load each model once per worker"""
+    from ml_models.aqi_forecaster import forecaster
+    from ml_models.source_attribution import attribution_model
+    forecaster.load_model()
+    attribution_model.load_model()
+    logger.info(f"✅ Inference worker {os.getpid()} ready")
+
+
+class InferenceExecutor:
+    """Runs blocking model inference off the event loop.
+
+    INFERENCE_EXECUTOR=thread (default) shares the already loaded models with a thread pool;
+    INFERENCE_EXECUTOR=process starts worker processes that each load their own copy.
+    At most INFERENCE_MAX_QUEUE calls may be queued or running; beyond that `run` raises
+    InferenceQueueFull so callers can shed load instead of piling up.
+    """
+
+    def __init__(self):
+        self.mode = os.environ.get('INFERENCE_EXECUTOR', 'thread').lower()
+        self.workers = int(os.environ.get('INFERENCE_WORKERS', '2'))
+        self.max_queue = int(os.environ.get('INFERENCE_MAX_QUEUE', '64'))
+        self._executor = None
+
+        self.pending = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self._latencies = deque(maxlen=1024)
+        self._max_latency = 0.0
+
+    def _create_executor(self):
+        if self.mode == 'process':
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_preload_models
+            )
+        else:
+            executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix='inference'
+            )
+        logger.info(f"✅ Inference executor started ({self.mode}, {self.workers} workers, queue {self.max_queue})")
+        return executor
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = self._create_executor()
+        return self._executor
+
+    async def _warm(self, executor):
+        if self.mode == 'process':
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(*[loop.run_in_executor(executor, os.getpid) for _ in range(self.workers)])
+
+    async def start(self):
+        """Create the pool up front; in process mode, spawn every worker so models load before traffic"""
+        await self._warm(self._get_executor())
+
+    async def restart(self):
+        """Process mode: swap in a fresh, fully spawned pool so workers pick up reloaded model files.
+
+        Calls already queued on the old pool still run there; threads share the
+        in-process models and need no restart.
+        """
+        if self.mode != 'process' or self._executor is None:
+            return
+        executor = self._create_executor()
+        await self._warm(executor)
+        old, self._executor = self._executor, executor
+        old.shutdown(wait=False)
+
+    async def run(self, fn, *args):
+        """Run `fn(*args)` on the pool. In process mode `fn` must be a module-level function."""
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise InferenceQueueFull(f"Inference queue full ({self.max_queue} pending)")
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self._get_executor(), fn, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.pending -= 1
+            elapsed = time.perf_counter() - start
+            self._latencies.append(elapsed)
+            self._max_latency = max(self._max_latency, elapsed)
+
+    def stats(self) -> dict:
+        latencies = np.fromiter(self._latencies, dtype=np.float64) * 1000
+        return {
+            'mode': self.mode,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'queue_depth': self.pending,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'latency_ms': {
+                'p50': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+                'p95': round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+                'max': round(self._max_latency * 1000, 2),
+                'window': len(latencies)
+            }
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+inference_executor = InferenceExecutor()
@@ -0,0 +1,111 @@
+import os
+import asyncio
+import logging
+
+import numpy as np
+
+from ml_models.inference_executor import inference_executor
+
+logger = logging.getLogger(__name__)
+
+BATCH_WINDOW_MS = float(os.environ.get('INFERENCE_BATCH_WINDOW_MS', '2'))
+MAX_BATCH_ROWS = int(os.environ.get('INFERENCE_MAX_BATCH', '256'))
+
+
+class MicroBatcher:
+    """Coalesces concurrent predictions into one batched executor call.
+
+    Callers `submit` a feature matrix (one or more rows). Submissions arriving within
+    `window_ms` of the first one, or until `max_rows` rows are waiting, are stacked and
+    passed to `batch_fn` in a single call; each caller gets back only its own rows.
+    `batch_fn` must be a module-level function returning an array or a tuple of arrays
+    with one row per input row (non-array tuple members are passed to every caller as is).
+    Rows submitted with different `key`s are never batched together; the key is passed to
+    `batch_fn` as a second argument.
+    """
+
+    def __init__(self, name: str, batch_fn, window_ms: float = BATCH_WINDOW_MS, max_rows: int = MAX_BATCH_ROWS):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window = window_ms / 1000.0
+        self.max_rows = max_rows
+
+        self._pending = []
+        self._pending_rows = 0
+        self._timer = None
+
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+
+    async def submit(self, X: np.ndarray, key=None):
+        if self.window <= 0:
+            return await self._execute(X, key)
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((X, key, future))
+        self._pending_rows += len(X)
+
+        if self._pending_rows >= self.max_rows:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        groups = {}
+        for X, key, future in self._pending:
+            groups.setdefault(key, []).append((X, future))
+        self._pending = []
+        self._pending_rows = 0
+        for key, batch in groups.items():
+            asyncio.ensure_future(self._run_batch(batch, key))
+
+    async def _execute(self, X: np.ndarray, key=None):
+        self.batches += 1
+        self.rows += len(X)
+        self.largest_batch = max(self.largest_batch, len(X))
+        if key is None:
+            return await inference_executor.run(self.batch_fn, X)
+        return await inference_executor.run(self.batch_fn, X, key)
+
+    async def _run_batch(self, batch, key=None):
+        X = batch[0][0] if len(batch) == 1 else np.concatenate([x for x, _ in batch])
+        try:
+            result = await self._execute(X, key)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        offset = 0
+        for x, future in batch:
+            end = offset + len(x)
+            if not future.done():
+                if isinstance(result, tuple):
+                    future.set_result(tuple(
+                        part[offset:end] if isinstance(part, np.ndarray) else part
+                        for part in result
+                    ))
+                else:
+                    future.set_result(result[offset:end])
+            offset = end
+
+    def stats(self) -> dict:
+        return {
+            'window_ms': self.window * 1000,
+            'max_rows': self.max_rows,
+            'batches': self.batches,
+            'rows': self.rows,
+            'avg_batch_rows': round(self.rows / self.batches, 2) if self.batches else 0.0,
+            'largest_batch': self.largest_batch,
+            'waiting_rows': self._pending_rows
+        }
@@ -0,0 +1,25 @@
+import os
+import hashlib
+
+
+def content_version(base_version: str, paths) -> str:
+    """`base_version` plus a short digest of the given model files, e.g. v2.0-ml+3f2a91c0"""
+    digest = hashlib.sha1()
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return f"{base_version}+{digest.hexdigest()[:8]}"
+
+
+def dir_fingerprint(model_dir: str) -> tuple:
+    """Cheap change detector for a model directory: (name, size, mtime) of every file"""
+    try:
+        entries = os.scandir(model_dir)
+    except FileNotFoundError:
+        return ()
+    with entries:
+        return tuple(sorted(
+            (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+            for entry in entries if entry.is_file()
+        ))
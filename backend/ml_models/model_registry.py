@@ -0,0 +1,176 @@
+import os
+import time
+import asyncio
+import logging
+
+from ml_models.aqi_forecaster import forecaster
+from ml_models.source_attribution import attribution_model
+from ml_models.inference_executor import inference_executor
+from ml_models.forecast_cache import forecast_cache
+from ml_models.model_files import dir_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Loads the ML models in the background and hot-reloads them.
+
+    Until the first load finishes both models report prediction_type "not_loaded", so endpoints
+    keep answering with the fallback schema instead of blocking. `ready` turns true once that
+    load (and, in process mode, the inference worker spawn) has completed, whether or not the
+    model files were present.
+
+    `reload()` (POST /api/models/reload, or the directory watcher every
+    MODEL_WATCH_INTERVAL_SECONDS) loads a candidate next to the serving model, warms it with a
+    test prediction and publishes it with a single reference swap. Requests already holding
+    the old version finish on it; a candidate that fails to load or warm is discarded.
+
+    `preload()` does the first load synchronously instead, in a gunicorn master before it forks
+    (see gunicorn.conf.py), so all workers share the model pages copy-on-write.
+    """
+
+    def __init__(self):
+        self.models = {'forecaster': forecaster, 'attribution': attribution_model}
+        self.watch_interval = float(os.environ.get('MODEL_WATCH_INTERVAL_SECONDS', '30'))
+
+        self.state = "pending"
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._task = None
+        self._watch_task = None
+        self._lock = asyncio.Lock()
+        self._fingerprints = {}
+        self.preloaded = False
+
+        self.reloads = 0
+        self.reload_failures = 0
+        self.last_reload = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == "ready"
+
+    def preload(self):
+        """Load, warm and publish every model in this process now (blocking)"""
+        for name, model in self.models.items():
+            self._fingerprints[name] = dir_fingerprint(model.model_dir)
+            candidate = model.load_candidate()
+            if candidate is not None:
+                candidate.warm()
+                model.publish(candidate)
+        self.preloaded = True
+        logger.info(f"✅ Models preloaded (forecaster: {forecaster.model_version}, attribution: {attribution_model.model_version})")
+
+    def start(self):
+        if self._task is None:
+            self.started_at = time.time()
+            self._task = asyncio.create_task(self._load())
+        return self._task
+
+    async def _load(self):
+        self.state = "loading"
+        try:
+            if not self.preloaded:
+                await self.reload()
+            await inference_executor.start()
+            self.state = "ready"
+        except Exception as e:
+            self.error = str(e)
+            self.state = "failed"
+            logger.error(f"❌ Background model loading failed: {str(e)}")
+        finally:
+            self.finished_at = time.time()
+        logger.info(f"✅ Model loading finished in {self.finished_at - self.started_at:.2f}s "
+                    f"(forecaster: {forecaster.model_version}, attribution: {attribution_model.model_version})")
+        if self.watch_interval > 0:
+            self._watch_task = asyncio.create_task(self._watch())
+
+    async def reload(self, names=None) -> dict:
+        """Load, warm and swap in the models on disk; returns a status per model"""
+        async with self._lock:
+            results = {}
+            candidates = {}
+            for name in names or self.models:
+                model = self.models[name]
+                self._fingerprints[name] = await asyncio.to_thread(dir_fingerprint, model.model_dir)
+                try:
+                    candidate = await asyncio.to_thread(model.load_candidate)
+                    if candidate is None:
+                        results[name] = {'status': 'unavailable', 'version': model.model_version}
+                    elif model.active is not None and candidate.version == model.active.version:
+                        results[name] = {'status': 'unchanged', 'version': candidate.version}
+                    else:
+                        await asyncio.to_thread(candidate.warm)
+                        candidates[name] = candidate
+                except Exception as e:
+                    self.reload_failures += 1
+                    logger.error(f"❌ Reload of {name} failed, keeping {model.model_version}: {str(e)}")
+                    results[name] = {'status': 'failed', 'version': model.model_version, 'error': str(e)}
+
+            if candidates:
+                # Process workers load from disk, so bring up a new pool before swapping versions
+                await inference_executor.restart()
+                for name, candidate in candidates.items():
+                    previous = self.models[name].model_version
+                    self.models[name].publish(candidate)
+                    results[name] = {'status': 'reloaded', 'version': candidate.version, 'previous_version': previous}
+                    logger.info(f"✅ {name} model swapped: {previous} -> {candidate.version}")
+                if 'forecaster' in candidates:
+                    forecast_cache.invalidate()
+                self.reloads += 1
+                self.last_reload = time.time()
+            return results
+
+    async def _watch(self):
+        """Reload a model once its directory changed and then stayed unchanged for one interval"""
+        changed_at = {}
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            try:
+                due = []
+                for name, model in self.models.items():
+                    fingerprint = await asyncio.to_thread(dir_fingerprint, model.model_dir)
+                    if fingerprint == self._fingerprints.get(name):
+                        changed_at.pop(name, None)
+                    elif changed_at.get(name) == fingerprint:
+                        due.append(name)
+                    else:
+                        # Possibly still being copied; wait for the next poll
+                        changed_at[name] = fingerprint
+                if due:
+                    logger.info(f"🔄 Model files changed, reloading: {', '.join(due)}")
+                    await self.reload(due)
+                    for name in due:
+                        changed_at.pop(name, None)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Model directory watch error: {str(e)}")
+
+    async def stop(self):
+        for task in (self._watch_task, self._task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+
+    def stats(self) -> dict:
+        return {
+            'state': self.state,
+            'error': self.error,
+            'load_seconds': round(self.finished_at - self.started_at, 3) if self.finished_at else None,
+            'forecaster': forecaster.prediction_type,
+            'attribution': attribution_model.prediction_type,
+            'versions': {name: model.model_version for name, model in self.models.items()},
+            'reloads': self.reloads,
+            'reload_failures': self.reload_failures,
+            'last_reload': self.last_reload,
+            'watch_interval_seconds': self.watch_interval,
+            'preloaded': self.preloaded
+        }
+
+
+model_registry = ModelRegistry()
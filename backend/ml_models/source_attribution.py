@@ -2,50 +2,111 @@ import numpy as np
 import pandas as pd
 import joblib
 import os
+import weakref
 from datetime import datetime
 import logging
 
+from ml_models.feature_layout import FeatureLayout, TIME_FEATURES, time_features
+from ml_models.inference_executor import InferenceQueueFull
+from ml_models.inference_scheduler import MicroBatcher
+from ml_models.model_files import content_version
+
 logger = logging.getLogger(__name__)
 
+# Everything prepare_input can produce, in _feature_vector order (also the training column order)
+ATTRIBUTION_FEATURES = ('PM2.5', 'PM10', 'NO2', 'SO2', 'CO', 'O3', 'pm_ratio', 'no2_co_ratio', 'month', 'hour')
+_MONTH = TIME_FEATURES.index('month')
+_HOUR = TIME_FEATURES.index('hour')
+
+class AttributionModel:
+    """One loaded regressor with its feature layout; never mutated once published"""
+    
+    def __init__(self, model, version: str):
+        self.model = model
+        # Set when the model was fitted on a DataFrame; sklearn then expects named columns.
+        # Built into an Index once, so each predict only wraps X instead of re-indexing names.
+        names = getattr(model, 'feature_names_in_', None)
+        self.columns = None if names is None else pd.Index(names)
+        self.layout = FeatureLayout(ATTRIBUTION_FEATURES if names is None else names)
+        self.src, self.dst = self.layout.compile(ATTRIBUTION_FEATURES)
+        self.version = version
+    
+    def predict(self, X):
+        if self.columns is not None:
+            # X is already in the fitted column order; naming the columns wraps it without a copy
+            X = pd.DataFrame(X, columns=self.columns, copy=False)
+        return self.model.predict(X)
+    
+    def warm(self):
+        """Test prediction on an all-zero row, so a broken model fails before it is published"""
+        pred = self.predict(self.layout.allocate(1))
+        if not np.all(np.isfinite(pred)):
+            raise ValueError(f"Attribution model {self.version} produced non-finite test predictions")
+
 class SourceAttributionModel:
     def __init__(self):
-        self.model = None
-        self.model_version = "v2.0-ml"
-        self.prediction_type = "not_loaded"
-        self.model_loaded = False
+        self.active = None
+        self.base_version = "v2.0-ml"
+        self._versions = weakref.WeakValueDictionary()
         self.targets = ["Traffic", "Industry", "Construction", "Stubble_Burning", "Other"]
         
         # Model paths (can be configured via environment)
-        self.model_dir = os.path.join(os.path.dirname(__file__), 'model2')
+        self.model_dir = os.environ.get('ML_MODEL2_DIR', os.path.join(os.path.dirname(__file__), 'model2'))
         self.model_path = os.path.join(self.model_dir, 'pollution_source_regression_model.pkl')
-        
-        self.load_model()
     
-    def load_model(self):
-        """Load pollution source attribution model"""
+    @property
+    def model_loaded(self) -> bool:
+        return self.active is not None
+    
+    @property
+    def prediction_type(self) -> str:
+        return "ml" if self.active is not None else "not_loaded"
+    
+    @property
+    def model_version(self) -> str:
+        return self.active.version if self.active is not None else self.base_version
+    
+    def load_candidate(self):
+        """Load the attribution model from disk without publishing it (blocking); None if unavailable"""
         try:
             if not os.path.exists(self.model_path):
                 logger.warning(f"❌ ML Model not found at: {self.model_path}")
                 logger.warning("📋 To enable ML predictions, place model files in: /app/backend/ml_models/model2/")
                 logger.warning("   Required files:")
                 logger.warning("   - pollution_source_regression_model.pkl")
-                self.prediction_type = "not_loaded"
-                return
+                return None
             
             # Load model
-            self.model = joblib.load(self.model_path)
-            self.model_loaded = True
-            self.prediction_type = "ml"
-            logger.info("✅ Pollution Source Attribution Model loaded successfully")
+            model = AttributionModel(joblib.load(self.model_path), content_version(self.base_version, [self.model_path]))
+            logger.info(f"✅ Pollution Source Attribution Model loaded successfully ({model.version})")
+            return model
             
         except Exception as e:
             logger.error(f"❌ Error loading source attribution model: {str(e)}")
-            self.prediction_type = "not_loaded"
+            return None
     
-    def prepare_input(self, pollutants: dict) -> pd.DataFrame:
-        """Prepare input features for model"""
-        now = datetime.now()
-        
+    def publish(self, model: AttributionModel):
+        """Atomically make `model` the one new requests use; in-flight requests keep theirs"""
+        self._versions[model.version] = model
+        self.active = model
+    
+    def load_model(self) -> bool:
+        """Load and publish the model on disk (blocking)"""
+        model = self.load_candidate()
+        if model is not None:
+            self.publish(model)
+        return model is not None
+    
+    def resolve(self, version: str = None) -> AttributionModel:
+        """The model for `version` while any request still holds it, else the active one"""
+        model = self._versions.get(version) if version is not None else None
+        model = model or self.active
+        if model is None:
+            raise RuntimeError("Source attribution model not loaded")
+        return model
+    
+    def _feature_vector(self, pollutants: dict, now: datetime = None) -> np.ndarray:
+        """All ATTRIBUTION_FEATURES values, in that order"""
         pm25 = pollutants.get('pm25', 0)
         pm10 = pollutants.get('pm10', 0)
         no2 = pollutants.get('no2', 0)
@@ -53,22 +114,34 @@ class SourceAttributionModel:
         so2 = pollutants.get('so2', 0)
         o3 = pollutants.get('o3', 0)
         
-        data = {
-            'PM2.5': pm25,
-            'PM10': pm10,
-            'NO2': no2,
-            'SO2': so2,
-            'CO': co,
-            'O3': o3,
-            'pm_ratio': pm10 / (pm25 + 1),
-            'no2_co_ratio': no2 / (co + 1),
-            'month': now.month,
-            'hour': now.hour
-        }
+        calendar = time_features(now)
         
-        return pd.DataFrame([data])
+        return np.array([
+            pm25,
+            pm10,
+            no2,
+            so2,
+            co,
+            o3,
+            pm10 / (pm25 + 1),
+            no2 / (co + 1),
+            calendar[_MONTH],
+            calendar[_HOUR]
+        ], dtype=np.float32)
+    
+    def prepare_batch(self, pollutants_list, now: datetime = None, model: AttributionModel = None) -> np.ndarray:
+        """Prepare one float32 row per pollutant dict, in the column order of `model` (default: the active one)"""
+        model = model or self.active
+        X = model.layout.allocate(len(pollutants_list))
+        for i, pollutants in enumerate(pollutants_list):
+            X[i, model.dst] = self._feature_vector(pollutants, now)[model.src]
+        return X
     
-    def predict(self, pollutants: dict, weather: dict = None, month: int = None, fire_count: int = 0) -> dict:
+    def prepare_input(self, pollutants: dict, now: datetime = None, model: AttributionModel = None) -> np.ndarray:
+        """Prepare input features for model"""
+        return self.prepare_batch([pollutants], now, model)
+    
+    async def predict(self, pollutants: dict, weather: dict = None, month: int = None, fire_count: int = 0) -> dict:
         """Predict pollution source contributions"""
         
         # Check if model is loaded
@@ -94,12 +167,15 @@ class SourceAttributionModel:
                 'pollutant_indicators': {}
             }
         
+        # Pin one model for the whole request; a concurrent reload does not affect it
+        model = self.active
         try:
             # Prepare input
-            input_df = self.prepare_input(pollutants)
+            X = self.prepare_input(pollutants, model=model)
             
-            # Make prediction
-            raw_pred = self.model.predict(input_df)[0]
+            # Make prediction (micro-batched with concurrent requests, off the event loop)
+            raw_pred, used_version = await attribution_batcher.submit(X, key=model.version)
+            raw_pred = raw_pred[0]
             raw_pred = np.clip(raw_pred, 0, None)
             
             # Convert to percentages
@@ -164,8 +240,8 @@ class SourceAttributionModel:
                     'time_of_day': True,
                     'ml_model': 'Random Forest Regressor'
                 },
-                'prediction_type': self.prediction_type,
-                'model_version': self.model_version,
+                'prediction_type': 'ml',
+                'model_version': used_version,
                 'explanation': explanation,
                 'pollutant_indicators': {
                     'pm25': pollutants.get('pm25', 0),
@@ -177,6 +253,8 @@ class SourceAttributionModel:
                 }
             }
             
+        except InferenceQueueFull:
+            raise
         except Exception as e:
             logger.error(f"Prediction error: {str(e)}")
             return {
@@ -192,7 +270,7 @@ class SourceAttributionModel:
                 'dominant_source': 'unknown',
                 'confidence': 0.0,
                 'prediction_type': 'error',
-                'model_version': self.model_version
+                'model_version': model.version
             }
     
     def _generate_explanation(self, contributions: dict, pollutants: dict, 
@@ -230,3 +308,10 @@ class SourceAttributionModel:
         return " ".join(explanations)
 
 attribution_model = SourceAttributionModel()
+
+def run_attribution(X, version=None):
+    """Inference executor entry point: raw source predictions plus the version that produced them"""
+    model = attribution_model.resolve(version)
+    return model.predict(X), model.version
+
+attribution_batcher = MicroBatcher('attribution', run_attribution)
@@ -1,28 +1,53 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, UploadFile, File, Query, Header
+from fastapi.responses import JSONResponse, Response
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import BulkWriteError
 import os
+import re
+import json
+import math
+import base64
+import asyncio
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict, EmailStr
 from typing import List, Optional
 import uuid
 from datetime import datetime, timezone
-import aiohttp
 import bcrypt
 
-from utils.email_service import send_report_confirmation, send_status_update
-from ml_models.aqi_forecaster import forecaster
-from ml_models.source_attribution import attribution_model
-import google.generativeai as genai
+from utils.email_service import report_confirmation_email, status_update_email, smtp_pool
+from utils.email_outbox import email_outbox
+from utils.waqi_client import waqi_client
+from utils.aqi_ingester import aqi_ingester
+from ml_models.aqi_forecaster import forecaster, forecast_batcher
+from ml_models.source_attribution import attribution_model, attribution_batcher
+from ml_models.aqi_history import aqi_history
+from ml_models.inference_executor import inference_executor, InferenceQueueFull
+from ml_models.forecast_cache import forecast_cache
+from ml_models.feature_layout import feature_hour
+from ml_models.model_registry import model_registry
+from utils.memory_report import process_memory, worker_memory_report
+from utils.gemini_gateway import gemini_gateway
+from utils.materializer import materializer
+from utils.report_geo import geo_point, parse_bbox, parse_polygon, bbox_polygon, near_filter, within_filter, dense_cap
+from utils.station_ingester import station_ingester
+from utils.aqi_raster import aqi_raster, AQIRaster
+from utils.aqi_tiles import heatmap_tiles, TILE_FORMATS
+from utils.route_planner import route_planner
+from utils.report_clusters import (cluster_level, cell_size, cell_deltas, apply_deltas, clusters_pipeline,
+                                   status_key, CLUSTER_INDEX)
 from database import init_db, get_db
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+# tz_aware: BSON dates come back as UTC-aware datetimes, serialized with their offset
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 app = FastAPI()
@@ -34,11 +59,28 @@ logger = logging.getLogger(__name__)
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@delhiair.gov.in')
 ADMIN_PASSWORD = os.environ.get('ADMIN_PASSWORD', 'DelhiAir@2026')
 WAQI_API_TOKEN = os.environ.get('WAQI_API_TOKEN')
-GEMINI_API_KEY = os.environ.get('GEMINI_API_KEY')
-
-# Configure Gemini
-if GEMINI_API_KEY:
-    genai.configure(api_key=GEMINI_API_KEY)
+FORECAST_BATCH_MAX_POINTS = int(os.environ.get('FORECAST_BATCH_MAX_POINTS', '1000'))
+MATERIALIZED_USER_TYPES = ("citizen", "policymaker")
+REPORTS_PAGE_DEFAULT = int(os.environ.get('REPORTS_PAGE_DEFAULT', '100'))
+REPORTS_PAGE_MAX = int(os.environ.get('REPORTS_PAGE_MAX', '1000'))
+REPORTS_BULK_MAX = int(os.environ.get('REPORTS_BULK_MAX', '1000'))
+REPORT_INDEX_WAIT_SECONDS = float(os.environ.get('REPORT_INDEX_WAIT_SECONDS', '60'))
+REPORTS_NEAR_MAX_RADIUS_M = float(os.environ.get('REPORTS_NEAR_MAX_RADIUS_M', '50000'))
+AQI_HEATMAP_MAX_POINTS = int(os.environ.get('AQI_HEATMAP_MAX_POINTS', '4096'))
+
+# Reports are listed newest first; `id` breaks ties between equal timestamps so the
+# order, and with it every cursor, is total
+REPORT_SORT = [("created_at", -1), ("id", -1)]
+# The list view never shows the uploaded image; `geo` duplicates latitude/longitude
+REPORT_LIST_PROJECTION = {"_id": 0, "image_url": 0, "geo": 0}
+REPORT_INDEXES = [
+    ([("id", 1)], {"name": "id_unique", "unique": True}),
+    ([("created_at", -1), ("id", -1)], {"name": "created_at_id"}),
+    ([("status", 1), ("created_at", -1), ("id", -1)], {"name": "status_created_at_id"}),
+    ([("geo", "2dsphere"), ("created_at", -1), ("id", -1)], {"name": "geo_created_at_id"}),
+]
+# Names of the REPORT_INDEXES known to exist; only these are ever hinted
+report_indexes_ready = set()
 
 class LoginRequest(BaseModel):
     email: str
@@ -79,6 +121,42 @@ class PollutionReportCreate(BaseModel):
 class StatusUpdate(BaseModel):
     status: str
 
+class BulkStatusUpdate(BaseModel):
+    ids: List[str] = Field(min_length=1, max_length=REPORTS_BULK_MAX)
+    status: str
+
+class BulkStatusResult(BaseModel):
+    id: str
+    result: str  # updated, unchanged, not_found or failed
+    error: Optional[str] = None
+
+class BulkStatusResponse(BaseModel):
+    status: str
+    updated: int
+    unchanged: int
+    not_found: int
+    failed: int
+    results: List[BulkStatusResult]
+
+class ReportCluster(BaseModel):
+    cell: str
+    count: int
+    lat: float
+    lng: float
+    mean_severity: float
+    status: dict
+
+class ReportClustersResponse(BaseModel):
+    zoom: int
+    level: int
+    cell_deg: float
+    total: int
+    clusters: List[ReportCluster]
+
+class ReportSummaryResponse(BaseModel):
+    total: int
+    status: dict
+
 class AQIData(BaseModel):
     aqi: float
     category: str
@@ -102,6 +180,34 @@ class ForecastResponse(BaseModel):
     error: Optional[str] = None
     message: Optional[str] = None
 
+class ForecastPoint(BaseModel):
+    lat: float = Field(ge=-90, le=90)
+    lng: float = Field(ge=-180, le=180)
+
+class BatchForecastRequest(BaseModel):
+    points: List[ForecastPoint] = Field(min_length=1, max_length=FORECAST_BATCH_MAX_POINTS)
+
+class PointForecast(BaseModel):
+    lat: float
+    lng: float
+    aqi_24h: float
+    aqi_48h: float
+    aqi_72h: float
+    trend: str
+    confidence: float
+    confidence_level: str
+    confidence_explanation: str
+
+class BatchForecastResponse(BaseModel):
+    forecasts: List[PointForecast]
+    count: int
+    current_aqi: float
+    prediction_type: str
+    model_version: str
+    generated_at: datetime
+    error: Optional[str] = None
+    message: Optional[str] = None
+
 class SourceContribution(BaseModel):
     contributions: dict
     dominant_source: str
@@ -201,10 +307,21 @@ class SafeRouteRequest(BaseModel):
     end_lat: float
     end_lng: float
 
+class RouteOption(BaseModel):
+    route_points: List[dict]
+    distance_km: float
+    duration_min: float
+    avg_aqi: float
+    max_aqi: float
+
 class SafeRouteResponse(BaseModel):
     route_points: List[dict]
     avg_aqi: float
     recommendation: str
+    cleanest: RouteOption
+    fastest: RouteOption
+    planning_ms: float
+    road_graph: bool = True
 
 class PolicyImpactRequest(BaseModel):
     policy_type: str
@@ -230,48 +347,49 @@ async def admin_login(credentials: LoginRequest):
         )
     raise HTTPException(status_code=401, detail="Invalid credentials")
 
-@api_router.get("/aqi/current", response_model=AQIData)
-async def get_current_aqi():
+def aqi_category(aqi_val: Optional[float]) -> str:
+    """US EPA AQI band for a value; also the bucket Gemini answers are cached under"""
+    if aqi_val is None:
+        return "Unknown"
+    if aqi_val > 300:
+        return "Hazardous"
+    if aqi_val > 200:
+        return "Very Unhealthy"
+    if aqi_val > 150:
+        return "Unhealthy"
+    if aqi_val > 100:
+        return "Unhealthy for Sensitive Groups"
+    if aqi_val > 50:
+        return "Moderate"
+    return "Good"
+
+def build_aqi_data(data: Optional[dict], timestamp: Optional[datetime] = None) -> AQIData:
+    """Turn a WAQI feed payload into AQIData, falling back to a typical Delhi reading"""
     try:
-        async with aiohttp.ClientSession() as session:
-            url = f"https://api.waqi.info/feed/delhi/?token={WAQI_API_TOKEN}"
-            async with session.get(url) as response:
-                if response.status == 200:
-                    data = await response.json()
-                    if data.get('status') == 'ok':
-                        aqi_val = data['data']['aqi']
-                        iaqi = data['data'].get('iaqi', {})
-                        
-                        category = "Good"
-                        if aqi_val > 300:
-                            category = "Hazardous"
-                        elif aqi_val > 200:
-                            category = "Very Unhealthy"
-                        elif aqi_val > 150:
-                            category = "Unhealthy"
-                        elif aqi_val > 100:
-                            category = "Unhealthy for Sensitive Groups"
-                        elif aqi_val > 50:
-                            category = "Moderate"
-                        
-                        pollutants = {
-                            'pm25': iaqi.get('pm25', {}).get('v', 0),
-                            'pm10': iaqi.get('pm10', {}).get('v', 0),
-                            'no2': iaqi.get('no2', {}).get('v', 0),
-                            'so2': iaqi.get('so2', {}).get('v', 0),
-                            'co': iaqi.get('co', {}).get('v', 0),
-                            'o3': iaqi.get('o3', {}).get('v', 0)
-                        }
-                        
-                        return AQIData(
-                            aqi=float(aqi_val),
-                            category=category,
-                            location="Delhi NCR",
-                            pollutants=pollutants,
-                            timestamp=datetime.now(timezone.utc)
-                        )
+        if data:
+            aqi_val = data['aqi']
+            iaqi = data.get('iaqi', {})
+            
+            category = aqi_category(aqi_val)
+            
+            pollutants = {
+                'pm25': iaqi.get('pm25', {}).get('v', 0),
+                'pm10': iaqi.get('pm10', {}).get('v', 0),
+                'no2': iaqi.get('no2', {}).get('v', 0),
+                'so2': iaqi.get('so2', {}).get('v', 0),
+                'co': iaqi.get('co', {}).get('v', 0),
+                'o3': iaqi.get('o3', {}).get('v', 0)
+            }
+            
+            return AQIData(
+                aqi=float(aqi_val),
+                category=category,
+                location="Delhi NCR",
+                pollutants=pollutants,
+                timestamp=timestamp or datetime.now(timezone.utc)
+            )
     except Exception as e:
-        logger.error(f"Error fetching AQI: {str(e)}")
+        logger.error(f"Error parsing AQI: {str(e)}")
     
     return AQIData(
         aqi=156.0,
@@ -281,46 +399,265 @@ async def get_current_aqi():
         timestamp=datetime.now(timezone.utc)
     )
 
+async def fetch_delhi_feed() -> Optional[dict]:
+    """Live WAQI feed for Delhi (pooled/cached), or None if unavailable"""
+    try:
+        return await waqi_client.fetch_feed('delhi')
+    except Exception as e:
+        logger.error(f"Error fetching AQI: {str(e)}")
+        return None
+
+_snapshot_aqi = (0, None)
+
+def snapshot_aqi_data(snapshot) -> AQIData:
+    """AQIData for an ingested snapshot, parsed once per snapshot version"""
+    global _snapshot_aqi
+    version, aqi_data = _snapshot_aqi
+    if version != snapshot.version or aqi_data is None:
+        aqi_data = build_aqi_data(snapshot.data, snapshot.fetched_at)
+        _snapshot_aqi = (snapshot.version, aqi_data)
+    return aqi_data
+
+class RequestContext:
+    """Per-request memo of the AQI snapshot, forecast and source attribution.
+    
+    Each piece is computed at most once per request and shared by whoever awaits it,
+    so composite endpoints can gather them concurrently without repeating upstream calls.
+    """
+    
+    def __init__(self, snapshot=None):
+        self._tasks = {}
+        # Pin the snapshot so every piece of this request sees the same reading
+        self.snapshot = snapshot or aqi_ingester.current
+        # Set when a Gemini answer was replaced by the built-in fallback
+        self.fallback = False
+    
+    def _memo(self, key: str, factory) -> asyncio.Future:
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._tasks[key] = task
+        return task
+    
+    def raw_aqi(self) -> asyncio.Future:
+        return self._memo('raw_aqi', self._load_raw_aqi)
+    
+    def aqi(self) -> asyncio.Future:
+        return self._memo('aqi', self._load_aqi)
+    
+    def forecast(self) -> asyncio.Future:
+        return self._memo('forecast', self._load_forecast)
+    
+    def sources(self) -> asyncio.Future:
+        return self._memo('sources', self._load_sources)
+    
+    async def _load_raw_aqi(self) -> Optional[dict]:
+        if self.snapshot is not None:
+            return self.snapshot.data
+        return await fetch_delhi_feed()
+    
+    async def _load_aqi(self) -> AQIData:
+        if self.snapshot is not None:
+            return snapshot_aqi_data(self.snapshot)
+        return build_aqi_data(await self.raw_aqi())
+    
+    async def _load_forecast(self) -> ForecastResponse:
+        raw, aqi_data = await asyncio.gather(self.raw_aqi(), self.aqi())
+        try:
+            forecast_result = await forecaster.predict(
+                current_aqi=aqi_data.aqi,
+                aqi_data=raw,
+                snapshot_version=self.snapshot.version if self.snapshot else None
+            )
+        except InferenceQueueFull:
+            raise HTTPException(status_code=503, detail="Forecast service busy, please retry")
+        return ForecastResponse(**forecast_result)
+    
+    async def _load_sources(self) -> SourceContribution:
+        aqi_data = await self.aqi()
+        try:
+            result = await attribution_model.predict(
+                pollutants=aqi_data.pollutants
+            )
+        except InferenceQueueFull:
+            raise HTTPException(status_code=503, detail="Source attribution service busy, please retry")
+        return SourceContribution(**result)
+
+async def get_request_context() -> RequestContext:
+    """FastAPI dependency: a fresh RequestContext per request"""
+    return RequestContext()
+
+@api_router.get("/aqi/current", response_model=AQIData)
+async def get_current_aqi():
+    snapshot = aqi_ingester.current
+    if snapshot is not None:
+        return snapshot_aqi_data(snapshot)
+    return build_aqi_data(await fetch_delhi_feed())
+
 @api_router.get("/aqi/forecast", response_model=ForecastResponse)
-async def get_forecast():
+async def get_forecast(ctx: RequestContext = Depends(get_request_context)):
     try:
-        aqi_data = await get_current_aqi()
-        
         # Use ML model prediction (async)
-        forecast_result = await forecaster.predict(
-            current_aqi=aqi_data.aqi
-        )
-        
-        return ForecastResponse(**forecast_result)
+        return await ctx.forecast()
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating forecast: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate forecast")
 
+@api_router.post("/aqi/forecast/batch", response_model=BatchForecastResponse)
+async def get_batch_forecast(batch_req: BatchForecastRequest, ctx: RequestContext = Depends(get_request_context)):
+    """Forecast many map/ward locations with a single ensemble pass"""
+    try:
+        raw, aqi_data = await asyncio.gather(ctx.raw_aqi(), ctx.aqi())
+        result = await forecaster.predict_batch(
+            [(point.lat, point.lng) for point in batch_req.points],
+            aqi_data=raw,
+            current_aqi=aqi_data.aqi,
+            snapshot_version=ctx.snapshot.version if ctx.snapshot else None
+        )
+        return BatchForecastResponse(
+            **result,
+            count=len(result['forecasts']),
+            current_aqi=aqi_data.aqi,
+            generated_at=datetime.now(timezone.utc)
+        )
+    except InferenceQueueFull:
+        raise HTTPException(status_code=503, detail="Forecast service busy, please retry")
+    except Exception as e:
+        logger.error(f"Error generating batch forecast: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate batch forecast")
+
 @api_router.get("/aqi/sources", response_model=SourceContribution)
-async def get_pollution_sources():
+async def get_pollution_sources(ctx: RequestContext = Depends(get_request_context)):
     try:
-        aqi_data = await get_current_aqi()
-        
         # Use ML model prediction
-        result = attribution_model.predict(
-            pollutants=aqi_data.pollutants
-        )
-        
-        return SourceContribution(**result)
+        return await ctx.sources()
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error getting sources: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to get pollution sources")
 
+def as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+def encode_report_cursor(report: dict) -> str:
+    """Opaque cursor pointing just past `report` in REPORT_SORT order"""
+    created_at = report['created_at']
+    # Reports not yet converted by migrations/migrate_report_dates.py still hold an ISO
+    # string; flag those so the filter keeps comparing them as strings
+    key = [created_at, report['id'], 's'] if isinstance(created_at, str) else [created_at.isoformat(), report['id']]
+    raw = json.dumps(key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def report_cursor_filter(cursor: str) -> dict:
+    """Keyset condition selecting the reports after `cursor`"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, report_id, *legacy = json.loads(raw)
+        if not legacy:
+            created_at = datetime.fromisoformat(created_at)
+        elif legacy != ['s'] or not isinstance(created_at, str):
+            raise ValueError(legacy)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    after = [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, "id": {"$lt": report_id}}
+    ]
+    if not legacy:
+        # Strings sort below every date, so the unmigrated reports follow all dated ones
+        after.append({"created_at": {"$type": "string"}})
+    return {"$or": after}
+
+async def find_reports_page(query: dict, response: Response, limit: int, after: Optional[str],
+                            hint: Optional[str] = None) -> list:
+    """One page of reports matching `query` in REPORT_SORT order; sets X-Next-Cursor if more follow"""
+    if after:
+        query = {**query, **report_cursor_filter(after)}
+    
+    cursor = db.pollution_reports.find(query, REPORT_LIST_PROJECTION)
+    if hint:
+        cursor = cursor.hint(hint)
+    reports = await cursor.sort(REPORT_SORT).limit(limit + 1).to_list(limit + 1)
+    
+    if len(reports) > limit:
+        reports = reports[:limit]
+        response.headers['X-Next-Cursor'] = encode_report_cursor(reports[-1])
+    return reports
+
+async def find_reports_in_area(query: dict, status: Optional[str], response: Response, limit: int,
+                               after: Optional[str]) -> list:
+    """One page of reports in a $geoWithin area, choosing the index by how many the area holds.
+
+    The 2dsphere index cannot return reports in REPORT_SORT order, so Mongo sorts every
+    report in the area in memory. Once the area holds more than dense_cap of them, walking
+    created_at_id newest-first and testing each report's geo stops sooner; counting the
+    area's reports through the 2dsphere index stops at that cap, so the check stays cheap
+    and the in-memory sort never exceeds it.
+    """
+    if status:
+        query = {**query, "status": status}
+    total = await db.pollution_reports.estimated_document_count()
+    cap = dense_cap(limit, total)
+    # The planner serves a $geoWithin count from the 2dsphere index without being told
+    candidates = await db.pollution_reports.count_documents(query, limit=cap)
+    if candidates < cap:
+        hint = "geo_created_at_id"
+    else:
+        hint = "status_created_at_id" if status else "created_at_id"
+    # Hinting an index that does not exist (yet) fails the query: leave those to the planner
+    return await find_reports_page(query, response, limit, after, hint if hint in report_indexes_ready else None)
+
+async def ensure_report_indexes():
+    """Create the pollution_reports indexes used by listing and status updates.
+
+    Each index is attempted whatever happened to the others: a duplicate legacy `id`
+    failing id_unique must not leave the listing and geo indexes unbuilt.
+    """
+    failed = 0
+    for keys, options in REPORT_INDEXES:
+        try:
+            await db.pollution_reports.create_index(keys, **options)
+            report_indexes_ready.add(options['name'])
+        except Exception as e:
+            failed += 1
+            logger.error(f"❌ Failed to create report index {options['name']}: {str(e)}")
+    keys, options = CLUSTER_INDEX
+    try:
+        await db.report_clusters.create_index(keys, **options)
+    except Exception as e:
+        failed += 1
+        logger.error(f"❌ Failed to create report cluster index: {str(e)}")
+    total = len(REPORT_INDEXES) + 1
+    if failed:
+        logger.warning(f"⚠️  Report indexes ready ({total - failed} of {total})")
+    else:
+        logger.info(f"✅ Report indexes ready ({total})")
+
+async def update_cluster_counters(deltas: dict):
+    """Apply per-cell counter changes; a failure is logged rather than failing the report write
+    (migrations/rebuild_report_clusters.py recomputes the counters from the reports)"""
+    try:
+        await apply_deltas(db.report_clusters, deltas)
+    except Exception as e:
+        logger.error(f"❌ Failed to update report cluster counters: {str(e)}")
+
 @api_router.post("/reports", response_model=PollutionReport)
 async def create_report(report: PollutionReportCreate):
     try:
         report_obj = PollutionReport(**report.model_dump())
         doc = report_obj.model_dump()
-        doc['created_at'] = doc['created_at'].isoformat()
+        point = geo_point(report_obj.latitude, report_obj.longitude)
+        if point is not None:
+            doc['geo'] = point
         
         await db.pollution_reports.insert_one(doc)
+        await update_cluster_counters(cell_deltas([doc]))
         
-        await send_report_confirmation(report.email, report.name, report_obj.id)
+        await email_outbox.enqueue(report.email, *report_confirmation_email(report.name, report_obj.id))
         
         return report_obj
     except Exception as e:
@@ -328,40 +665,213 @@ async def create_report(report: PollutionReportCreate):
         raise HTTPException(status_code=500, detail="Failed to create report")
 
 @api_router.get("/reports", response_model=List[PollutionReport])
-async def get_reports(status: Optional[str] = None):
+async def get_reports(response: Response, status: Optional[str] = None,
+                      limit: int = Query(REPORTS_PAGE_DEFAULT, ge=1, le=REPORTS_PAGE_MAX),
+                      after: Optional[str] = None, since: Optional[datetime] = None,
+                      until: Optional[datetime] = None):
+    """Newest reports first, one page at a time.
+
+    Pass the X-Next-Cursor header of a page as `after` to get the next one; the header
+    is absent on the last page. `since`/`until` bound created_at (naive times are UTC).
+    """
     try:
         query = {}
         if status:
             query['status'] = status
+        if since or until:
+            query['created_at'] = {}
+            if since:
+                query['created_at']['$gte'] = as_utc(since)
+            if until:
+                query['created_at']['$lt'] = as_utc(until)
         
-        reports = await db.pollution_reports.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-        
-        for report in reports:
-            if isinstance(report['created_at'], str):
-                report['created_at'] = datetime.fromisoformat(report['created_at'])
-        
-        return reports
+        return await find_reports_page(query, response, limit, after)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching reports: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to fetch reports")
 
+@api_router.get("/reports/near", response_model=List[PollutionReport])
+async def get_reports_near(response: Response, lat: float = Query(ge=-90, le=90), lng: float = Query(ge=-180, le=180),
+                           radius_m: float = Query(1000, gt=0, le=REPORTS_NEAR_MAX_RADIUS_M),
+                           status: Optional[str] = None,
+                           limit: int = Query(REPORTS_PAGE_DEFAULT, ge=1, le=REPORTS_PAGE_MAX),
+                           after: Optional[str] = None):
+    """Reports within `radius_m` metres of a point, newest first, paginated like /reports"""
+    try:
+        return await find_reports_in_area(near_filter(lat, lng, radius_m), status, response, limit, after)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching nearby reports: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch reports")
+
+@api_router.get("/reports/within", response_model=List[PollutionReport])
+async def get_reports_within(response: Response, bbox: Optional[str] = None, polygon: Optional[str] = None,
+                             status: Optional[str] = None,
+                             limit: int = Query(REPORTS_PAGE_DEFAULT, ge=1, le=REPORTS_PAGE_MAX),
+                             after: Optional[str] = None):
+    """Reports inside a map viewport, newest first, paginated like /reports.
+
+    Pass either `bbox=min_lng,min_lat,max_lng,max_lat` or `polygon=lng,lat;lng,lat;...`.
+    """
+    try:
+        if (bbox is None) == (polygon is None):
+            raise HTTPException(status_code=400, detail="Pass exactly one of bbox or polygon")
+        try:
+            if bbox is not None:
+                geometry = bbox_polygon(parse_bbox(bbox))
+            else:
+                geometry = {"type": "Polygon", "coordinates": [parse_polygon(polygon)]}
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid area: {str(e)}")
+        
+        return await find_reports_in_area(within_filter(geometry), status, response, limit, after)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching reports in area: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch reports")
+
+@api_router.get("/reports/clusters", response_model=ReportClustersResponse)
+async def get_report_clusters(bbox: str, zoom: int = Query(ge=0, le=22)):
+    """Reports in a map viewport grouped into grid cells: count, centroid, mean severity and
+    status breakdown per cell, read from counters kept current on every report write.
+
+    Cells are a quarter of a map tile wide at `zoom` (clamped to the counter levels).
+    """
+    try:
+        try:
+            area = parse_bbox(bbox)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid area: {str(e)}")
+        
+        level = cluster_level(zoom)
+        clusters = await db.report_clusters.aggregate(clusters_pipeline(area, level)).to_list(None)
+        return ReportClustersResponse(
+            zoom=zoom,
+            level=level,
+            cell_deg=cell_size(level),
+            total=sum(cluster['count'] for cluster in clusters),
+            clusters=clusters
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error fetching report clusters: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to fetch report clusters")
+
+@api_router.get("/reports/summary", response_model=ReportSummaryResponse)
+async def get_report_summary():
+    """Report counts, in total and per status, for dashboards that page through the list.
+
+    Sorting on status first lets Mongo count from the status_created_at_id index alone
+    without reading a single report.
+    """
+    try:
+        counts = await db.pollution_reports.aggregate([
+            {"$sort": {"status": 1}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(None)
+        # Keyed like the /reports/clusters breakdown: unusual statuses count as 'other'
+        status = {}
+        for row in counts:
+            key = status_key(row['_id'])
+            status[key] = status.get(key, 0) + row['count']
+        return ReportSummaryResponse(total=sum(status.values()), status=status)
+    except Exception as e:
+        logger.error(f"Error summarizing reports: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to summarize reports")
+
+@api_router.patch("/reports/status", response_model=BulkStatusResponse)
+async def update_reports_status(update: BulkStatusUpdate):
+    """Set the status of many reports at once and notify each reporter whose report changed"""
+    try:
+        ids = list(dict.fromkeys(update.ids))
+        reports = await db.pollution_reports.find(
+            {"id": {"$in": ids}}, {"_id": 0, "id": 1, "name": 1, "email": 1, "status": 1, "latitude": 1, "longitude": 1}
+        ).to_list(len(ids))
+        found = {report['id']: report for report in reports}
+        
+        results = {}
+        to_update = []
+        for report_id in ids:
+            report = found.get(report_id)
+            if report is None:
+                results[report_id] = BulkStatusResult(id=report_id, result="not_found")
+            elif report['status'] == update.status:
+                results[report_id] = BulkStatusResult(id=report_id, result="unchanged")
+            else:
+                to_update.append(report_id)
+        
+        errors = {}
+        written = set()
+        if to_update:
+            # Each write applies only while the report still has the status read above, and
+            # tags it with this request's token, so the writes that matched can be found again
+            token = str(uuid.uuid4())
+            try:
+                result = await db.pollution_reports.bulk_write([
+                    UpdateOne({"id": report_id, "status": found[report_id]['status']},
+                              {"$set": {"status": update.status, "status_write": token}})
+                    for report_id in to_update
+                ], ordered=False)
+                matched = result.matched_count
+            except BulkWriteError as e:
+                errors = {to_update[error['index']]: error.get('errmsg', 'write failed')
+                          for error in e.details.get('writeErrors', [])}
+                matched = e.details.get('nMatched', 0)
+            written = {report['id'] for report in await db.pollution_reports.find(
+                {"id": {"$in": to_update}, "status_write": token}, {"_id": 0, "id": 1}
+            ).to_list(len(to_update))}
+            if len(written) < matched:
+                logger.warning(f"⚠️  {matched - len(written)} status writes were overwritten before they could be "
+                               f"counted; report cluster counters are off until the next rebuild")
+        
+        for report_id in to_update:
+            if report_id in written:
+                results[report_id] = BulkStatusResult(id=report_id, result="updated")
+            else:
+                error = errors.get(report_id, "Status changed concurrently")
+                results[report_id] = BulkStatusResult(id=report_id, result="failed", error=error)
+        
+        updated = [report_id for report_id in to_update if report_id in written]
+        await update_cluster_counters(cell_deltas([found[report_id] for report_id in updated], status_to=update.status))
+        await email_outbox.enqueue_many([
+            (found[report_id]['email'], *status_update_email(found[report_id]['name'], report_id, update.status))
+            for report_id in updated
+        ])
+        
+        counts = {"updated": 0, "unchanged": 0, "not_found": 0, "failed": 0}
+        for result in results.values():
+            counts[result.result] += 1
+        return BulkStatusResponse(status=update.status, results=[results[report_id] for report_id in ids], **counts)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error updating statuses: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to update statuses")
+
 @api_router.patch("/reports/{report_id}/status")
 async def update_report_status(report_id: str, status_update: StatusUpdate):
     try:
-        report = await db.pollution_reports.find_one({"id": report_id}, {"_id": 0})
+        # Read and write in one step: the counter delta is computed from the status this
+        # write replaced, even when another status change lands at the same time
+        report = await db.pollution_reports.find_one_and_update(
+            {"id": report_id},
+            {"$set": {"status": status_update.status}},
+            projection={"_id": 0},
+            return_document=ReturnDocument.BEFORE
+        )
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
         
-        await db.pollution_reports.update_one(
-            {"id": report_id},
-            {"$set": {"status": status_update.status}}
-        )
+        await update_cluster_counters(cell_deltas([report], status_to=status_update.status))
         
-        await send_status_update(
+        await email_outbox.enqueue(
             report['email'],
-            report['name'],
-            report_id,
-            status_update.status
+            *status_update_email(report['name'], report_id, status_update.status)
         )
         
         return {"message": "Status updated successfully"}
@@ -371,31 +881,54 @@ async def update_report_status(report_id: str, status_update: StatusUpdate):
         logger.error(f"Error updating status: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to update status")
 
+def route_recommendation(cleanest: dict, fastest: Optional[dict]) -> str:
+    avg_aqi = cleanest['avg_aqi']
+    recommendation = "Moderate pollution levels along route. Consider using public transport."
+    if avg_aqi > 200:
+        recommendation = "High pollution levels. Wear N95 mask and avoid peak traffic hours."
+    elif avg_aqi < 100:
+        recommendation = "Good air quality along route. Safe for travel."
+    
+    if fastest is None:
+        return recommendation
+    if fastest['avg_aqi'] - avg_aqi >= 1:
+        extra_min = max(cleanest['duration_min'] - fastest['duration_min'], 0)
+        recommendation += (f" The cleanest route averages AQI {avg_aqi:.0f} against {fastest['avg_aqi']:.0f} "
+                           f"on the fastest, for {extra_min:.0f} more minutes.")
+    else:
+        recommendation += " The fastest route is also the cleanest."
+    return recommendation
+
 @api_router.post("/routes/safe", response_model=SafeRouteResponse)
 async def calculate_safe_route(route_req: SafeRouteRequest):
+    """Cleanest and fastest driving routes on the local road graph, scored against the AQI raster.
+    Until a road graph is built the straight line is scored instead, with road_graph false."""
     try:
-        mid_lat = (route_req.start_lat + route_req.end_lat) / 2
-        mid_lng = (route_req.start_lng + route_req.end_lng) / 2
-        
-        route_points = [
-            {"lat": route_req.start_lat, "lng": route_req.start_lng, "aqi": 165},
-            {"lat": mid_lat, "lng": mid_lng, "aqi": 140},
-            {"lat": route_req.end_lat, "lng": route_req.end_lng, "aqi": 155}
-        ]
-        
-        avg_aqi = sum(p['aqi'] for p in route_points) / len(route_points)
+        raster = await current_raster()
         
-        recommendation = "Moderate pollution levels along route. Consider using public transport."
-        if avg_aqi > 200:
-            recommendation = "High pollution levels. Wear N95 mask and avoid peak traffic hours."
-        elif avg_aqi < 100:
-            recommendation = "Good air quality along route. Safe for travel."
+        start, end = (route_req.start_lat, route_req.start_lng), (route_req.end_lat, route_req.end_lng)
+        on_roads = route_planner.ready
+        if on_roads:
+            plan = await route_planner.plan(raster, start, end)
+        else:
+            plan = await route_planner.straight(raster, start, end)
+        if plan is None:
+            raise HTTPException(status_code=404, detail="No route between these points")
         
+        cleanest, fastest = plan['cleanest'], plan['fastest']
         return SafeRouteResponse(
-            route_points=route_points,
-            avg_aqi=round(avg_aqi, 1),
-            recommendation=recommendation
+            route_points=cleanest['route_points'],
+            avg_aqi=cleanest['avg_aqi'],
+            recommendation=route_recommendation(cleanest, fastest if on_roads else None),
+            cleanest=RouteOption(**cleanest),
+            fastest=RouteOption(**fastest),
+            planning_ms=plan['planning_ms'],
+            road_graph=on_roads
         )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid route: {str(e)}")
     except Exception as e:
         logger.error(f"Error calculating route: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to calculate route")
@@ -577,97 +1110,114 @@ async def get_seasonal_outlook() -> SeasonalOutlook:
     outlook = forecaster.get_seasonal_outlook()
     return SeasonalOutlook(**outlook)
 
-async def get_gemini_response(prompt: str, fallback: str = "Analysis unavailable") -> str:
-    """Helper function to get Gemini AI response with fallback"""
-    if not GEMINI_API_KEY:
-        return fallback
-    
-    try:
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        logger.error(f"Gemini API error: {str(e)}")
-        return fallback
+async def get_gemini_response(prompt: str, fallback="Analysis unavailable", cache_key: tuple = None, parse=None):
+    """Helper function to get Gemini AI response with fallback (timeout, cache and concurrency cap in utils.gemini_gateway)"""
+    return await gemini_gateway.generate(prompt, key=cache_key, parse=parse, fallback=fallback)
+
+def parse_recommendations(ai_response: str) -> Optional[List[Recommendation]]:
+    """Recommendations from the JSON array in a Gemini answer, or None"""
+    if "{" not in ai_response:
+        return None
+    json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
+    if not json_match:
+        return None
+    return [Recommendation(**rec) for rec in json.loads(json_match.group())] or None
+
+def parse_insights(ai_response: str) -> Optional[List[str]]:
+    """Up to six bullet-point insights from a Gemini answer, or None"""
+    lines = [line.strip() for line in ai_response.split('\n') if line.strip()]
+    return [line.lstrip('•-*123456789. ') for line in lines[:6] if len(line) > 10] or None
+
+def render_heatmap(raster: AQIRaster) -> bytes:
+    """HeatmapResponse body for a raster: its cell centres, thinned to AQI_HEATMAP_MAX_POINTS"""
+    rows, cols = raster.shape
+    step = max(1, math.ceil(math.sqrt(rows * cols / AQI_HEATMAP_MAX_POINTS)))
+    lats, lngs = raster.cell_centers()
+    values = raster.values[::step, ::step]
+    points = [
+        HeatmapPoint(
+            lat=round(float(lat), 5),
+            lng=round(float(lng), 5),
+            intensity=round(min(max(float(aqi) / 500.0, 0.0), 1.0), 4),
+            aqi=round(float(aqi), 1),
+            category=aqi_category(float(aqi))
+        )
+        for lat, row in zip(lats[::step], values)
+        for lng, aqi in zip(lngs[::step], row)
+    ]
+    return HeatmapResponse(
+        points=points,
+        timestamp=raster.computed_at,
+        prediction_type="idw_interpolation",
+        model_version="heatmap_idw_v2.0"
+    ).model_dump_json().encode()
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match check; weak comparison, as RFC 9110 prescribes for this header"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in if_none_match.split(','))
+
+async def current_raster() -> AQIRaster:
+    raster = await aqi_raster.get(aqi_ingester.current)
+    if raster is None:
+        raise HTTPException(status_code=503, detail="Heatmap not available yet, no station readings")
+    return raster
 
 @api_router.get("/aqi/heatmap", response_model=HeatmapResponse)
-async def get_aqi_heatmap():
-    """Get pollution heatmap data for Delhi NCR region"""
+async def get_aqi_heatmap(if_none_match: Optional[str] = Header(None)):
+    """AQI over Delhi NCR, interpolated from all station readings once per ingestion cycle"""
     try:
-        # Get current AQI for base intensity
-        aqi_data = await get_current_aqi()
-        base_aqi = aqi_data.aqi
-        
-        # Generate grid of points around Delhi NCR
-        # Delhi center: 28.6139°N, 77.2090°E
-        center_lat, center_lng = 28.6139, 77.2090
-        points = []
-        
-        # Create a grid with varying intensities simulating pollution hotspots
-        import random
-        random.seed(42)  # For consistent simulation
-        
-        # Define known pollution hotspots
-        hotspots = [
-            {"lat": 28.7041, "lng": 77.1025, "name": "Rohini"},  # High traffic
-            {"lat": 28.5355, "lng": 77.3910, "name": "Noida"},   # Industrial
-            {"lat": 28.4595, "lng": 77.0266, "name": "Gurugram"}, # Commercial
-            {"lat": 28.6517, "lng": 77.2219, "name": "Connaught Place"}, # Central
-            {"lat": 28.5244, "lng": 77.1855, "name": "Nehru Place"}, # Traffic junction
-        ]
-        
-        # Generate heatmap points
-        for hotspot in hotspots:
-            # Add main hotspot point
-            intensity = base_aqi + random.uniform(10, 50)
-            category = "Unhealthy" if intensity > 150 else "Moderate" if intensity > 100 else "Good"
-            
-            points.append(HeatmapPoint(
-                lat=hotspot["lat"],
-                lng=hotspot["lng"],
-                intensity=min(intensity / 500.0, 1.0),  # Normalize to 0-1
-                aqi=round(intensity, 1),
-                category=category
-            ))
-            
-            # Add surrounding points with decreasing intensity
-            for i in range(8):
-                angle = i * 45 * 3.14159 / 180  # Convert to radians
-                distance = random.uniform(0.02, 0.05)  # 2-5 km radius
-                
-                lat_offset = distance * random.uniform(0.8, 1.2)
-                lng_offset = distance * random.uniform(0.8, 1.2)
-                
-                surrounding_aqi = base_aqi + random.uniform(-20, 30)
-                surrounding_intensity = max(0.1, min(surrounding_aqi / 500.0, 1.0))
-                category = "Hazardous" if surrounding_aqi > 300 else "Very Unhealthy" if surrounding_aqi > 200 else "Unhealthy" if surrounding_aqi > 150 else "Moderate"
-                
-                points.append(HeatmapPoint(
-                    lat=hotspot["lat"] + lat_offset * (1 if i < 4 else -1),
-                    lng=hotspot["lng"] + lng_offset * (1 if i % 2 == 0 else -1),
-                    intensity=surrounding_intensity,
-                    aqi=round(surrounding_aqi, 1),
-                    category=category
-                ))
-        
-        return HeatmapResponse(
-            points=points,
-            timestamp=datetime.now(timezone.utc),
-            prediction_type="simulation",
-            model_version="heatmap_v1.0"
-        )
+        raster = await current_raster()
+        headers = {"ETag": f'"{raster.etag}-json"', "Cache-Control": f"public, max-age={heatmap_tiles.max_age}"}
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        return Response(content=await raster.rendered("heatmap", render_heatmap), media_type="application/json",
+                        headers=headers)
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating heatmap: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate heatmap")
 
-@api_router.get("/recommendations", response_model=RecommendationsResponse)
-async def get_recommendations(user_type: str = "citizen"):
-    """Get AI-powered recommendations based on user type and current conditions"""
+@api_router.get("/aqi/heatmap/tiles/{z}/{x}/{y}")
+async def get_aqi_heatmap_tile(z: int, x: int, y: int, fmt: str = Query("png", alias="format"),
+                               if_none_match: Optional[str] = Header(None)):
+    """One 256 px XYZ tile of the AQI raster.
+
+    `format`: `png` (AQI band colours), `u8` (aqi = (v - 1) * 2, 0 = no data) or `f32`
+    (float32 little-endian, NaN = no data), both row-major from the north-west corner.
+    The ETag changes only with the raster; a matching If-None-Match gets a 304.
+    """
     try:
-        # Get current data
-        aqi_data = await get_current_aqi()
-        forecast_data = await get_forecast()
-        source_data = await get_pollution_sources()
+        if fmt not in TILE_FORMATS:
+            raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(TILE_FORMATS)}")
+        if not (0 <= z <= heatmap_tiles.max_zoom and 0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise HTTPException(status_code=404, detail="Tile out of range")
+        
+        raster = await current_raster()
+        headers = {"ETag": heatmap_tiles.etag(raster, z, x, y, fmt),
+                   "Cache-Control": f"public, max-age={heatmap_tiles.max_age}"}
+        if etag_matches(if_none_match, headers["ETag"]):
+            heatmap_tiles.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(content=await heatmap_tiles.get(raster, z, x, y, fmt), media_type=TILE_FORMATS[fmt],
+                        headers=headers)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error rendering heatmap tile {z}/{x}/{y}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to render heatmap tile")
+
+async def build_recommendations(ctx: RequestContext, user_type: str) -> RecommendationsResponse:
+    """Build AI-powered recommendations for a user type from the context's snapshot"""
+    try:
+        # Get current data (one shared WAQI fetch; forecast and sources run concurrently)
+        aqi_data, forecast_data, source_data = await asyncio.gather(
+            ctx.aqi(), ctx.forecast(), ctx.sources()
+        )
         
         current_aqi = aqi_data.aqi
         trend = forecast_data.trend
@@ -687,22 +1237,16 @@ Generate 4-5 specific, actionable health and safety recommendations. Each recomm
 
 Format as JSON array with: title, description, priority (high/medium/low), icon (emoji)"""
 
-            ai_response = await get_gemini_response(prompt, "")
-            
-            # Parse AI response or use fallback
-            if ai_response and "{" in ai_response:
-                try:
-                    import json
-                    import re
-                    json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
-                    if json_match:
-                        parsed = json.loads(json_match.group())
-                        recommendations = [Recommendation(**rec) for rec in parsed]
-                except:
-                    pass
+            # Answers are cached per AQI band, trend and dominant source, already parsed
+            recommendations = await get_gemini_response(
+                prompt, [],
+                cache_key=("recommendations", user_type, aqi_data.category, trend, dominant_source),
+                parse=parse_recommendations
+            )
             
             # Fallback recommendations
             if not recommendations:
+                ctx.fallback = True
                 if current_aqi > 200:
                     recommendations = [
                         Recommendation(
@@ -799,21 +1343,16 @@ Generate 4-5 specific policy recommendations with:
 
 Format as JSON array with: title, description, priority, icon"""
 
-            ai_response = await get_gemini_response(prompt, "")
-            
-            if ai_response and "{" in ai_response:
-                try:
-                    import json
-                    import re
-                    json_match = re.search(r'\[.*\]', ai_response, re.DOTALL)
-                    if json_match:
-                        parsed = json.loads(json_match.group())
-                        recommendations = [Recommendation(**rec) for rec in parsed]
-                except:
-                    pass
+            recommendations = await get_gemini_response(
+                prompt, [],
+                cache_key=("recommendations", user_type, aqi_data.category,
+                           aqi_category(forecast_data.aqi_72h), trend, dominant_source),
+                parse=parse_recommendations
+            )
             
             # Fallback policy recommendations
             if not recommendations:
+                ctx.fallback = True
                 if current_aqi > 200 or forecast_data.aqi_48h > 200:
                     recommendations = [
                         Recommendation(
@@ -882,21 +1421,29 @@ Format as JSON array with: title, description, priority, icon"""
             current_aqi=current_aqi,
             recommendations=recommendations,
             context=context,
-            prediction_type="ai_enhanced" if GEMINI_API_KEY else "simulation",
+            prediction_type="ai_enhanced" if gemini_gateway.enabled else "simulation",
             model_version="recommendations_v1.0",
             generated_at=datetime.now(timezone.utc)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating recommendations: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate recommendations")
 
+@api_router.get("/recommendations", response_model=RecommendationsResponse)
+async def get_recommendations(user_type: str = "citizen", ctx: RequestContext = Depends(get_request_context)):
+    """Get AI-powered recommendations based on user type and current conditions"""
+    if user_type in MATERIALIZED_USER_TYPES and ctx.snapshot is not None:
+        return Response(content=await materializer.get(f"recommendations:{user_type}"), media_type="application/json")
+    return await build_recommendations(ctx, user_type)
+
 @api_router.get("/alerts", response_model=AlertsResponse)
-async def get_forecast_alerts():
+async def get_forecast_alerts(ctx: RequestContext = Depends(get_request_context)):
     """Generate alerts based on 48-72h forecast analysis"""
     try:
-        forecast_data = await get_forecast()
-        aqi_data = await get_current_aqi()
+        forecast_data, aqi_data = await asyncio.gather(ctx.forecast(), ctx.aqi())
         
         alerts = []
         alert_id_counter = 1
@@ -986,18 +1533,19 @@ async def get_forecast_alerts():
             generated_at=datetime.now(timezone.utc)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating alerts: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate alerts")
 
-@api_router.get("/insights/summary", response_model=InsightsSummaryResponse)
-async def get_insights_summary():
-    """Generate AI-powered analytical insights summary"""
+async def build_insights_summary(ctx: RequestContext) -> InsightsSummaryResponse:
+    """Build the AI-powered analytical insights summary from the context's snapshot"""
     try:
-        # Gather all relevant data
-        aqi_data = await get_current_aqi()
-        forecast_data = await get_forecast()
-        source_data = await get_pollution_sources()
+        # Gather all relevant data (one shared WAQI fetch; forecast and sources run concurrently)
+        aqi_data, forecast_data, source_data = await asyncio.gather(
+            ctx.aqi(), ctx.forecast(), ctx.sources()
+        )
         
         current_aqi = aqi_data.aqi
         trend = forecast_data.trend
@@ -1023,16 +1571,16 @@ Generate concise, data-driven insights about:
 
 Return as simple bullet points (3-5 words each), no formatting."""
 
-        ai_insights = await get_gemini_response(prompt, "")
-        
-        key_insights = []
-        if ai_insights:
-            # Parse insights from AI response
-            lines = [line.strip() for line in ai_insights.split('\n') if line.strip()]
-            key_insights = [line.lstrip('•-*123456789. ') for line in lines[:6] if len(line) > 10]
+        # Answers are cached per AQI band, forecast band, trend and dominant source, already parsed
+        key_insights = await get_gemini_response(
+            prompt, [],
+            cache_key=("insights", aqi_data.category, aqi_category(forecast_data.aqi_72h), trend, dominant_source),
+            parse=parse_insights
+        )
         
         # Fallback insights
         if not key_insights:
+            ctx.fallback = True
             key_insights = [
                 f"Current AQI at {int(current_aqi)} - {aqi_data.category} level",
                 f"{dominant_source.replace('_', ' ').title()} is the primary pollution source ({int(source_data.contributions.get(dominant_source, 0))}%)",
@@ -1070,16 +1618,107 @@ Return as simple bullet points (3-5 words each), no formatting."""
             trend=trend.title(),
             forecast_summary=forecast_summary,
             recommendation=recommendation,
-            prediction_type="ai_enhanced" if GEMINI_API_KEY else "simulation",
+            prediction_type="ai_enhanced" if gemini_gateway.enabled else "simulation",
             model_version="insights_v1.0",
             confidence=forecast_data.confidence,
             generated_at=datetime.now(timezone.utc)
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error generating insights: {str(e)}")
         raise HTTPException(status_code=500, detail="Failed to generate insights summary")
 
+@api_router.get("/insights/summary", response_model=InsightsSummaryResponse)
+async def get_insights_summary(ctx: RequestContext = Depends(get_request_context)):
+    """Generate AI-powered analytical insights summary"""
+    if ctx.snapshot is not None:
+        return Response(content=await materializer.get("insights"), media_type="application/json")
+    return await build_insights_summary(ctx)
+
+def materialized_generation() -> tuple:
+    """Everything the pre-rendered views depend on besides wall-clock time"""
+    snapshot = aqi_ingester.current
+    return (
+        snapshot.version if snapshot else None,
+        forecaster.model_version,
+        attribution_model.model_version,
+        gemini_gateway.enabled,
+        feature_hour()  # forecast and attribution features use the local hour
+    )
+
+def register_materialized_views():
+    """Pre-render /recommendations per user type and /insights/summary on every snapshot"""
+    async def render(build):
+        ctx = RequestContext()
+        response = await build(ctx)
+        # A fallback stands in for a failed Gemini call: kept briefly, then Gemini is asked
+        # again. With Gemini disabled the fallback is the answer for the whole generation.
+        return response.model_dump_json().encode(), not (ctx.fallback and gemini_gateway.enabled)
+    
+    for user_type in MATERIALIZED_USER_TYPES:
+        materializer.register(
+            f"recommendations:{user_type}",
+            lambda user_type=user_type: render(lambda ctx: build_recommendations(ctx, user_type))
+        )
+    materializer.register("insights", lambda: render(build_insights_summary))
+    materializer.generation = materialized_generation
+
+register_materialized_views()
+
+@api_router.get("/health/live")
+async def health_live():
+    """Liveness probe: the process is up and serving the event loop"""
+    return {"status": "alive"}
+
+@api_router.get("/health/ready")
+async def health_ready():
+    """Readiness probe: 200 once background model loading has finished, 503 before"""
+    status = model_registry.stats()
+    status["status"] = "ready" if model_registry.ready else "not_ready"
+    status["snapshot_version"] = aqi_ingester.current.version if aqi_ingester.current else None
+    return JSONResponse(status_code=200 if model_registry.ready else 503, content=status)
+
+@api_router.post("/models/reload")
+async def reload_models():
+    """Reload model files from disk and atomically swap in any new version"""
+    try:
+        return {"models": await model_registry.reload()}
+    except Exception as e:
+        logger.error(f"Error reloading models: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to reload models")
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Runtime counters for upstream caches and workers"""
+    return {
+        "waqi": waqi_client.stats(),
+        "ingestion": aqi_ingester.stats(),
+        "stations": station_ingester.stats(),
+        "aqi_history": aqi_history.stats(),
+        "inference": inference_executor.stats(),
+        "batching": {
+            "forecast": forecast_batcher.stats(),
+            "attribution": attribution_batcher.stats()
+        },
+        "forecast_cache": forecast_cache.stats(),
+        "gemini": gemini_gateway.stats(),
+        "materializer": materializer.stats(),
+        "aqi_raster": aqi_raster.stats(),
+        "heatmap_tiles": heatmap_tiles.stats(),
+        "routes": route_planner.stats(),
+        "models": model_registry.stats(),
+        "email_outbox": await email_outbox.stats(),
+        "smtp": smtp_pool.stats(),
+        "memory": process_memory()
+    }
+
+@api_router.get("/metrics/memory")
+async def get_memory_metrics():
+    """RSS/USS of this worker and, under gunicorn, of the master and every sibling worker"""
+    return await asyncio.to_thread(worker_memory_report)
+
 @api_router.get("/model/transparency", response_model=TransparencyInfo)
 async def get_model_transparency():
     """Provide transparency information about data sources and models"""
@@ -1093,7 +1732,7 @@ async def get_model_transparency():
         current_version = "v2.0 - Trained ML models on historical data (2015-2025)"
         limitations = [
             "Model predictions based on historical patterns - extreme weather events may affect accuracy",
-            "AQI memory features use current AQI as proxy (sliding window not yet implemented)",
+            "AQI memory features come from ingested hourly history; gaps fall back to the current AQI",
             "Source attribution trained on labeled Delhi NCR data",
             "Real-time data depends on WAQI API availability",
             "Ensemble predictions provide confidence intervals"
@@ -1189,14 +1828,51 @@ app.add_middleware(
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+async def check_report_dates():
+    """Warn when reports still hold string dates, which page after every dated report"""
+    try:
+        legacy = await db.pollution_reports.count_documents({"created_at": {"$type": "string"}}, limit=1)
+    except Exception as e:
+        logger.warning(f"⚠️  Could not check report dates: {str(e)}")
+        return
+    if legacy:
+        logger.warning("⚠️  Reports with string created_at found; run migrations/migrate_report_dates.py")
+
 @app.on_event("startup")
 async def startup_db():
     """Initialize database on startup"""
     init_db()
     logger.info("✅ Database initialized")
+    # Indexes before serving, so listings and area queries start on them; bounded, so an
+    # unreachable Mongo does not hold up startup (the build then finishes in the background)
+    indexes = asyncio.ensure_future(ensure_report_indexes())
+    try:
+        await asyncio.wait_for(asyncio.shield(indexes), REPORT_INDEX_WAIT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning(f"⚠️  Report indexes not ready after {REPORT_INDEX_WAIT_SECONDS:.0f}s; "
+                       f"still building in the background")
+    await check_report_dates()
+    aqi_history.backfill(await asyncio.to_thread(aqi_ingester.load_history, aqi_history.capacity))
+    aqi_ingester.add_listener(aqi_history.observe_snapshot)
+    aqi_ingester.add_listener(forecast_cache.on_snapshot)
+    aqi_ingester.add_listener(materializer.on_snapshot)
+    aqi_ingester.add_listener(station_ingester.on_snapshot)
+    station_ingester.add_listener(aqi_raster.on_stations)
+    await station_ingester.start()
+    await aqi_ingester.start()
+    await asyncio.to_thread(route_planner.load)
+    model_registry.start()
+    email_outbox.start(db.email_outbox)
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await email_outbox.stop()
+    await smtp_pool.close()
     client.close()
+    await model_registry.stop()
+    await aqi_ingester.stop()
+    await waqi_client.close()
+    inference_executor.shutdown()
@@ -0,0 +1,207 @@
+import os
+import json
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone, timedelta
+from typing import Optional
+
+from database import SessionLocal, AQISnapshotDB
+from utils.waqi_client import waqi_client
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AQISnapshot:
+    """One published WAQI reading. Treat `data` as read-only: it is shared by every request."""
+    version: int
+    station: str
+    data: dict
+    fetched_at: datetime
+    source: str = "live"
+
+    @property
+    def aqi(self) -> Optional[float]:
+        try:
+            return float(self.data.get('aqi'))
+        except (TypeError, ValueError):
+            return None
+
+    def age_seconds(self) -> float:
+        return (datetime.now(timezone.utc) - self.fetched_at).total_seconds()
+
+
+class AQIIngester:
+    """Polls WAQI in the background and publishes the latest feed as an immutable snapshot.
+
+    Request handlers read `current` (a plain attribute lookup) instead of calling WAQI.
+    Every snapshot is also written to SQLite so a restarted worker starts warm.
+    """
+
+    def __init__(self, station: str = 'delhi'):
+        self.station = station
+        self.interval = float(os.environ.get('AQI_INGEST_INTERVAL_SECONDS', '300'))
+        self.retention_hours = int(os.environ.get('AQI_SNAPSHOT_RETENTION_HOURS', '168'))
+        self.enabled = os.environ.get('AQI_INGEST_ENABLED', 'true').lower() == 'true'
+
+        self.current: Optional[AQISnapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self._listeners = []
+
+        self.refresh_count = 0
+        self.failure_count = 0
+        self.last_error: Optional[str] = None
+
+    def add_listener(self, callback):
+        """Register a callable (sync or async) invoked with each newly published snapshot"""
+        self._listeners.append(callback)
+
+    async def start(self):
+        """Restore the persisted snapshot, then launch the polling loop"""
+        persisted = await asyncio.to_thread(self._load_persisted)
+        if persisted is not None and self.current is None:
+            await self._publish(persisted)
+            logger.info(f"✅ Restored AQI snapshot v{persisted.version} (AQI {persisted.aqi}, "
+                        f"{int(persisted.age_seconds())}s old)")
+
+        if self.enabled and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._run())
+            logger.info(f"✅ AQI ingester started (every {int(self.interval)}s)")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"AQI ingestion error: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> Optional[AQISnapshot]:
+        """Fetch a fresh feed, publish it and persist it. Returns the new snapshot or None."""
+        path = f"feed/{self.station}"
+        waqi_client.invalidate(path)
+        data = await waqi_client.fetch(path)
+        self.refresh_count += 1
+
+        if not data or data.get('aqi') in (None, '-'):
+            self.failure_count += 1
+            self.last_error = "WAQI feed unavailable"
+            logger.warning(f"⚠️  AQI ingestion failed for {self.station}; keeping snapshot "
+                           f"v{self.current.version if self.current else 0}")
+            return None
+
+        version = (self.current.version if self.current else 0) + 1
+        snapshot = AQISnapshot(
+            version=version,
+            station=self.station,
+            data=data,
+            fetched_at=datetime.now(timezone.utc)
+        )
+        self.last_error = None
+        await self._publish(snapshot)
+
+        try:
+            await asyncio.to_thread(self._persist, snapshot)
+        except Exception as e:
+            logger.error(f"Error persisting AQI snapshot: {str(e)}")
+
+        return snapshot
+
+    async def _publish(self, snapshot: AQISnapshot):
+        # Single reference assignment: readers see either the old or the new snapshot
+        self.current = snapshot
+        for callback in self._listeners:
+            try:
+                result = callback(snapshot)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"AQI snapshot listener error: {str(e)}")
+
+    def _persist(self, snapshot: AQISnapshot):
+        fetched_at = snapshot.fetched_at.astimezone(timezone.utc).replace(tzinfo=None)
+        session = SessionLocal()
+        try:
+            session.add(AQISnapshotDB(
+                version=snapshot.version,
+                station=snapshot.station,
+                aqi=snapshot.aqi,
+                payload=json.dumps(snapshot.data),
+                fetched_at=fetched_at
+            ))
+            cutoff = fetched_at - timedelta(hours=self.retention_hours)
+            session.query(AQISnapshotDB).filter(AQISnapshotDB.fetched_at < cutoff).delete()
+            session.commit()
+        finally:
+            session.close()
+
+    def _load_persisted(self) -> Optional[AQISnapshot]:
+        session = SessionLocal()
+        try:
+            row = (
+                session.query(AQISnapshotDB)
+                .filter(AQISnapshotDB.station == self.station)
+                .order_by(AQISnapshotDB.fetched_at.desc())
+                .first()
+            )
+            if row is None:
+                return None
+            return AQISnapshot(
+                version=row.version,
+                station=row.station,
+                data=json.loads(row.payload),
+                fetched_at=row.fetched_at.replace(tzinfo=timezone.utc),
+                source="persisted"
+            )
+        except Exception as e:
+            logger.error(f"Error loading persisted AQI snapshot: {str(e)}")
+            return None
+        finally:
+            session.close()
+
+    def load_history(self, hours: int = 72) -> list:
+        """Persisted (payload, fetched_at) pairs from the last `hours`, oldest first"""
+        session = SessionLocal()
+        try:
+            cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(hours=hours)
+            rows = (
+                session.query(AQISnapshotDB.payload, AQISnapshotDB.fetched_at)
+                .filter(AQISnapshotDB.fetched_at >= cutoff)
+                .order_by(AQISnapshotDB.fetched_at.asc())
+                .all()
+            )
+            return [(json.loads(payload), fetched_at.replace(tzinfo=timezone.utc)) for payload, fetched_at in rows]
+        except Exception as e:
+            logger.error(f"Error loading AQI history: {str(e)}")
+            return []
+        finally:
+            session.close()
+
+    def stats(self) -> dict:
+        snapshot = self.current
+        return {
+            'enabled': self.enabled,
+            'running': self._task is not None and not self._task.done(),
+            'interval_seconds': self.interval,
+            'version': snapshot.version if snapshot else 0,
+            'source': snapshot.source if snapshot else None,
+            'age_seconds': round(snapshot.age_seconds(), 1) if snapshot else None,
+            'refresh_count': self.refresh_count,
+            'failure_count': self.failure_count,
+            'last_error': self.last_error
+        }
+
+
+aqi_ingester = AQIIngester()
@@ -0,0 +1,250 @@
+import os
+import math
+import time
+import hashlib
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from utils.station_ingester import station_ingester, NCR_BOUNDS, parse_bounds
+
+logger = logging.getLogger(__name__)
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LNG = 111.320
+# Grid cells x stations handled per broadcast block (~32 MB of float64 weights)
+IDW_BLOCK_ELEMENTS = 4_000_000
+
+
+def idw_grid(lats: np.ndarray, lngs: np.ndarray, values: np.ndarray, bounds: tuple,
+             rows: int, cols: int, power: float = 2.0) -> np.ndarray:
+    """Inverse-distance-weighted AQI at the centre of every cell of a rows x cols grid.
+
+    Row 0 is the northern edge (image order). Distances are equirectangular km, exact
+    enough across a city; every cell weighs every station, computed by broadcasting the
+    cell coordinates against the station arrays a block of rows at a time. A cell centre
+    that coincides with a station takes the station's value.
+    """
+    min_lng, min_lat, max_lng, max_lat = bounds
+    lats, lngs, values = (np.asarray(a, dtype=np.float64) for a in (lats, lngs, values))
+    kx = KM_PER_DEG_LNG * math.cos(math.radians((min_lat + max_lat) / 2))
+
+    cell_lat = max_lat - (np.arange(rows) + 0.5) * (max_lat - min_lat) / rows
+    cell_lng = min_lng + (np.arange(cols) + 0.5) * (max_lng - min_lng) / cols
+    dx2 = ((cell_lng[:, None] - lngs[None, :]) * kx) ** 2           # (cols, stations)
+
+    grid = np.empty((rows, cols), dtype=np.float32)
+    block = max(1, IDW_BLOCK_ELEMENTS // max(1, cols * len(values)))
+    for start in range(0, rows, block):
+        dy2 = ((cell_lat[start:start + block, None] - lats[None, :]) * KM_PER_DEG_LAT) ** 2
+        d2 = dy2[:, None, :] + dx2[None, :, :]                       # (block, cols, stations)
+        exact = d2 < 1e-12
+        with np.errstate(divide='ignore'):
+            weights = d2 ** (-power / 2)
+        if exact.any():
+            hit = exact.any(axis=-1)
+            weights[hit] = exact[hit]
+        grid[start:start + block] = (weights @ values) / weights.sum(axis=-1)
+    return grid
+
+
+def _bilinear_axis(position: np.ndarray, n: int) -> tuple:
+    """Lower and upper cell index and the upper cell's weight along one raster axis"""
+    position = np.clip(position - 0.5, 0.0, n - 1.0)
+    low = np.minimum(position.astype(np.intp), max(n - 2, 0))
+    return low, np.minimum(low + 1, n - 1), (position - low).astype(np.float32)
+
+
+@dataclass(frozen=True)
+class AQIRaster:
+    """An interpolated AQI grid for one snapshot. `values` is shared by every request: read-only."""
+    version: int
+    bounds: tuple
+    values: np.ndarray
+    stations: int
+    computed_at: datetime
+    compute_ms: float
+    digest: str = ""
+    renders: dict = field(default_factory=dict, compare=False, repr=False)
+
+    @property
+    def shape(self) -> tuple:
+        return self.values.shape
+
+    @property
+    def etag(self) -> str:
+        """Snapshot version plus a hash of the values: equal only for identical rasters"""
+        return f"{self.version}-{self.digest}"
+
+    def cell_centers(self) -> tuple:
+        """(lats, lngs) of the row and column centres"""
+        min_lng, min_lat, max_lng, max_lat = self.bounds
+        rows, cols = self.shape
+        return (max_lat - (np.arange(rows) + 0.5) * (max_lat - min_lat) / rows,
+                min_lng + (np.arange(cols) + 0.5) * (max_lng - min_lng) / cols)
+
+    def sample(self, lat: float, lng: float) -> Optional[float]:
+        """Bilinear AQI at a point, None outside the grid"""
+        min_lng, min_lat, max_lng, max_lat = self.bounds
+        if not (min_lat <= lat <= max_lat and min_lng <= lng <= max_lng):
+            return None
+        rows, cols = self.shape
+        r = min(max((max_lat - lat) / (max_lat - min_lat) * rows - 0.5, 0.0), rows - 1.0)
+        c = min(max((lng - min_lng) / (max_lng - min_lng) * cols - 0.5, 0.0), cols - 1.0)
+        r0, c0 = min(int(r), rows - 2) if rows > 1 else 0, min(int(c), cols - 2) if cols > 1 else 0
+        r1, c1 = min(r0 + 1, rows - 1), min(c0 + 1, cols - 1)
+        fr, fc = r - r0, c - c0
+        v = self.values
+        return float((v[r0, c0] * (1 - fc) + v[r0, c1] * fc) * (1 - fr)
+                     + (v[r1, c0] * (1 - fc) + v[r1, c1] * fc) * fr)
+
+    def sample_grid(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Bilinear AQI on the lattice of `lats` (rows) x `lngs` (columns), NaN outside the grid.
+
+        Separable: the row and column weights are computed once per axis, then the four
+        neighbours are gathered for the whole lattice at once.
+        """
+        min_lng, min_lat, max_lng, max_lat = self.bounds
+        rows, cols = self.shape
+        lats, lngs = np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+        r0, r1, fr = _bilinear_axis((max_lat - lats) / (max_lat - min_lat) * rows, rows)
+        c0, c1, fc = _bilinear_axis((lngs - min_lng) / (max_lng - min_lng) * cols, cols)
+        v = self.values
+        top = v[r0][:, c0] * (1 - fc) + v[r0][:, c1] * fc
+        bottom = v[r1][:, c0] * (1 - fc) + v[r1][:, c1] * fc
+        grid = top * (1 - fr)[:, None] + bottom * fr[:, None]
+        outside = ((lats < min_lat) | (lats > max_lat))[:, None] | ((lngs < min_lng) | (lngs > max_lng))[None, :]
+        grid[outside] = np.nan
+        return grid
+
+    def sample_points(self, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+        """Bilinear AQI at each (lats[i], lngs[i]), NaN outside the grid"""
+        min_lng, min_lat, max_lng, max_lat = self.bounds
+        rows, cols = self.shape
+        lats, lngs = np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+        r0, r1, fr = _bilinear_axis((max_lat - lats) / (max_lat - min_lat) * rows, rows)
+        c0, c1, fc = _bilinear_axis((lngs - min_lng) / (max_lng - min_lng) * cols, cols)
+        v = self.values
+        points = ((v[r0, c0] * (1 - fc) + v[r0, c1] * fc) * (1 - fr)
+                  + (v[r1, c0] * (1 - fc) + v[r1, c1] * fc) * fr)
+        points[(lats < min_lat) | (lats > max_lat) | (lngs < min_lng) | (lngs > max_lng)] = np.nan
+        return points
+
+    async def rendered(self, key, render) -> bytes:
+        """`render(self)` for this raster, computed once off the event loop and kept with it.
+        Concurrent first requests share the one render; a failed render is retried next time."""
+        task = self.renders.get(key)
+        if task is None:
+            task = self.renders[key] = asyncio.ensure_future(asyncio.to_thread(render, self))
+        try:
+            return await asyncio.shield(task)
+        except Exception:
+            if task.done() and self.renders.get(key) is task:
+                del self.renders[key]
+            raise
+
+
+class AQIRasterEngine:
+    """Interpolates the ingested NCR station readings into an AQI raster once per cycle.
+
+    `on_stations` (a StationIngester listener) recomputes the grid off the event loop
+    whenever a new station table is published; requests read `current` and the bodies
+    rendered from it, never interpolating themselves.
+    """
+
+    def __init__(self):
+        self.bounds = parse_bounds(os.environ['AQI_RASTER_BOUNDS']) if os.environ.get('AQI_RASTER_BOUNDS') else NCR_BOUNDS
+        self.rows = int(os.environ.get('AQI_RASTER_ROWS', '256'))
+        self.cols = int(os.environ.get('AQI_RASTER_COLS', '256'))
+        self.power = float(os.environ.get('AQI_IDW_POWER', '2'))
+
+        self.current: Optional[AQIRaster] = None
+        self._inflight: Optional[asyncio.Future] = None
+        self._pending = None
+        self._dirty = False
+
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    async def get(self, snapshot=None) -> Optional[AQIRaster]:
+        """The latest raster; only before the first one exists is it computed on demand"""
+        if self.current is not None:
+            return self.current
+        if self._inflight is not None and not self._inflight.done():
+            return await asyncio.shield(self._inflight)
+        return await self.refresh(await station_ingester.get(snapshot))
+
+    async def refresh(self, table) -> Optional[AQIRaster]:
+        """Recompute the raster from a StationTable. Single-flight: a table published while
+        a computation runs is picked up right after it, not in parallel."""
+        self._pending, self._dirty = table, True
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._drain())
+        return await asyncio.shield(self._inflight)
+
+    async def _drain(self) -> Optional[AQIRaster]:
+        raster = self.current
+        while self._dirty:
+            self._dirty = False
+            raster = await self._compute(self._pending)
+        return raster
+
+    async def _compute(self, table) -> Optional[AQIRaster]:
+        try:
+            lats, lngs, aqis = table.readings() if table is not None else (np.empty(0),) * 3
+            if not len(aqis):
+                self.failures += 1
+                self.last_error = "No station readings"
+                logger.warning("⚠️  No AQI station readings; keeping the previous heatmap raster")
+                return self.current
+
+            start = time.perf_counter()
+            values = await asyncio.to_thread(idw_grid, lats, lngs, aqis, self.bounds, self.rows, self.cols, self.power)
+            raster = AQIRaster(
+                version=table.version,
+                bounds=self.bounds,
+                values=values,
+                stations=len(aqis),
+                computed_at=datetime.now(timezone.utc),
+                compute_ms=round((time.perf_counter() - start) * 1000, 2),
+                digest=hashlib.blake2b(values.tobytes(), digest_size=8).hexdigest()
+            )
+            self.current = raster
+            self.refreshes += 1
+            self.last_error = None
+            logger.info(f"✅ AQI raster v{raster.version}: {len(aqis)} stations -> "
+                        f"{self.rows}x{self.cols} in {raster.compute_ms} ms")
+            return raster
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Error computing AQI raster: {str(e)}")
+            return self.current
+
+    def on_stations(self, table):
+        """StationIngester listener: recompute in the background so ingestion is not held up"""
+        asyncio.ensure_future(self.refresh(table))
+
+    def stats(self) -> dict:
+        raster = self.current
+        return {
+            'version': raster.version if raster else None,
+            'stations': raster.stations if raster else 0,
+            'rows': self.rows,
+            'cols': self.cols,
+            'bounds': list(self.bounds),
+            'idw_power': self.power,
+            'compute_ms': raster.compute_ms if raster else None,
+            'computed_at': raster.computed_at.isoformat() if raster else None,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_error': self.last_error
+        }
+
+
+aqi_raster = AQIRasterEngine()
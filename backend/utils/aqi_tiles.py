@@ -0,0 +1,161 @@
+import io
+import os
+import math
+import asyncio
+from collections import OrderedDict
+
+import numpy as np
+from PIL import Image
+
+from utils.single_flight import SingleFlight
+
+TILE_SIZE = 256
+# Bump when the encodings or colours change so browsers drop tiles cached under old ETags
+TILE_RENDER_VERSION = "t1"
+# uint8 tiles: 0 = no data, otherwise aqi = (value - 1) * AQI_PER_STEP (0..508)
+AQI_PER_STEP = 2
+
+TILE_FORMATS = {
+    "png": "image/png",
+    "u8": "application/octet-stream",
+    "f32": "application/octet-stream",
+}
+
+# The frontend map legend's band colours (getAQIColor in MapView.jsx), interpolated in between
+AQI_COLOR_STOPS = [
+    (25, (16, 185, 129)),
+    (75, (245, 158, 11)),
+    (125, (249, 115, 22)),
+    (175, (239, 68, 68)),
+    (250, (220, 38, 38)),
+    (350, (127, 29, 29)),
+]
+TILE_ALPHA = 170
+
+
+def tile_lattice(z: int, x: int, y: int, size: int = TILE_SIZE) -> tuple:
+    """(lats, lngs) of the pixel centres of a Web Mercator XYZ tile, north-west first"""
+    n = 2 ** z
+    pixels = (np.arange(size) + 0.5) / size
+    lngs = (x + pixels) / n * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(math.pi * (1 - 2 * (y + pixels) / n))))
+    return lats, lngs
+
+
+def tile_overlaps(bounds: tuple, z: int, x: int, y: int) -> bool:
+    min_lng, min_lat, max_lng, max_lat = bounds
+    n = 2 ** z
+    west, east = x / n * 360.0 - 180.0, (x + 1) / n * 360.0 - 180.0
+    north = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    south = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return west <= max_lng and east >= min_lng and south <= max_lat and north >= min_lat
+
+
+def quantize(grid: np.ndarray) -> np.ndarray:
+    """float AQI -> uint8 (see AQI_PER_STEP), 0 where there is no data"""
+    q = np.clip(np.rint(np.nan_to_num(grid, nan=0.0) / AQI_PER_STEP), 0, 254).astype(np.uint8) + 1
+    q[np.isnan(grid)] = 0
+    return q
+
+
+def _palette() -> bytes:
+    levels = (np.arange(256) - 1) * AQI_PER_STEP
+    stops = np.array([stop for stop, _ in AQI_COLOR_STOPS], dtype=np.float64)
+    colours = np.array([colour for _, colour in AQI_COLOR_STOPS], dtype=np.float64)
+    rgba = np.empty((256, 4), dtype=np.uint8)
+    for channel in range(3):
+        rgba[:, channel] = np.rint(np.interp(levels, stops, colours[:, channel]))
+    rgba[:, 3] = TILE_ALPHA
+    rgba[0] = 0  # no data: transparent
+    return rgba.tobytes()
+
+
+PALETTE = _palette()
+
+
+def encode_tile(grid: np.ndarray, fmt: str) -> bytes:
+    """Tile body: PNG (paletted, AQI band colours), uint8 quantized, or float32 little-endian.
+
+    The binary formats are TILE_SIZE x TILE_SIZE row-major values, north-west first;
+    float32 uses NaN for no data.
+    """
+    if fmt == "f32":
+        return grid.astype('<f4').tobytes()
+    q = quantize(grid)
+    if fmt == "u8":
+        return q.tobytes()
+    image = Image.frombuffer('P', (q.shape[1], q.shape[0]), q.tobytes(), 'raw', 'P', 0, 1)
+    image.putpalette(PALETTE, rawmode='RGBA')
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=False, compress_level=6)
+    return buffer.getvalue()
+
+
+class HeatmapTiles:
+    """Encoded heatmap tiles, rendered from the current AQIRaster on first request.
+
+    Bodies are kept in an LRU keyed by the raster's ETag, so a new raster never serves
+    an old tile and old entries simply age out. Misses are sampled and encoded in a worker
+    thread; concurrent requests for the same missing tile share one render.
+    """
+
+    def __init__(self):
+        self.max_entries = int(os.environ.get('AQI_TILE_CACHE_MAX_ENTRIES', '4096'))
+        self.max_zoom = int(os.environ.get('AQI_TILE_MAX_ZOOM', '18'))
+        self.max_age = int(os.environ.get('AQI_TILE_MAX_AGE_SECONDS', '60'))
+        self._tiles = OrderedDict()
+        self._empty = {}
+        self._inflight = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes = 0
+
+    @staticmethod
+    def etag(raster, z: int, x: int, y: int, fmt: str) -> str:
+        # The URL identifies the tile; the tag only has to change with the raster and encoding
+        return f'"{raster.etag}-{TILE_RENDER_VERSION}-{fmt}"'
+
+    async def get(self, raster, z: int, x: int, y: int, fmt: str) -> bytes:
+        if not tile_overlaps(raster.bounds, z, x, y):
+            body = self._empty.get(fmt)
+            if body is None:
+                body = self._empty[fmt] = encode_tile(np.full((TILE_SIZE, TILE_SIZE), np.nan, dtype=np.float32), fmt)
+            return body
+
+        key = (raster.etag, fmt, z, x, y)
+        body = self._tiles.get(key)
+        if body is not None:
+            self.hits += 1
+            self._tiles.move_to_end(key)
+            return body
+
+        return await self._inflight.run(key, lambda: self._render(raster, key, z, x, y, fmt))
+
+    async def _render(self, raster, key: tuple, z: int, x: int, y: int, fmt: str) -> bytes:
+        self.misses += 1
+        body = await asyncio.to_thread(lambda: encode_tile(raster.sample_grid(*tile_lattice(z, x, y)), fmt))
+        # Back on the event loop: the LRU is only ever touched from here
+        self._tiles[key] = body
+        self.bytes += len(body)
+        while len(self._tiles) > self.max_entries:
+            _, evicted = self._tiles.popitem(last=False)
+            self.bytes -= len(evicted)
+        return body
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._tiles),
+            'max_entries': self.max_entries,
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self._inflight.coalesced,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'not_modified': self.not_modified
+        }
+
+
+heatmap_tiles = HeatmapTiles()
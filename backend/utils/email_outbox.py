@@ -0,0 +1,227 @@
+import os
+import time
+import uuid
+import random
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime, timezone, timedelta
+
+import numpy as np
+from pymongo import ReturnDocument
+
+from utils.email_service import deliver_emails
+
+logger = logging.getLogger(__name__)
+
+
+class EmailOutbox:
+    """Durable email queue: handlers insert a message and return, background workers send it.
+
+    Messages live in the `email_outbox` collection as pending -> sending -> sent, or dead
+    once EMAIL_MAX_ATTEMPTS deliveries have failed. A worker claims a message by flipping it
+    to `sending` with `next_attempt_at` pushed out by a lease, so a message held by a worker
+    that died is picked up again when the lease runs out, and several app workers can share
+    one outbox. Each worker claims up to EMAIL_OUTBOX_BATCH due messages at a time and sends
+    them back to back over pooled SMTP sessions. Failed attempts are retried with
+    exponential backoff.
+    """
+
+    def __init__(self, sender=None):
+        self.workers = int(os.environ.get('EMAIL_OUTBOX_WORKERS', '2'))
+        self.poll_interval = float(os.environ.get('EMAIL_OUTBOX_POLL_SECONDS', '5'))
+        self.lease = float(os.environ.get('EMAIL_OUTBOX_LEASE_SECONDS', '120'))
+        self.batch_size = int(os.environ.get('EMAIL_OUTBOX_BATCH', '20'))
+        self.max_attempts = int(os.environ.get('EMAIL_MAX_ATTEMPTS', '6'))
+        self.retry_base = float(os.environ.get('EMAIL_RETRY_BASE_SECONDS', '30'))
+        self.retry_max = float(os.environ.get('EMAIL_RETRY_MAX_SECONDS', '3600'))
+        self.retention_days = int(os.environ.get('EMAIL_OUTBOX_RETENTION_DAYS', '7'))
+
+        self.sender = sender or deliver_emails
+        self.collection = None
+        self._tasks = []
+        self._wake = None
+
+        self.enqueued = 0
+        self.enqueue_errors = 0
+        self.sent = 0
+        self.retried = 0
+        self.dead = 0
+        self._latencies = deque(maxlen=1000)
+        self._send_times = deque(maxlen=1000)
+
+    def start(self, collection):
+        """Launch the delivery workers (and, in the background, create the outbox indexes)"""
+        self.collection = collection
+        self._wake = asyncio.Event()
+        if not any(not task.done() for task in self._tasks):
+            self._tasks = [asyncio.create_task(self._run()) for _ in range(self.workers)]
+            self._tasks.append(asyncio.create_task(self._ensure_indexes()))
+            logger.info(f"✅ Email outbox started ({self.workers} workers)")
+
+    async def _ensure_indexes(self):
+        try:
+            await self.collection.create_index([("status", 1), ("next_attempt_at", 1)], name="status_next_attempt")
+            # Sent messages expire; dead-lettered ones stay until someone looks at them
+            await self.collection.create_index("sent_at", name="sent_ttl",
+                                               expireAfterSeconds=self.retention_days * 86400)
+        except Exception as e:
+            logger.error(f"❌ Failed to create email outbox indexes: {str(e)}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._tasks = []
+
+    async def enqueue(self, to_email: str, subject: str, html: str) -> int:
+        return await self.enqueue_many([(to_email, subject, html)])
+
+    async def enqueue_many(self, messages) -> int:
+        """Queue (to, subject, html) messages for delivery; returns how many were stored.
+
+        A failure to store is logged, not raised: the caller's own write already happened.
+        """
+        now = datetime.now(timezone.utc)
+        docs = [{
+            "id": str(uuid.uuid4()),
+            "to": to_email,
+            "subject": subject,
+            "html": html,
+            "status": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now
+        } for to_email, subject, html in messages]
+        if not docs:
+            return 0
+
+        try:
+            await self.collection.insert_many(docs, ordered=False)
+        except Exception as e:
+            self.enqueue_errors += len(docs)
+            logger.error(f"❌ Failed to queue {len(docs)} email(s): {str(e)}")
+            return 0
+
+        self.enqueued += len(docs)
+        if self._wake is not None:
+            self._wake.set()
+        return len(docs)
+
+    async def _run(self):
+        while True:
+            try:
+                # Cleared before claiming so an enqueue racing with an empty claim still wakes us
+                self._wake.clear()
+                batch = []
+                while len(batch) < self.batch_size:
+                    message = await self._claim()
+                    if message is None:
+                        break
+                    batch.append(message)
+                if not batch:
+                    try:
+                        await asyncio.wait_for(self._wake.wait(), self.poll_interval)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self._deliver(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Email outbox error: {str(e)}")
+                await asyncio.sleep(self.poll_interval)
+
+    async def _claim(self):
+        now = datetime.now(timezone.utc)
+        return await self.collection.find_one_and_update(
+            {"status": {"$in": ["pending", "sending"]}, "next_attempt_at": {"$lte": now}},
+            {"$set": {"status": "sending", "next_attempt_at": now + timedelta(seconds=self.lease)},
+             "$inc": {"attempts": 1}},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _deliver(self, batch: list):
+        """Send a claimed batch over pooled SMTP sessions and record each outcome"""
+        start = time.perf_counter()
+        errors = await self.sender([(m["to"], m["subject"], m["html"]) for m in batch])
+        self._send_times.append((time.perf_counter() - start) / len(batch))
+
+        delivered = [m for m, error in zip(batch, errors) if error is None]
+        for message, error in zip(batch, errors):
+            if error is not None:
+                await self._failed(message, str(error))
+        if not delivered:
+            return
+
+        now = datetime.now(timezone.utc)
+        await self.collection.update_many(
+            {"_id": {"$in": [m["_id"] for m in delivered]}},
+            {"$set": {"status": "sent", "sent_at": now}, "$unset": {"last_error": ""}}
+        )
+        self.sent += len(delivered)
+        for message in delivered:
+            created_at = message["created_at"]
+            if created_at.tzinfo is None:
+                created_at = created_at.replace(tzinfo=timezone.utc)
+            self._latencies.append((now - created_at).total_seconds())
+
+    async def _failed(self, message: dict, error: str):
+        attempts = message["attempts"]
+        now = datetime.now(timezone.utc)
+        if attempts >= self.max_attempts:
+            self.dead += 1
+            logger.error(f"❌ Email to {message['to']} dead-lettered after {attempts} attempts: {error}")
+            update = {"status": "dead", "dead_at": now, "last_error": error}
+        else:
+            self.retried += 1
+            delay = min(self.retry_base * 2 ** (attempts - 1), self.retry_max) * random.uniform(0.8, 1.2)
+            logger.warning(f"⚠️  Email to {message['to']} failed (attempt {attempts}), retrying in {int(delay)}s: {error}")
+            update = {"status": "pending", "next_attempt_at": now + timedelta(seconds=delay), "last_error": error}
+        await self.collection.update_one({"_id": message["_id"]}, {"$set": update})
+
+    async def depth(self) -> dict:
+        """Messages per state still in the outbox (sent ones until they expire)"""
+        counts = {"pending": 0, "sending": 0, "dead": 0}
+        async for row in self.collection.aggregate([
+            {"$match": {"status": {"$in": list(counts)}}},
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]):
+            counts[row["_id"]] = row["count"]
+        return counts
+
+    async def stats(self) -> dict:
+        depth = None
+        if self.collection is not None:
+            try:
+                depth = await asyncio.wait_for(self.depth(), 2)
+            except Exception as e:
+                logger.warning(f"⚠️  Could not read email outbox depth: {str(e)}")
+        latencies = np.fromiter(self._latencies, dtype=np.float64)
+        send_times = np.fromiter(self._send_times, dtype=np.float64) * 1000
+        return {
+            'queue_depth': depth,
+            'workers': sum(1 for task in self._tasks[:self.workers] if not task.done()),
+            'enqueued': self.enqueued,
+            'enqueue_errors': self.enqueue_errors,
+            'sent': self.sent,
+            'retried': self.retried,
+            'dead_lettered': self.dead,
+            'delivery_latency_s': {
+                'p50': round(float(np.percentile(latencies, 50)), 3) if len(latencies) else None,
+                'p95': round(float(np.percentile(latencies, 95)), 3) if len(latencies) else None,
+                'window': len(latencies)
+            },
+            'send_ms': {
+                'p50': round(float(np.percentile(send_times, 50)), 2) if len(send_times) else None,
+                'p95': round(float(np.percentile(send_times, 95)), 2) if len(send_times) else None
+            }
+        }
+
+
+email_outbox = EmailOutbox()
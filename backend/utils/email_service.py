@@ -1,4 +1,6 @@
 import os
+import time
+import asyncio
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
@@ -6,37 +8,212 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-EMAIL_HOST = os.environ.get('EMAIL_HOST', 'smtp.gmail.com')
-EMAIL_PORT = int(os.environ.get('EMAIL_PORT', '587'))
-EMAIL_USER = os.environ.get('EMAIL_USER')
-EMAIL_PASSWORD = os.environ.get('EMAIL_PASSWORD')
-EMAIL_FROM = os.environ.get('EMAIL_FROM', EMAIL_USER)
+
+class SMTPPool:
+    """A bounded set of connected, authenticated aiosmtplib.SMTP sessions reused across sends.
+
+    At most EMAIL_POOL_SIZE sessions exist per event loop. A session idle for longer than
+    EMAIL_POOL_CHECK_SECONDS is checked with NOOP before reuse, one idle past
+    EMAIL_POOL_IDLE_SECONDS or past EMAIL_POOL_MAX_MESSAGES sends is closed, and a send that
+    fails because the server dropped a reused session is retried once on a fresh one.
+    Settings are read on first use, so EMAIL_* from backend/.env apply even though this
+    module is imported before load_dotenv() runs.
+    """
+
+    def __init__(self):
+        self.size = int(os.environ.get('EMAIL_POOL_SIZE', '4'))
+        self.check_after = float(os.environ.get('EMAIL_POOL_CHECK_SECONDS', '15'))
+        self.idle_timeout = float(os.environ.get('EMAIL_POOL_IDLE_SECONDS', '60'))
+        self.max_messages = int(os.environ.get('EMAIL_POOL_MAX_MESSAGES', '100'))
+        self.timeout = float(os.environ.get('EMAIL_TIMEOUT_SECONDS', '30'))
+
+        self._idle = []
+        self._semaphore = None
+        self._loop = None
+
+        self.connections_opened = 0
+        self.reused = 0
+        self.reconnects = 0
+        self.health_check_failures = 0
+        self.sent = 0
+        self.failed = 0
+
+    @property
+    def sender(self) -> str:
+        return os.environ.get('EMAIL_FROM') or os.environ.get('EMAIL_USER')
+
+    def _check_loop(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sessions and the semaphore belong to the loop that created them
+            for session in self._idle:
+                session[0].close()
+            self._idle = []
+            self._semaphore = asyncio.Semaphore(self.size)
+            self._loop = loop
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        smtp = aiosmtplib.SMTP(
+            hostname=os.environ.get('EMAIL_HOST', 'smtp.gmail.com'),
+            port=int(os.environ.get('EMAIL_PORT', '587')),
+            username=os.environ.get('EMAIL_USER'),
+            password=os.environ.get('EMAIL_PASSWORD'),
+            start_tls=os.environ.get('EMAIL_STARTTLS', 'true').lower() == 'true',
+            timeout=self.timeout
+        )
+        await smtp.connect()
+        self.connections_opened += 1
+        return smtp
+
+    async def _checkout(self):
+        """An idle session still fit for use, or a new one: [smtp, last_used, messages_sent]"""
+        while self._idle:
+            session = self._idle.pop()
+            idle_for = time.monotonic() - session[1]
+            if not session[0].is_connected or idle_for > self.idle_timeout:
+                session[0].close()
+                continue
+            if idle_for > self.check_after:
+                try:
+                    await session[0].noop()
+                except Exception:
+                    self.health_check_failures += 1
+                    session[0].close()
+                    continue
+            self.reused += 1
+            return session
+        return [await self._connect(), time.monotonic(), 0]
+
+    def _checkin(self, session, healthy: bool):
+        if healthy and session[0].is_connected and session[2] < self.max_messages:
+            session[1] = time.monotonic()
+            self._idle.append(session)
+        elif session[0].is_connected:
+            asyncio.ensure_future(self._quit(session[0]))
+        else:
+            session[0].close()
+
+    async def _quit(self, smtp: aiosmtplib.SMTP):
+        try:
+            await smtp.quit()
+        except Exception:
+            smtp.close()
+
+    async def _send_on(self, session, message):
+        """Send over `session`, reconnecting it in place once if the server dropped it"""
+        try:
+            await session[0].send_message(message)
+        except (aiosmtplib.SMTPServerDisconnected, ConnectionError):
+            session[0].close()
+            self.reconnects += 1
+            session[:] = [await self._connect(), time.monotonic(), 0]
+            await session[0].send_message(message)
+        session[2] += 1
+
+    async def send(self, message):
+        """Send one message over a pooled session, raising on failure"""
+        await self.send_many([message], raise_errors=True)
+
+    async def send_many(self, messages, raise_errors: bool = False) -> list:
+        """Send `messages` back to back over as few sessions as possible.
+
+        Messages are split across up to EMAIL_POOL_SIZE sessions, each sending its share in
+        sequence without reconnecting. Returns one entry per message, None when it was sent
+        and the exception otherwise (unless `raise_errors`).
+        """
+        self._check_loop()
+        results = [None] * len(messages)
+        if not messages:
+            return results
+        lanes = min(self.size, len(messages))
+
+        async def lane(indexes):
+            async with self._semaphore:
+                session = None
+                try:
+                    for i in indexes:
+                        if session is None:
+                            try:
+                                session = await self._checkout()
+                            except Exception as e:
+                                # Server unreachable: fail this lane's remaining messages at once
+                                remaining = [j for j in indexes if j >= i]
+                                self.failed += len(remaining)
+                                for j in remaining:
+                                    results[j] = e
+                                return
+                        try:
+                            await self._send_on(session, messages[i])
+                            self.sent += 1
+                        except aiosmtplib.SMTPResponseException as e:
+                            # Rejected by the server: the session itself is still usable
+                            self.failed += 1
+                            results[i] = e
+                        except Exception as e:
+                            self.failed += 1
+                            results[i] = e
+                            session[0].close()
+                            session = None
+                finally:
+                    if session is not None:
+                        self._checkin(session, healthy=True)
+
+        await asyncio.gather(*[lane(range(start, len(messages), lanes)) for start in range(lanes)])
+        if raise_errors:
+            for error in results:
+                if error is not None:
+                    raise error
+        return results
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        for session in idle:
+            await self._quit(session[0])
+
+    def stats(self) -> dict:
+        return {
+            'size': self.size,
+            'idle': len(self._idle),
+            'connections_opened': self.connections_opened,
+            'reused': self.reused,
+            'reconnects': self.reconnects,
+            'health_check_failures': self.health_check_failures,
+            'sent': self.sent,
+            'failed': self.failed
+        }
+
+
+smtp_pool = SMTPPool()
+
+def build_message(to_email: str, subject: str, html_content: str) -> MIMEMultipart:
+    message = MIMEMultipart('alternative')
+    message['From'] = smtp_pool.sender
+    message['To'] = to_email
+    message['Subject'] = subject
+    
+    html_part = MIMEText(html_content, 'html')
+    message.attach(html_part)
+    return message
+
+async def deliver_email(to_email: str, subject: str, html_content: str):
+    """Send one message, raising on failure"""
+    await smtp_pool.send(build_message(to_email, subject, html_content))
+
+async def deliver_emails(messages) -> list:
+    """Send (to, subject, html) messages over pooled sessions; None or the exception per message"""
+    return await smtp_pool.send_many([build_message(*message) for message in messages])
 
 async def send_email(to_email: str, subject: str, html_content: str):
     try:
-        message = MIMEMultipart('alternative')
-        message['From'] = EMAIL_FROM
-        message['To'] = to_email
-        message['Subject'] = subject
-        
-        html_part = MIMEText(html_content, 'html')
-        message.attach(html_part)
-        
-        await aiosmtplib.send(
-            message,
-            hostname=EMAIL_HOST,
-            port=EMAIL_PORT,
-            username=EMAIL_USER,
-            password=EMAIL_PASSWORD,
-            start_tls=True
-        )
+        await deliver_email(to_email, subject, html_content)
         logger.info(f"Email sent successfully to {to_email}")
         return True
     except Exception as e:
         logger.error(f"Failed to send email to {to_email}: {str(e)}")
         return False
 
-async def send_report_confirmation(to_email: str, name: str, report_id: str):
+def report_confirmation_email(name: str, report_id: str):
+    """(subject, html) of the confirmation sent when a report is submitted"""
     subject = "Pollution Report Submitted - Delhi Air Command"
     html = f"""
     <html>
@@ -57,9 +234,13 @@ async def send_report_confirmation(to_email: str, name: str, report_id: str):
         </body>
     </html>
     """
-    return await send_email(to_email, subject, html)
+    return subject, html
 
-async def send_status_update(to_email: str, name: str, report_id: str, new_status: str):
+async def send_report_confirmation(to_email: str, name: str, report_id: str):
+    return await send_email(to_email, *report_confirmation_email(name, report_id))
+
+def status_update_email(name: str, report_id: str, new_status: str):
+    """(subject, html) of the notification sent when a report changes status"""
     subject = f"Report Status Update: {new_status.title()} - Delhi Air Command"
     
     status_messages = {
@@ -89,4 +270,7 @@ async def send_status_update(to_email: str, name: str, report_id: str, new_statu
         </body>
     </html>
     """
-    return await send_email(to_email, subject, html)
\ No newline at end of file
+    return subject, html
+
+async def send_status_update(to_email: str, name: str, report_id: str, new_status: str):
+    return await send_email(to_email, *status_update_email(name, report_id, new_status))
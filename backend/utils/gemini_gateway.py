@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class GenAIBackend:
+    """Gemini via google-generativeai's native async API"""
+
+    def __init__(self, api_key: str, model_name: str):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name)
+
+    async def generate(self, prompt: str) -> str:
+        response = await self.model.generate_content_async(prompt)
+        return response.text
+
+
+class StubBackend:
+    """Local stand-in for Gemini (GEMINI_STUB=true): canned, prompt-shaped answers, no network.
+
+    Prompts asking for a JSON array get a recommendation array, anything else gets bullet
+    points. GEMINI_STUB_DELAY_MS simulates upstream latency; `max_concurrent` records the
+    most calls in flight at once.
+    """
+
+    def __init__(self, delay_ms: float = 0):
+        self.delay = delay_ms / 1000.0
+        self.calls = 0
+        self.in_flight = 0
+        self.max_concurrent = 0
+
+    async def generate(self, prompt: str) -> str:
+        self.calls += 1
+        self.in_flight += 1
+        self.max_concurrent = max(self.max_concurrent, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if 'JSON array' in prompt:
+            return json.dumps([
+                {"title": "Check AQI Before Going Out", "description": "Plan outdoor time around the cleaner midday hours.", "priority": "high", "icon": "📱"},
+                {"title": "Wear a Mask Outdoors", "description": "An N95 mask filters most fine particles on polluted days.", "priority": "high", "icon": "😷"},
+                {"title": "Keep Indoor Air Clean", "description": "Close windows during peak hours and run an air purifier.", "priority": "medium", "icon": "💨"},
+                {"title": "Prefer Public Transport", "description": "Fewer private vehicles means less traffic pollution for everyone.", "priority": "low", "icon": "🚇"}
+            ])
+        return "\n".join([
+            "- Air quality needs close monitoring",
+            "- Forecast drives near-term precautions",
+            "- Dominant source shapes the response",
+            "- Peak hours carry the highest exposure",
+            "- Limit outdoor exertion when unhealthy"
+        ])
+
+
+class GeminiGateway:
+    """Async Gemini access with a hard timeout, bounded concurrency, single-flight and a TTL cache.
+
+    Callers pass a cache key built from bucketed inputs (AQI band, trend, dominant source,
+    user type, ...) and optionally a `parse` function; the parsed value is what is cached, so
+    the same question within GEMINI_CACHE_TTL_SECONDS is neither re-asked nor re-parsed.
+    Timeouts, API errors and unparseable answers return the caller's fallback and are
+    remembered for GEMINI_NEGATIVE_CACHE_TTL seconds.
+    """
+
+    def __init__(self, backend=None):
+        self.model_name = os.environ.get('GEMINI_MODEL', 'gemini-1.5-flash')
+        self.timeout = float(os.environ.get('GEMINI_TIMEOUT_SECONDS', '10'))
+        self.max_concurrency = int(os.environ.get('GEMINI_MAX_CONCURRENCY', '4'))
+        self.cache_ttl = float(os.environ.get('GEMINI_CACHE_TTL_SECONDS', '900'))
+        self.negative_ttl = float(os.environ.get('GEMINI_NEGATIVE_CACHE_TTL', '30'))
+        self.max_entries = int(os.environ.get('GEMINI_CACHE_MAX_ENTRIES', '256'))
+
+        self._backend = backend
+        self._semaphore = None
+        self._semaphore_loop = None
+        self._cache = {}
+        self._inflight = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        self.timeouts = 0
+        self.errors = 0
+        self.parse_failures = 0
+
+    @property
+    def stub(self) -> bool:
+        return os.environ.get('GEMINI_STUB', 'false').lower() in ('1', 'true', 'yes')
+
+    @property
+    def enabled(self) -> bool:
+        return self._backend is not None or self.stub or bool(os.environ.get('GEMINI_API_KEY'))
+
+    def _get_backend(self):
+        if self._backend is None:
+            if self.stub:
+                self._backend = StubBackend(float(os.environ.get('GEMINI_STUB_DELAY_MS', '0')))
+                logger.info("✅ Gemini gateway using local stub")
+            else:
+                self._backend = GenAIBackend(os.environ['GEMINI_API_KEY'], self.model_name)
+        return self._backend
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._semaphore is None or self._semaphore_loop is not loop:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._semaphore_loop = loop
+        return self._semaphore
+
+    async def generate(self, prompt: str, key: tuple = None, parse=None, fallback=None):
+        """Answer `prompt` (parsed by `parse` when given), from cache when `key` was asked recently"""
+        if not self.enabled:
+            return fallback
+        if key is None:
+            key = ('prompt', hashlib.sha1(prompt.encode()).hexdigest())
+
+        now = time.monotonic()
+        entry = self._cache.get(key)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return fallback if entry[1] is None else entry[1]
+
+        self.misses += 1
+        value = await self._inflight.run(key, lambda: self._load(key, prompt, parse))
+        return fallback if value is None else value
+
+    async def _load(self, key: tuple, prompt: str, parse):
+        value = await self._call(prompt, parse)
+        ttl = self.cache_ttl if value is not None else self.negative_ttl
+        if ttl > 0:
+            self._store(key, value, ttl)
+        return value
+
+    async def _call(self, prompt: str, parse):
+        async def limited():
+            async with self._get_semaphore():
+                self.upstream_calls += 1
+                return await self._get_backend().generate(prompt)
+
+        try:
+            # The timeout covers waiting for a slot too, so callers never hang past it
+            text = await asyncio.wait_for(limited(), self.timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"⚠️  Gemini call timed out after {self.timeout}s")
+            return None
+        except Exception as e:
+            self.errors += 1
+            logger.error(f"Gemini API error: {str(e)}")
+            return None
+
+        if not text:
+            return None
+        if parse is None:
+            return text
+        try:
+            return parse(text)
+        except Exception as e:
+            self.parse_failures += 1
+            logger.warning(f"⚠️  Unparseable Gemini response: {str(e)}")
+            return None
+
+    def _store(self, key: tuple, value, ttl: float):
+        now = time.monotonic()
+        if len(self._cache) >= self.max_entries:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            while len(self._cache) >= self.max_entries:
+                self._cache.pop(next(iter(self._cache)))
+        self._cache[key] = (now + ttl, value)
+
+    def invalidate(self):
+        self._cache.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'stub': self.stub,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'coalesced': self._inflight.coalesced,
+            'upstream_calls': self.upstream_calls,
+            'timeouts': self.timeouts,
+            'errors': self.errors,
+            'parse_failures': self.parse_failures,
+            'cached_keys': len(self._cache),
+            'inflight': len(self._inflight),
+            'max_concurrency': self.max_concurrency,
+            'timeout_seconds': self.timeout,
+            'cache_ttl_seconds': self.cache_ttl
+        }
+
+
+gemini_gateway = GeminiGateway()
@@ -0,0 +1,103 @@
+import os
+import time
+import asyncio
+import logging
+
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class Materializer:
+    """Pre-rendered, serialized responses, kept per input generation.
+
+    Views are registered with an async render function returning `(body, final)`.
+    `generation` (a callable set by the app) identifies the inputs the views depend on;
+    a final body is served while the generation it was rendered for is current. A body
+    that is not final (rendered from a fallback because an upstream failed) is served for
+    MATERIALIZER_RETRY_SECONDS only, then rendered again on the next request.
+    `on_snapshot` re-renders every view in the background when a new AQI snapshot is
+    published, and a miss renders the view once (single-flight) and stores it.
+    """
+
+    def __init__(self, generation=None):
+        self.generation = generation or (lambda: None)
+        self.retry_after = float(os.environ.get('MATERIALIZER_RETRY_SECONDS', '30'))
+        self._renderers = {}
+        self._views = {}
+        self._inflight = SingleFlight()
+        self._refresh_task = None
+
+        self.hits = 0
+        self.misses = 0
+        self.renders = 0
+        self.render_errors = 0
+        self.provisional = 0
+        self._last_render_ms = {}
+
+    def register(self, name: str, render):
+        self._renderers[name] = render
+
+    async def get(self, name: str) -> bytes:
+        """Serialized body of `name` for the current generation, rendering it if needed"""
+        generation = self.generation()
+        entry = self._views.get(name)
+        if entry is not None and entry[0] == generation and (entry[2] is None or entry[2] > time.monotonic()):
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        return await self._inflight.run((name, generation), lambda: self._render(name, generation))
+
+    async def _render(self, name: str, generation) -> bytes:
+        start = time.perf_counter()
+        try:
+            body, final = await self._renderers[name]()
+            self.renders += 1
+            expires = None
+            if not final:
+                self.provisional += 1
+                expires = time.monotonic() + self.retry_after
+            self._views[name] = (generation, body, expires)
+            return body
+        except Exception:
+            self.render_errors += 1
+            raise
+        finally:
+            self._last_render_ms[name] = round((time.perf_counter() - start) * 1000, 2)
+
+    async def refresh(self):
+        """Render every registered view for the current generation"""
+        results = await asyncio.gather(*[self.get(name) for name in self._renderers], return_exceptions=True)
+        for name, result in zip(self._renderers, results):
+            if isinstance(result, Exception):
+                logger.error(f"❌ Failed to materialize {name}: {str(result)}")
+
+    def on_snapshot(self, snapshot):
+        """AQIIngester listener: re-render in the background so ingestion is not held up"""
+        self._refresh_task = asyncio.ensure_future(self.refresh())
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        generation = self.generation()
+        return {
+            'views': {
+                name: {
+                    'current': name in self._views and self._views[name][0] == generation,
+                    'final': name in self._views and self._views[name][2] is None,
+                    'bytes': len(self._views[name][1]) if name in self._views else 0,
+                    'last_render_ms': self._last_render_ms.get(name)
+                }
+                for name in self._renderers
+            },
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'coalesced': self._inflight.coalesced,
+            'renders': self.renders,
+            'provisional': self.provisional,
+            'render_errors': self.render_errors
+        }
+
+
+materializer = Materializer()
@@ -0,0 +1,84 @@
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+# /proc/<pid>/smaps_rollup fields, in kB
+_SMAPS_FIELDS = {
+    'Rss': 'rss',
+    'Pss': 'pss',
+    'Shared_Clean': 'shared_clean',
+    'Shared_Dirty': 'shared_dirty',
+    'Private_Clean': 'private_clean',
+    'Private_Dirty': 'private_dirty',
+}
+
+
+def _mb(kb: int) -> float:
+    return round(kb / 1024, 1)
+
+
+def process_memory(pid: int = None) -> dict:
+    """RSS, PSS, USS and shared memory of one process, in MB (Linux only).
+
+    USS (private pages) is what the process would free on exit; with models preloaded
+    before fork, worker USS stays small while the model pages show up as shared.
+    """
+    pid = pid or os.getpid()
+    kb = {}
+    try:
+        with open(f'/proc/{pid}/smaps_rollup') as f:
+            for line in f:
+                parts = line.split()
+                field = _SMAPS_FIELDS.get(parts[0].rstrip(':'))
+                if field:
+                    kb[field] = int(parts[1])
+    except (FileNotFoundError, PermissionError, ProcessLookupError):
+        return {'pid': pid, 'available': False}
+
+    return {
+        'pid': pid,
+        'available': True,
+        'rss_mb': _mb(kb.get('rss', 0)),
+        'pss_mb': _mb(kb.get('pss', 0)),
+        'uss_mb': _mb(kb.get('private_clean', 0) + kb.get('private_dirty', 0)),
+        'shared_mb': _mb(kb.get('shared_clean', 0) + kb.get('shared_dirty', 0))
+    }
+
+
+def child_pids(parent_pid: int) -> list:
+    """PIDs whose parent is `parent_pid` (e.g. the gunicorn workers of a master)"""
+    pids = []
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; ppid is the 2nd field after ")"
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (FileNotFoundError, ProcessLookupError, IndexError, ValueError):
+            continue
+        if ppid == parent_pid:
+            pids.append(int(entry))
+    return sorted(pids)
+
+
+def worker_memory_report() -> dict:
+    """Memory of this process, plus the master and every sibling worker under gunicorn"""
+    master_pid = os.environ.get('GUNICORN_MASTER_PID')
+    report = {'self': process_memory()}
+    if not master_pid:
+        return report
+
+    master_pid = int(master_pid)
+    workers = [process_memory(pid) for pid in child_pids(master_pid)]
+    workers = [w for w in workers if w['available']]
+    report['master'] = process_memory(master_pid)
+    report['workers'] = workers
+    report['totals'] = {
+        'workers': len(workers),
+        'rss_mb': round(sum(w['rss_mb'] for w in workers), 1),
+        'uss_mb': round(sum(w['uss_mb'] for w in workers), 1),
+        'pss_mb': round(sum(w['pss_mb'] for w in workers), 1)
+    }
+    return report
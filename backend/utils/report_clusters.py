@@ -0,0 +1,245 @@
+import re
+import math
+import logging
+from collections import defaultdict
+from typing import Optional
+
+from pymongo import UpdateOne
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+# Counters are kept for every map zoom in this range; other zooms use the nearest level
+CLUSTER_MIN_ZOOM = 4
+CLUSTER_MAX_ZOOM = 16
+# Cells per tile edge: at zoom z a cell spans 1/4 of a 256 px tile, i.e. ~64 px on screen
+CELLS_PER_TILE = 4
+CLUSTER_TABLE = "report_cluster_cells"
+
+
+def cluster_level(zoom: int) -> int:
+    return min(max(zoom, CLUSTER_MIN_ZOOM), CLUSTER_MAX_ZOOM)
+
+
+def cell_size(level: int) -> float:
+    """Cell edge in degrees (longitude and latitude alike) at a counter level"""
+    return 360.0 / (2 ** level * CELLS_PER_TILE)
+
+
+def cell_of(latitude: float, longitude: float, level: int) -> tuple:
+    size = cell_size(level)
+    return math.floor((longitude + 180.0) / size), math.floor((latitude + 90.0) / size)
+
+
+def cell_range(bbox: tuple, level: int) -> tuple:
+    """(min_x, min_y, max_x, max_y) of the cells covering a min_lng,min_lat,max_lng,max_lat box"""
+    min_lng, min_lat, max_lng, max_lat = bbox
+    min_x, min_y = cell_of(min_lat, min_lng, level)
+    max_x, max_y = cell_of(max_lat, max_lng, level)
+    return min_x, min_y, max_x, max_y
+
+
+def status_key(status: Optional[str]) -> str:
+    """Status as a safe counter field name"""
+    return status if status and re.fullmatch(r'[a-z_]{1,32}', status) else 'other'
+
+
+def cell_deltas(reports, status_from: Optional[str] = None, status_to: Optional[str] = None) -> dict:
+    """Counter changes per (level, x, y) for reports (dicts with latitude, longitude, severity, status).
+
+    Without `status_to` each report is added to its cells; with it, each report's count
+    moves from its current status (or `status_from`) to `status_to`.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for report in reports:
+        latitude, longitude = report.get('latitude'), report.get('longitude')
+        if latitude is None or longitude is None:
+            continue
+        for level in range(CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM + 1):
+            delta = deltas[(level, *cell_of(latitude, longitude, level))]
+            if status_to is None:
+                delta['count'] += 1
+                delta['severity_sum'] += report['severity']
+                delta['lat_sum'] += latitude
+                delta['lng_sum'] += longitude
+                delta[f"status.{status_key(report.get('status'))}"] += 1
+            else:
+                delta[f"status.{status_key(status_from or report.get('status'))}"] -= 1
+                delta[f"status.{status_key(status_to)}"] += 1
+    return deltas
+
+
+async def apply_deltas(collection, deltas: dict):
+    """Upsert the counter changes into the report_clusters collection with one bulk_write"""
+    operations = []
+    for (level, x, y), delta in deltas.items():
+        changes = {field: value for field, value in delta.items() if value}
+        if changes:
+            operations.append(UpdateOne(
+                {"_id": f"{level}:{x}:{y}"},
+                {"$inc": changes, "$setOnInsert": {"z": level, "x": x, "y": y}},
+                upsert=True
+            ))
+    if operations:
+        await collection.bulk_write(operations, ordered=False)
+
+
+def clusters_pipeline(bbox: tuple, level: int) -> list:
+    """Aggregation over report_clusters: the non-empty cells in view, with mean severity and centroid"""
+    min_x, min_y, max_x, max_y = cell_range(bbox, level)
+    return [
+        {"$match": {"z": level, "y": {"$gte": min_y, "$lte": max_y}, "x": {"$gte": min_x, "$lte": max_x},
+                    "count": {"$gt": 0}}},
+        {"$project": {
+            "_id": 0,
+            "cell": "$_id",
+            "count": 1,
+            "status": 1,
+            "lat": {"$divide": ["$lat_sum", "$count"]},
+            "lng": {"$divide": ["$lng_sum", "$count"]},
+            "mean_severity": {"$round": [{"$divide": ["$severity_sum", "$count"]}, 2]}
+        }}
+    ]
+
+
+def rebuild_pipeline(level: int, output: str = "report_clusters") -> list:
+    """Aggregation over pollution_reports recomputing every cell of one level into `output`"""
+    size = cell_size(level)
+    cell = {
+        "x": {"$floor": {"$divide": [{"$add": ["$longitude", 180]}, size]}},
+        "y": {"$floor": {"$divide": [{"$add": ["$latitude", 90]}, size]}}
+    }
+    # Same mapping as status_key(), so rebuilt and incrementally kept counters agree
+    status = {"$let": {"vars": {"s": {"$ifNull": ["$status", ""]}}, "in": {"$cond": [
+        {"$regexMatch": {"input": {"$toString": "$$s"}, "regex": "^[a-z_]{1,32}$"}}, "$$s", "other"]}}}
+    return [
+        {"$match": {"latitude": {"$type": "number"}, "longitude": {"$type": "number"}}},
+        {"$group": {
+            "_id": {**cell, "status": status},
+            "count": {"$sum": 1},
+            "severity_sum": {"$sum": "$severity"},
+            "lat_sum": {"$sum": "$latitude"},
+            "lng_sum": {"$sum": "$longitude"}
+        }},
+        {"$group": {
+            "_id": {"x": "$_id.x", "y": "$_id.y"},
+            "count": {"$sum": "$count"},
+            "severity_sum": {"$sum": "$severity_sum"},
+            "lat_sum": {"$sum": "$lat_sum"},
+            "lng_sum": {"$sum": "$lng_sum"},
+            "status": {"$push": {"k": "$_id.status", "v": "$count"}}
+        }},
+        {"$project": {
+            "_id": {"$concat": [str(level), ":", {"$toString": {"$toLong": "$_id.x"}},
+                                ":", {"$toString": {"$toLong": "$_id.y"}}]},
+            "z": {"$literal": level},
+            "x": {"$toLong": "$_id.x"},
+            "y": {"$toLong": "$_id.y"},
+            "count": 1, "severity_sum": 1, "lat_sum": 1, "lng_sum": 1,
+            "status": {"$arrayToObject": "$status"}
+        }},
+        {"$merge": {"into": output, "whenMatched": "replace", "whenNotMatched": "insert"}}
+    ]
+
+
+CLUSTER_INDEX = ([("z", 1), ("y", 1), ("x", 1)], {"name": "z_y_x"})
+
+
+# SQLite: the same counters in a table kept current by triggers on pollution_reports
+
+def _status_sql(column: str) -> str:
+    """status_key() in SQL: GLOB is case-sensitive, so this keeps exactly [a-z_]{1,32}"""
+    return (f"CASE WHEN length({column}) BETWEEN 1 AND 32 AND {column} NOT GLOB '*[^a-z_]*' "
+            f"THEN {column} ELSE 'other' END")
+
+
+def _level_statements(level: int, row: str, sign: str, status_only: bool = False) -> str:
+    size = cell_size(level)
+    x = f"CAST(({row}.longitude + 180.0) / {size!r} AS INTEGER)"
+    y = f"CAST(({row}.latitude + 90.0) / {size!r} AS INTEGER)"
+    status = _status_sql(f"{row}.status")
+    if status_only:
+        return (f"INSERT INTO {CLUSTER_TABLE}_status (z, x, y, status, count) "
+                f"SELECT {level}, {x}, {y}, {status}, {sign}1 WHERE {row}.latitude IS NOT NULL AND {row}.longitude IS NOT NULL "
+                f"ON CONFLICT (z, x, y, status) DO UPDATE SET count = count + excluded.count;")
+    return (f"INSERT INTO {CLUSTER_TABLE} (z, x, y, count, severity_sum, lat_sum, lng_sum) "
+            f"SELECT {level}, {x}, {y}, {sign}1, {sign}{row}.severity, {sign}{row}.latitude, {sign}{row}.longitude "
+            f"WHERE {row}.latitude IS NOT NULL AND {row}.longitude IS NOT NULL "
+            f"ON CONFLICT (z, x, y) DO UPDATE SET count = count + excluded.count, "
+            f"severity_sum = severity_sum + excluded.severity_sum, lat_sum = lat_sum + excluded.lat_sum, "
+            f"lng_sum = lng_sum + excluded.lng_sum;\n"
+            + _level_statements(level, row, sign, status_only=True))
+
+
+def _trigger(name: str, event: str, body: list, when: str = "") -> str:
+    return (f"CREATE TRIGGER IF NOT EXISTS {CLUSTER_TABLE}_{name} {event} ON pollution_reports\n"
+            + (f"WHEN {when}\n" if when else "") + "BEGIN\n" + "\n".join(body) + "\nEND")
+
+
+# Exactly one of the two update triggers runs per row: "move" re-counts the whole row when
+# its position or severity changed (status included), "status" only moves the status count
+MOVED = ("old.latitude IS NOT new.latitude OR old.longitude IS NOT new.longitude "
+         "OR old.severity IS NOT new.severity")
+
+
+def cluster_ddl() -> list:
+    levels = range(CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM + 1)
+    return [
+        f"CREATE TABLE IF NOT EXISTS {CLUSTER_TABLE} (z INTEGER NOT NULL, x INTEGER NOT NULL, y INTEGER NOT NULL, "
+        "count INTEGER NOT NULL, severity_sum REAL NOT NULL, lat_sum REAL NOT NULL, lng_sum REAL NOT NULL, "
+        "PRIMARY KEY (z, y, x))",
+        f"CREATE TABLE IF NOT EXISTS {CLUSTER_TABLE}_status (z INTEGER NOT NULL, x INTEGER NOT NULL, "
+        "y INTEGER NOT NULL, status TEXT NOT NULL, count INTEGER NOT NULL, PRIMARY KEY (z, x, y, status))",
+        _trigger("insert", "AFTER INSERT", [_level_statements(level, "new", "") for level in levels]),
+        _trigger("delete", "AFTER DELETE", [_level_statements(level, "old", "-") for level in levels]),
+        _trigger("move", "AFTER UPDATE OF latitude, longitude, severity",
+                 [_level_statements(level, "old", "-") for level in levels]
+                 + [_level_statements(level, "new", "") for level in levels], when=MOVED),
+        _trigger("status", "AFTER UPDATE OF status",
+                 [_level_statements(level, "old", "-", status_only=True) for level in levels]
+                 + [_level_statements(level, "new", "", status_only=True) for level in levels],
+                 when=f"NOT ({MOVED})"),
+    ]
+
+
+def _count_statements(level: int, status_only: bool = False) -> list:
+    size = cell_size(level)
+    cell = (f"CAST((longitude + 180.0) / {size!r} AS INTEGER), "
+            f"CAST((latitude + 90.0) / {size!r} AS INTEGER)")
+    located = "WHERE latitude IS NOT NULL AND longitude IS NOT NULL"
+    status = [f"INSERT INTO {CLUSTER_TABLE}_status SELECT {level}, {cell}, {_status_sql('status')}, COUNT(*) "
+              f"FROM pollution_reports {located} GROUP BY 2, 3, 4"]
+    if status_only:
+        return status
+    return [f"INSERT INTO {CLUSTER_TABLE} SELECT {level}, {cell}, COUNT(*), SUM(severity), SUM(latitude), "
+            f"SUM(longitude) FROM pollution_reports {located} GROUP BY 2, 3"] + status
+
+
+def install_sqlite_clusters(engine) -> bool:
+    """Create the SQLite cell counters and their triggers, counting reports already stored.
+
+    Triggers from before statuses were normalized like status_key() are replaced, and the
+    status counts they kept are recounted.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.begin() as conn:
+        created = conn.execute(text(
+            "SELECT COUNT(*) FROM sqlite_master WHERE name = :name"), {"name": CLUSTER_TABLE}).scalar() == 0
+        trigger = conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE type = 'trigger' AND name = :name"),
+            {"name": f"{CLUSTER_TABLE}_insert"}).scalar()
+        stale = trigger is not None and _status_sql("new.status") not in trigger
+        if stale:
+            for name in ("insert", "delete", "move", "status"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {CLUSTER_TABLE}_{name}"))
+        for statement in cluster_ddl():
+            conn.execute(text(statement))
+        if created or stale:
+            if stale:
+                conn.execute(text(f"DELETE FROM {CLUSTER_TABLE}_status"))
+            for level in range(CLUSTER_MIN_ZOOM, CLUSTER_MAX_ZOOM + 1):
+                for statement in _count_statements(level, status_only=not created):
+                    conn.execute(text(statement))
+    return True
+
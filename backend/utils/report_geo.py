@@ -0,0 +1,139 @@
+import math
+from typing import Optional
+
+from sqlalchemy import text
+
+EARTH_RADIUS_M = 6378100.0
+RTREE_TABLE = "pollution_reports_rtree"
+
+
+def geo_point(latitude: Optional[float], longitude: Optional[float]) -> Optional[dict]:
+    """GeoJSON point stored alongside a report's latitude/longitude, None without both"""
+    if latitude is None or longitude is None:
+        return None
+    return {"type": "Point", "coordinates": [longitude, latitude]}
+
+
+def parse_bbox(value: str) -> tuple:
+    """'min_lng,min_lat,max_lng,max_lat' -> floats, raising ValueError when malformed"""
+    parts = [float(p) for p in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox needs min_lng,min_lat,max_lng,max_lat")
+    min_lng, min_lat, max_lng, max_lat = parts
+    if not (-180 <= min_lng < max_lng <= 180 and -90 <= min_lat < max_lat <= 90):
+        raise ValueError("bbox out of range")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def _orientation(a: list, b: list, c: list) -> int:
+    cross = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+    return (cross > 0) - (cross < 0)
+
+
+def _segments_meet(a: list, b: list, c: list, d: list) -> bool:
+    """Whether segments ab and cd share a point, touching or collinear overlap included"""
+    o1, o2, o3, o4 = _orientation(a, b, c), _orientation(a, b, d), _orientation(c, d, a), _orientation(c, d, b)
+    if o1 != o2 and o3 != o4:
+        return True
+    within = lambda p, q, r: min(p[0], q[0]) <= r[0] <= max(p[0], q[0]) and min(p[1], q[1]) <= r[1] <= max(p[1], q[1])
+    return ((o1 == 0 and within(a, b, c)) or (o2 == 0 and within(a, b, d))
+            or (o3 == 0 and within(c, d, a)) or (o4 == 0 and within(c, d, b)))
+
+
+def parse_polygon(value: str) -> list:
+    """'lng,lat;lng,lat;...' -> closed GeoJSON ring, raising ValueError when malformed,
+    out of range or self-intersecting (Mongo rejects those mid-query otherwise)"""
+    ring = [[float(c) for c in point.split(',')] for point in value.split(';') if point.strip()]
+    if any(len(point) != 2 for point in ring):
+        raise ValueError("polygon points need lng,lat")
+    if any(not (-180 <= lng <= 180 and -90 <= lat <= 90) for lng, lat in ring):
+        raise ValueError("polygon point out of range")
+    # Repeated consecutive points add nothing but zero-length edges
+    ring = [point for i, point in enumerate(ring) if i == 0 or point != ring[i - 1]]
+    if ring and ring[0] != ring[-1]:
+        ring.append(ring[0])
+    if len(ring) < 4:
+        raise ValueError("polygon needs at least 3 points")
+    edges = len(ring) - 1
+    for i in range(edges):
+        # Neighbouring edges share a vertex; every other pair must stay apart
+        for j in range(i + 2, edges - (i == 0)):
+            if _segments_meet(ring[i], ring[i + 1], ring[j], ring[j + 1]):
+                raise ValueError("polygon edges cross")
+    return ring
+
+
+def bbox_polygon(bbox: tuple) -> dict:
+    min_lng, min_lat, max_lng, max_lat = bbox
+    return {"type": "Polygon", "coordinates": [[
+        [min_lng, min_lat], [max_lng, min_lat], [max_lng, max_lat], [min_lng, max_lat], [min_lng, min_lat]
+    ]]}
+
+
+def near_filter(latitude: float, longitude: float, radius_m: float) -> dict:
+    """Mongo condition for reports within `radius_m` of a point (served by the 2dsphere index)"""
+    return {"geo": {"$geoWithin": {"$centerSphere": [[longitude, latitude], radius_m / EARTH_RADIUS_M]}}}
+
+
+def within_filter(geometry: dict) -> dict:
+    """Mongo condition for reports inside a GeoJSON polygon (served by the 2dsphere index)"""
+    return {"geo": {"$geoWithin": {"$geometry": geometry}}}
+
+
+def dense_cap(limit: int, total: int) -> int:
+    """Reports in an area beyond which a newest-first walk beats the spatial index.
+
+    Collecting an area's k reports through the spatial index and sorting them costs ~ k;
+    walking every report newest-first and testing its position stops after about
+    limit * total / k. The two cross at k = sqrt(limit * total), so counting the area's
+    reports can stop there and stays cheap.
+    """
+    return int(math.sqrt(limit * total)) + 1
+
+
+# SQLite: an R*Tree over pollution_reports, kept in step by triggers
+
+RTREE_DDL = [
+    # Also declared on PollutionReportDB; repeated here for databases created before them
+    "CREATE INDEX IF NOT EXISTS ix_pollution_reports_lat_lng ON pollution_reports (latitude, longitude)",
+    "CREATE INDEX IF NOT EXISTS ix_pollution_reports_created ON pollution_reports (created_at, report_id)",
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {RTREE_TABLE} USING rtree(id, min_lat, max_lat, min_lng, max_lng)",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_insert AFTER INSERT ON pollution_reports
+        WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL
+        BEGIN
+            INSERT INTO {RTREE_TABLE} VALUES (new.id, new.latitude, new.latitude, new.longitude, new.longitude);
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_update AFTER UPDATE OF latitude, longitude ON pollution_reports
+        BEGIN
+            DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+            INSERT INTO {RTREE_TABLE} SELECT new.id, new.latitude, new.latitude, new.longitude, new.longitude
+            WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+        END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {RTREE_TABLE}_delete AFTER DELETE ON pollution_reports
+        BEGIN
+            DELETE FROM {RTREE_TABLE} WHERE id = old.id;
+        END""",
+]
+
+
+def install_sqlite_rtree(engine) -> bool:
+    """Create the report R-tree and its triggers, indexing reports stored before it existed.
+
+    Returns False on non-SQLite databases or SQLite builds without the R*Tree module,
+    where the (latitude, longitude) index on PollutionReportDB serves box queries instead.
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    with engine.begin() as conn:
+        try:
+            created = conn.execute(text(
+                "SELECT COUNT(*) FROM sqlite_master WHERE name = :name"), {"name": RTREE_TABLE}).scalar() == 0
+            for statement in RTREE_DDL:
+                conn.execute(text(statement))
+        except Exception:
+            return False
+        if created:
+            conn.execute(text(
+                f"INSERT INTO {RTREE_TABLE} SELECT id, latitude, latitude, longitude, longitude "
+                f"FROM pollution_reports WHERE latitude IS NOT NULL AND longitude IS NOT NULL"))
+    return True
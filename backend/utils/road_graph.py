@@ -0,0 +1,323 @@
+"""
+Preprocessed road graph for the route planner: a directed CSR adjacency structure stored
+as one .npy file per array, memory-mapped on load so every worker shares the same pages.
+
+Build it once from an OpenStreetMap extract (.osm XML, optionally .gz/.bz2; convert a
+.pbf first with `osmium cat delhi.osm.pbf -o delhi.osm`):
+
+    cd backend && python -m utils.road_graph --osm delhi.osm --out data/road_graph
+
+or, for development without an extract, a jittered street grid over the NCR bounds:
+
+    cd backend && python -m utils.road_graph --synthetic --out data/road_graph [--spacing-m 120]
+
+Edge e runs tail[e] -> head[e] and is stored in tail order, so the out-edges of node u
+are indptr[u]:indptr[u + 1]. rev_indptr/rev_indices are the same graph transposed, with
+rev_edge mapping each reversed slot back to its forward edge id. Only the largest
+strongly connected component is kept, so any two snapped points are connected.
+"""
+
+import os
+import bz2
+import gzip
+import json
+import math
+import time
+import argparse
+import logging
+from pathlib import Path
+from dataclasses import dataclass
+from datetime import datetime, timezone
+import xml.etree.ElementTree as ET
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+logger = logging.getLogger(__name__)
+
+GRAPH_FORMAT = 1
+DEFAULT_GRAPH_DIR = Path(__file__).parent.parent / 'data' / 'road_graph'
+EARTH_RADIUS_M = 6_371_000.0
+M_PER_DEG = 111_195.0
+ARRAYS = ("lat", "lng", "indptr", "tail", "head", "length_m", "speed_kmh",
+          "rev_indptr", "rev_indices", "rev_edge")
+
+# Assumed speeds (km/h) of drivable OSM highway classes without a usable maxspeed tag
+ROAD_SPEEDS = {
+    "motorway": 80, "motorway_link": 50,
+    "trunk": 60, "trunk_link": 40,
+    "primary": 50, "primary_link": 35,
+    "secondary": 40, "secondary_link": 30,
+    "tertiary": 35, "tertiary_link": 25,
+    "unclassified": 25, "residential": 25,
+    "living_street": 10, "service": 15,
+}
+ONEWAY_CLASSES = {"motorway", "motorway_link"}
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    lat1, lng1, lat2, lng2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lng1, lat2, lng2))
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def build_graph(lat, lng, tail, head, length_m, speed_kmh) -> dict:
+    """CSR arrays (see ARRAYS) from an edge list; drops self-loops, keeps the shortest of
+    parallel edges and prunes everything outside the largest strongly connected component"""
+    lat, lng = np.asarray(lat, dtype=np.float64), np.asarray(lng, dtype=np.float64)
+    tail, head = np.asarray(tail, dtype=np.int64), np.asarray(head, dtype=np.int64)
+    length_m = np.maximum(np.asarray(length_m, dtype=np.float64), 0.1)  # csgraph reads 0 as "no edge"
+    speed_kmh = np.clip(np.asarray(speed_kmh), 5, 130).astype(np.uint8)
+
+    keep = tail != head
+    tail, head, length_m, speed_kmh = tail[keep], head[keep], length_m[keep], speed_kmh[keep]
+    order = np.lexsort((length_m, head, tail))
+    tail, head, length_m, speed_kmh = tail[order], head[order], length_m[order], speed_kmh[order]
+    first = np.ones(len(tail), dtype=bool)
+    first[1:] = (tail[1:] != tail[:-1]) | (head[1:] != head[:-1])
+    tail, head, length_m, speed_kmh = tail[first], head[first], length_m[first], speed_kmh[first]
+
+    n = len(lat)
+    adjacency = csr_matrix((np.ones(len(tail)), (tail, head)), shape=(n, n))
+    _, component = connected_components(adjacency, directed=True, connection='strong')
+    largest = np.bincount(component).argmax()
+    kept = component == largest
+    renumber = np.full(n, -1, dtype=np.int64)
+    renumber[kept] = np.arange(kept.sum())
+    edge_kept = kept[tail] & kept[head]
+    tail, head = renumber[tail[edge_kept]], renumber[head[edge_kept]]
+    length_m, speed_kmh = length_m[edge_kept], speed_kmh[edge_kept]
+    lat, lng = lat[kept], lng[kept]
+    n = len(lat)
+
+    # Already sorted by tail; renumbering preserves the order
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(tail, minlength=n), out=indptr[1:])
+    rev_edge = np.argsort(head, kind='stable')
+    rev_indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(head, minlength=n), out=rev_indptr[1:])
+
+    return {
+        "lat": lat.astype(np.float32),
+        "lng": lng.astype(np.float32),
+        "indptr": indptr.astype(np.int32),
+        "tail": tail.astype(np.int32),
+        "head": head.astype(np.int32),
+        "length_m": length_m.astype(np.float32),
+        "speed_kmh": speed_kmh,
+        "rev_indptr": rev_indptr.astype(np.int32),
+        "rev_indices": tail[rev_edge].astype(np.int32),
+        "rev_edge": rev_edge.astype(np.int32),
+    }
+
+
+def save_graph(directory: Path, arrays: dict, source: str):
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name in ARRAYS:
+        np.save(directory / f"{name}.npy", np.ascontiguousarray(arrays[name]))
+    meta = {
+        "format": GRAPH_FORMAT,
+        "nodes": int(len(arrays["lat"])),
+        "edges": int(len(arrays["head"])),
+        "bounds": [float(arrays["lng"].min()), float(arrays["lat"].min()),
+                   float(arrays["lng"].max()), float(arrays["lat"].max())],
+        "source": source,
+        "built_at": datetime.now(timezone.utc).isoformat()
+    }
+    with open(directory / "meta.json", "w") as f:
+        json.dump(meta, f, indent=1)
+    logger.info(f"✅ Road graph: {meta['nodes']} nodes, {meta['edges']} edges -> {directory}")
+    return meta
+
+
+def _open_osm(path: Path):
+    if path.suffix == '.gz':
+        return gzip.open(path, 'rb')
+    if path.suffix == '.bz2':
+        return bz2.open(path, 'rb')
+    return open(path, 'rb')
+
+
+def _maxspeed(value) -> float:
+    """km/h from an OSM maxspeed tag ("50", "30 mph"), NaN if it is not a number"""
+    if not value:
+        return math.nan
+    number, _, unit = value.strip().partition(' ')
+    try:
+        speed = float(number)
+    except ValueError:
+        return math.nan
+    return speed * 1.609 if unit.strip() == 'mph' else speed
+
+
+def _drivable(tags: dict) -> bool:
+    return (tags.get('highway') in ROAD_SPEEDS and tags.get('area') != 'yes'
+            and tags.get('access') not in ('no', 'private') and tags.get('motor_vehicle') not in ('no', 'private'))
+
+
+def parse_osm(path: Path) -> dict:
+    """Edge list of the drivable ways in an OSM XML extract.
+
+    Two streaming passes so only the coordinates of road nodes are ever held: the first
+    collects the ways, the second the nodes they reference.
+    """
+    path = Path(path)
+    tails, heads, speeds, used = [], [], [], set()
+    with _open_osm(path) as f:
+        for _, elem in ET.iterparse(f, events=('end',)):
+            if elem.tag == 'way':
+                tags = {tag.get('k'): tag.get('v') for tag in elem.iter('tag')}
+                if _drivable(tags):
+                    refs = [int(nd.get('ref')) for nd in elem.iter('nd')]
+                    speed = _maxspeed(tags.get('maxspeed'))
+                    speed = ROAD_SPEEDS[tags['highway']] if math.isnan(speed) else speed
+                    oneway = tags.get('oneway', 'yes' if tags['highway'] in ONEWAY_CLASSES
+                                      or tags.get('junction') == 'roundabout' else 'no')
+                    if oneway == '-1':
+                        refs.reverse()
+                    for a, b in zip(refs, refs[1:]):
+                        tails.append(a)
+                        heads.append(b)
+                        speeds.append(speed)
+                        if oneway not in ('yes', 'true', '1', '-1'):
+                            tails.append(b)
+                            heads.append(a)
+                            speeds.append(speed)
+                    used.update(refs)
+                elem.clear()
+            elif elem.tag in ('node', 'relation'):
+                elem.clear()
+
+    coords = {}
+    with _open_osm(path) as f:
+        for _, elem in ET.iterparse(f, events=('end',)):
+            if elem.tag == 'node':
+                osm_id = int(elem.get('id'))
+                if osm_id in used:
+                    coords[osm_id] = (float(elem.get('lat')), float(elem.get('lon')))
+            elem.clear()
+
+    osm_ids = np.array(sorted(coords), dtype=np.int64)
+    lat = np.array([coords[i][0] for i in osm_ids])
+    lng = np.array([coords[i][1] for i in osm_ids])
+    tails, heads = np.array(tails, dtype=np.int64), np.array(heads, dtype=np.int64)
+    known = np.isin(tails, osm_ids) & np.isin(heads, osm_ids)   # ways clipped at the extract edge
+    tail = np.searchsorted(osm_ids, tails[known])
+    head = np.searchsorted(osm_ids, heads[known])
+    return {
+        "lat": lat, "lng": lng, "tail": tail, "head": head,
+        "length_m": haversine_m(lat[tail], lng[tail], lat[head], lng[head]),
+        "speed_kmh": np.array(speeds)[known]
+    }
+
+
+def synthetic_grid(bounds: tuple, spacing_m: float = 120.0, arterial_every: int = 8, seed: int = 0) -> dict:
+    """Edge list of a jittered two-way street grid: every `arterial_every`-th street is a
+    50 km/h arterial, the rest 25 km/h residential streets"""
+    min_lng, min_lat, max_lng, max_lat = bounds
+    rng = np.random.default_rng(seed)
+    kx = math.cos(math.radians((min_lat + max_lat) / 2))
+    rows = int((max_lat - min_lat) * M_PER_DEG / spacing_m) + 1
+    cols = int((max_lng - min_lng) * M_PER_DEG * kx / spacing_m) + 1
+    jitter = 0.2 * spacing_m / M_PER_DEG
+    lat = np.repeat(np.linspace(min_lat, max_lat, rows), cols) + rng.uniform(-jitter, jitter, rows * cols)
+    lng = np.tile(np.linspace(min_lng, max_lng, cols), rows) + rng.uniform(-jitter, jitter, rows * cols) / kx
+
+    node = np.arange(rows * cols).reshape(rows, cols)
+    east = (node[:, :-1].ravel(), node[:, 1:].ravel(), np.repeat(np.arange(rows) % arterial_every == 0, cols - 1))
+    north = (node[:-1, :].ravel(), node[1:, :].ravel(), np.tile(np.arange(cols) % arterial_every == 0, rows - 1))
+    a = np.concatenate([east[0], north[0]])
+    b = np.concatenate([east[1], north[1]])
+    arterial = np.concatenate([east[2], north[2]])
+    tail, head = np.concatenate([a, b]), np.concatenate([b, a])
+    return {
+        "lat": lat, "lng": lng, "tail": tail, "head": head,
+        "length_m": haversine_m(lat[tail], lng[tail], lat[head], lng[head]),
+        "speed_kmh": np.where(np.concatenate([arterial, arterial]), 50, 25)
+    }
+
+
+@dataclass(frozen=True)
+class RoadGraph:
+    """A loaded road graph. The arrays are read-only memory maps of the files on disk."""
+    directory: Path
+    meta: dict
+    lat: np.ndarray
+    lng: np.ndarray
+    indptr: np.ndarray
+    tail: np.ndarray
+    head: np.ndarray
+    length_m: np.ndarray
+    speed_kmh: np.ndarray
+    rev_indptr: np.ndarray
+    rev_indices: np.ndarray
+    rev_edge: np.ndarray
+    kx: float
+    tree: cKDTree
+
+    @classmethod
+    def load(cls, directory: Path) -> "RoadGraph":
+        directory = Path(directory)
+        with open(directory / "meta.json") as f:
+            meta = json.load(f)
+        if meta.get("format") != GRAPH_FORMAT:
+            raise ValueError(f"Road graph format {meta.get('format')} in {directory}, expected {GRAPH_FORMAT}; rebuild it")
+        arrays = {name: np.load(directory / f"{name}.npy", mmap_mode='r') for name in ARRAYS}
+        min_lng, min_lat, max_lng, max_lat = meta["bounds"]
+        kx = math.cos(math.radians((min_lat + max_lat) / 2))
+        # Snapping index on equirectangular coordinates; the only structure built in memory
+        tree = cKDTree(np.column_stack([arrays["lat"], arrays["lng"] * kx]).astype(np.float64))
+        return cls(directory=directory, meta=meta, kx=kx, tree=tree, **arrays)
+
+    @property
+    def nodes(self) -> int:
+        return len(self.lat)
+
+    @property
+    def edges(self) -> int:
+        return len(self.head)
+
+    def nearest_node(self, lat: float, lng: float) -> tuple:
+        """(node, distance in metres) of the graph node closest to a point"""
+        distance, node = self.tree.query([lat, lng * self.kx])
+        return int(node), float(distance) * M_PER_DEG
+
+    def out_edges(self, nodes: np.ndarray) -> tuple:
+        """(edge ids, out-degree of each node): the out-edges of `nodes`, node by node"""
+        starts = self.indptr[nodes].astype(np.int64)
+        counts = self.indptr[np.asarray(nodes) + 1] - starts
+        return np.arange(counts.sum()) + np.repeat(starts - np.cumsum(counts) + counts, counts), counts
+
+    def path_edges(self, nodes: list) -> np.ndarray:
+        """Edge ids along a node path (parallel edges are merged at build time, so one per hop)"""
+        nodes = np.asarray(nodes, dtype=np.int64)
+        edges, counts = self.out_edges(nodes[:-1])
+        return edges[self.head[edges] == np.repeat(nodes[1:], counts)]
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Build the route planner's road graph")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--osm', help='OpenStreetMap XML extract (.osm, .osm.gz, .osm.bz2)')
+    source.add_argument('--synthetic', action='store_true', help='jittered street grid over the bounds instead')
+    parser.add_argument('--out', default=os.environ.get('ROAD_GRAPH_DIR', str(DEFAULT_GRAPH_DIR)))
+    parser.add_argument('--bounds', help='min_lng,min_lat,max_lng,max_lat for --synthetic (default: Delhi NCR)')
+    parser.add_argument('--spacing-m', type=float, default=120.0)
+    args = parser.parse_args()
+
+    from utils.station_ingester import NCR_BOUNDS, parse_bounds
+
+    started = time.perf_counter()
+    if args.osm:
+        edges = parse_osm(Path(args.osm))
+        label = Path(args.osm).name
+    else:
+        bounds = parse_bounds(args.bounds) if args.bounds else NCR_BOUNDS
+        edges = synthetic_grid(bounds, args.spacing_m)
+        label = f"synthetic:{args.spacing_m:g}m"
+    save_graph(Path(args.out), build_graph(**edges), label)
+    logger.info(f"⏱️  Built in {time.perf_counter() - started:.1f} s")
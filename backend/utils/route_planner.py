@@ -0,0 +1,319 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from pathlib import Path
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+from utils.road_graph import RoadGraph, DEFAULT_GRAPH_DIR, haversine_m
+
+logger = logging.getLogger(__name__)
+
+# Exposure cost of an edge: length * (1 + exposure_weight * aqi / AQI_REFERENCE)
+AQI_REFERENCE = 100.0
+# Search radius retries before giving up on a bound and searching the whole graph
+LIMIT_DOUBLINGS = 3
+# Observed fastest-route detours kept to size the next search, and how many before trusting them
+DETOUR_SAMPLES = 256
+DETOUR_MIN_SAMPLES = 16
+# Without a road graph: straight-line routes sampled about this often, at this average speed
+STRAIGHT_SAMPLE_M = 500.0
+STRAIGHT_SPEED_KMH = 25.0
+
+
+@dataclass(frozen=True)
+class CostGraph:
+    """One set of edge weights over a RoadGraph, in both directions, ready for csgraph"""
+    weight: np.ndarray
+    forward: csr_matrix
+    backward: csr_matrix
+    per_metre: float
+    max_weight: float
+
+    @classmethod
+    def build(cls, graph: RoadGraph, weight: np.ndarray) -> "CostGraph":
+        weight = np.ascontiguousarray(weight, dtype=np.float64)
+        shape = (graph.nodes, graph.nodes)
+        length = np.asarray(graph.length_m, dtype=np.float64)
+        return cls(
+            weight=weight,
+            forward=csr_matrix((weight, graph.head, graph.indptr), shape=shape),
+            backward=csr_matrix((weight[graph.rev_edge], graph.rev_indices, graph.rev_indptr), shape=shape),
+            per_metre=float(weight.sum() / length.sum()),
+            max_weight=float(weight.max(initial=0.0))
+        )
+
+
+@dataclass(frozen=True)
+class Exposure:
+    """AQI along the road graph for one raster, and the exposure-weighted costs"""
+    raster_etag: str
+    node_aqi: np.ndarray
+    edge_aqi: np.ndarray
+    costs: CostGraph
+
+
+def _chain(predecessors: np.ndarray, node: int) -> list:
+    nodes = [node]
+    while predecessors[node] >= 0:
+        node = int(predecessors[node])
+        nodes.append(node)
+    return nodes
+
+
+def shortest_path(graph: RoadGraph, costs: CostGraph, source: int, target: int, limit: float) -> Optional[tuple]:
+    """(cost, nodes) of the cheapest source -> target path, None if there is none.
+
+    Bidirectional Dijkstra on scipy's csgraph: a forward search from the source and a
+    backward one from the target, each stopped at limit / 2, so together they settle two
+    discs of half the radius instead of one full one. Any path costing at most `limit`
+    has an edge u -> v with u settled forward and v backward, so the cheapest such edge
+    (or node both searches reached) is the optimum. Otherwise the limit is doubled.
+
+    When the best node is at least one edge weight under the limit, the searches overlap
+    along the whole optimal path and the edge scan is skipped.
+    """
+    for attempt in range(LIMIT_DOUBLINGS + 2):
+        half = limit / 2
+        forward, before = dijkstra(costs.forward, indices=source, return_predecessors=True, limit=half)
+        backward, after = dijkstra(costs.backward, indices=target, return_predecessors=True, limit=half)
+
+        through = forward + backward
+        meet = int(np.argmin(through))
+        best, edge = through[meet], None
+
+        if best > limit - costs.max_weight:
+            # The optimum may cross on an edge: scan the out-edges of every forward-settled node
+            settled = np.flatnonzero(np.isfinite(forward))
+            edges, counts = graph.out_edges(settled)
+            if len(edges):
+                crossing = np.repeat(forward[settled], counts) + costs.weight[edges] + backward[graph.head[edges]]
+                cheapest = int(np.argmin(crossing))
+                if crossing[cheapest] < best:
+                    best, edge = crossing[cheapest], int(edges[cheapest])
+
+        if best <= limit:
+            if edge is None:
+                return float(best), _chain(before, meet)[::-1] + _chain(after, meet)[1:]
+            return float(best), _chain(before, int(graph.tail[edge]))[::-1] + _chain(after, int(graph.head[edge]))
+        if np.isinf(limit):
+            return None
+        limit = limit * 2 if attempt < LIMIT_DOUBLINGS else np.inf
+    return None
+
+
+class RoutePlanner:
+    """Cleanest and fastest driving routes on the preprocessed road graph (utils/road_graph.py).
+
+    `load` memory-maps the graph and builds the travel-time costs once. Exposure costs
+    depend on the AQI raster: node AQIs are sampled from it and the weights rebuilt the
+    first time a route is asked for on a new raster, then reused until the next one.
+    """
+
+    def __init__(self):
+        self.directory = Path(os.environ.get('ROAD_GRAPH_DIR', str(DEFAULT_GRAPH_DIR)))
+        self.exposure_weight = float(os.environ.get('ROUTE_EXPOSURE_WEIGHT', '2'))
+        self.max_snap_m = float(os.environ.get('ROUTE_MAX_SNAP_M', '1500'))
+        # Fastest-route search bound, as a multiple of the straight line at the graph's mean
+        # cost per metre, until enough routes have been planned to use what they took
+        self.detour = float(os.environ.get('ROUTE_SEARCH_DETOUR', '1.0'))
+        # Appended to by planning threads while stats() and other plans read it
+        self._detours = deque(maxlen=DETOUR_SAMPLES)
+        self._detours_lock = threading.Lock()
+
+        self.graph: Optional[RoadGraph] = None
+        self.travel: Optional[CostGraph] = None
+        self._exposure: Optional[Exposure] = None
+        self._exposure_lock = asyncio.Lock()
+
+        self.plans = 0
+        self.straight_plans = 0
+        self.failures = 0
+        self.exposure_builds = 0
+        self.last_plan_ms: Optional[float] = None
+        self.total_plan_ms = 0.0
+        self.last_error: Optional[str] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.graph is not None
+
+    def load(self) -> bool:
+        """Memory-map the graph; the planner stays unavailable if there is none"""
+        if not (self.directory / "meta.json").exists():
+            self.last_error = f"No road graph in {self.directory}"
+            logger.warning(f"⚠️  No road graph in {self.directory}; route planning is disabled "
+                           f"(build one with python -m utils.road_graph)")
+            return False
+        try:
+            started = time.perf_counter()
+            graph = RoadGraph.load(self.directory)
+            seconds = np.asarray(graph.length_m, dtype=np.float64) / (np.asarray(graph.speed_kmh, dtype=np.float64) / 3.6)
+            self.travel = CostGraph.build(graph, seconds)
+            self.graph, self._exposure = graph, None
+            self.last_error = None
+            logger.info(f"✅ Road graph {graph.meta.get('source')}: {graph.nodes} nodes, {graph.edges} edges "
+                        f"mapped in {(time.perf_counter() - started) * 1000:.0f} ms")
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            logger.error(f"Error loading road graph: {str(e)}")
+            return False
+
+    def _build_exposure(self, raster) -> Exposure:
+        graph = self.graph
+        node_aqi = raster.sample_points(graph.lat, graph.lng).astype(np.float32)
+        if np.isnan(node_aqi).all():
+            node_aqi[:] = 0.0
+        else:
+            # Roads beyond the raster count at the raster mean
+            node_aqi[np.isnan(node_aqi)] = np.nanmean(node_aqi)
+        edge_aqi = (node_aqi[graph.tail] + node_aqi[graph.head]) / 2
+        weight = np.asarray(graph.length_m, dtype=np.float64) * (1 + self.exposure_weight * edge_aqi / AQI_REFERENCE)
+        return Exposure(raster.etag, node_aqi, edge_aqi, CostGraph.build(graph, weight))
+
+    async def exposure(self, raster) -> Exposure:
+        """Exposure costs for `raster`, built once per raster however many requests ask"""
+        async with self._exposure_lock:
+            if self._exposure is None or self._exposure.raster_etag != raster.etag:
+                started = time.perf_counter()
+                self._exposure = await asyncio.to_thread(self._build_exposure, raster)
+                self.exposure_builds += 1
+                logger.info(f"✅ Route exposure costs for raster v{raster.version} "
+                            f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+            return self._exposure
+
+    def search_detour(self) -> float:
+        """Bound for the next fastest-route search: a little over nearly every recent detour.
+        Too low costs a retry at twice the bound, too high a search over a wider disc."""
+        with self._detours_lock:
+            detours = list(self._detours)
+        if len(detours) < DETOUR_MIN_SAMPLES:
+            return self.detour
+        return float(np.percentile(detours, 95)) * 1.05
+
+    def _route(self, exposure: Exposure, nodes: list) -> dict:
+        graph = self.graph
+        edges = graph.path_edges(nodes)
+        length = np.asarray(graph.length_m[edges], dtype=np.float64)
+        aqi = exposure.edge_aqi[edges]
+        node_aqi = exposure.node_aqi[nodes]
+        return {
+            "route_points": [
+                {"lat": round(float(lat), 6), "lng": round(float(lng), 6), "aqi": round(float(value), 1)}
+                for lat, lng, value in zip(graph.lat[nodes], graph.lng[nodes], node_aqi)
+            ],
+            "distance_km": round(float(length.sum()) / 1000, 2),
+            "duration_min": round(float(self.travel.weight[edges].sum()) / 60, 1),
+            "avg_aqi": round(float((aqi * length).sum() / length.sum()) if len(edges) else float(node_aqi[0]), 1),
+            "max_aqi": round(float(node_aqi.max()), 1)
+        }
+
+    def _plan(self, exposure: Exposure, start: tuple, end: tuple) -> dict:
+        graph = self.graph
+        source, source_m = graph.nearest_node(*start)
+        target, target_m = graph.nearest_node(*end)
+        for label, snapped in (("Start", source_m), ("End", target_m)):
+            if snapped > self.max_snap_m:
+                raise ValueError(f"{label} point is {snapped:.0f} m from the nearest road in the graph")
+
+        straight = float(haversine_m(graph.lat[source], graph.lng[source], graph.lat[target], graph.lng[target]))
+        expected = straight * self.travel.per_metre
+        fastest = shortest_path(graph, self.travel, source, target, max(expected * self.search_detour(), 1.0))
+        if fastest is None:
+            return None
+        if expected > 0:
+            with self._detours_lock:
+                self._detours.append(fastest[0] / expected)
+        # The fastest route is a feasible path, so its exposure cost bounds the cleanest one
+        bound = float(exposure.costs.weight[graph.path_edges(fastest[1])].sum())
+        cleanest = shortest_path(graph, exposure.costs, source, target, max(bound, 1.0))
+        return {
+            "fastest": self._route(exposure, fastest[1]),
+            "cleanest": self._route(exposure, cleanest[1]),
+            "snap_m": [round(source_m, 1), round(target_m, 1)]
+        }
+
+    async def plan(self, raster, start: tuple, end: tuple) -> Optional[dict]:
+        """Cleanest and fastest routes between two (lat, lng) points, None if unconnected.
+
+        Raises ValueError when an endpoint is too far from the road network.
+        """
+        exposure = await self.exposure(raster)
+        started = time.perf_counter()
+        try:
+            result = await asyncio.to_thread(self._plan, exposure, start, end)
+        except ValueError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            raise
+        elapsed = (time.perf_counter() - started) * 1000
+        self.plans += 1
+        self.last_plan_ms = round(elapsed, 2)
+        self.total_plan_ms += elapsed
+        if result is not None:
+            result["planning_ms"] = self.last_plan_ms
+        return result
+
+    def _straight(self, raster, start: tuple, end: tuple) -> dict:
+        distance = float(haversine_m(*start, *end))
+        steps = max(int(np.ceil(distance / STRAIGHT_SAMPLE_M)), 2)
+        lat = np.linspace(start[0], end[0], steps + 1)
+        lng = np.linspace(start[1], end[1], steps + 1)
+        aqi = raster.sample_points(lat, lng)
+        if np.isnan(aqi).all():
+            aqi[:] = 0.0
+        else:
+            aqi[np.isnan(aqi)] = np.nanmean(aqi)
+        route = {
+            "route_points": [
+                {"lat": round(float(a), 6), "lng": round(float(b), 6), "aqi": round(float(value), 1)}
+                for a, b, value in zip(lat, lng, aqi)
+            ],
+            "distance_km": round(distance / 1000, 2),
+            "duration_min": round(distance / (STRAIGHT_SPEED_KMH / 3.6) / 60, 1),
+            "avg_aqi": round(float(aqi.mean()), 1),
+            "max_aqi": round(float(aqi.max()), 1)
+        }
+        return {"fastest": route, "cleanest": route}
+
+    async def straight(self, raster, start: tuple, end: tuple) -> dict:
+        """The straight line between two (lat, lng) points scored against `raster`, in the
+        shape of `plan`; what /routes/safe answers until a road graph is built"""
+        started = time.perf_counter()
+        result = await asyncio.to_thread(self._straight, raster, start, end)
+        self.straight_plans += 1
+        result["planning_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return result
+
+    def stats(self) -> dict:
+        graph = self.graph
+        return {
+            'loaded': graph is not None,
+            'directory': str(self.directory),
+            'source': graph.meta.get('source') if graph else None,
+            'nodes': graph.nodes if graph else 0,
+            'edges': graph.edges if graph else 0,
+            'exposure_weight': self.exposure_weight,
+            'exposure_raster': self._exposure.raster_etag if self._exposure else None,
+            'exposure_builds': self.exposure_builds,
+            'search_detour': round(self.search_detour(), 3),
+            'plans': self.plans,
+            'straight_plans': self.straight_plans,
+            'failures': self.failures,
+            'last_plan_ms': self.last_plan_ms,
+            'avg_plan_ms': round(self.total_plan_ms / self.plans, 2) if self.plans else None,
+            'last_error': self.last_error
+        }
+
+
+route_planner = RoutePlanner()
@@ -0,0 +1,33 @@
+import asyncio
+
+
+class SingleFlight:
+    """Concurrent requests for the same key share one run of the work behind it.
+
+    The work runs as its own task and every caller awaits it through asyncio.shield, so
+    a caller that is cancelled (a client that went away, a timeout) stops waiting without
+    aborting the work for the others. The key is released when the work finishes, so a
+    call after a failure starts a fresh run.
+    """
+
+    def __init__(self):
+        self._tasks = {}
+        self.coalesced = 0
+
+    async def run(self, key, work):
+        """Result of `work()`, shared with every call for `key` made while it runs"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(self._run(key, work))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    async def _run(self, key, work):
+        try:
+            return await work()
+        finally:
+            self._tasks.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._tasks)
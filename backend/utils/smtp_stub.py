@@ -0,0 +1,151 @@
+"""
+Local SMTP stand-in for development and tests: accepts mail on localhost and keeps it in
+memory instead of delivering it.
+
+    cd backend && python -m utils.smtp_stub --port 1025 [--delay-ms 50] [--connect-delay-ms 100] [--fail-rate 0.2]
+
+and point the app at it with EMAIL_HOST=localhost EMAIL_PORT=1025 EMAIL_STARTTLS=false.
+It speaks the subset of SMTP aiosmtplib uses (EHLO/HELO, AUTH PLAIN/LOGIN accepting any
+credentials, MAIL, RCPT, DATA, RSET, NOOP, QUIT) and advertises PIPELINING. `delay_ms`
+simulates a slow server on each accepted message and `connect_delay_ms` the cost of
+setting up a session (TCP, STARTTLS, AUTH) before the greeting; `fail_rate` answers that
+share of messages with a temporary 451 failure, to exercise retries.
+"""
+
+import time
+import random
+import asyncio
+import argparse
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LocalSMTPServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 1025, delay_ms: float = 0, fail_rate: float = 0.0,
+                 connect_delay_ms: float = 0):
+        self.host = host
+        self.port = port
+        self.delay = delay_ms / 1000.0
+        self.connect_delay = connect_delay_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.messages = []
+        self.sessions = 0
+        self.rejected = 0
+        self._server = None
+        self._writers = set()
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._session, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"✅ Local SMTP server listening on {self.host}:{self.port}")
+        return self
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            # Drop open sessions too, as a restarting mail server would
+            for writer in list(self._writers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _session(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.sessions += 1
+        self._writers.add(writer)
+
+        async def reply(line: str):
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        mail_from, rcpts = None, []
+        try:
+            if self.connect_delay:
+                await asyncio.sleep(self.connect_delay)
+            await reply("220 localhost ESMTP smtp_stub")
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                command = line.decode(errors='replace').strip()
+                verb = command.split(' ', 1)[0].upper()
+
+                if verb == 'EHLO':
+                    await reply("250-localhost\r\n250-PIPELINING\r\n250-8BITMIME\r\n250-SIZE 10485760\r\n250 AUTH PLAIN LOGIN")
+                elif verb == 'HELO':
+                    await reply("250 localhost")
+                elif verb == 'AUTH':
+                    parts = command.split()
+                    if parts[1].upper() == 'LOGIN':
+                        await reply("334 VXNlcm5hbWU6")
+                        await reader.readline()
+                        await reply("334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    elif len(parts) == 2:
+                        await reply("334 ")
+                        await reader.readline()
+                    await reply("235 2.7.0 Authentication successful")
+                elif verb == 'MAIL':
+                    mail_from, rcpts = command[10:].strip(), []
+                    await reply("250 2.1.0 OK")
+                elif verb == 'RCPT':
+                    rcpts.append(command[8:].strip())
+                    await reply("250 2.1.5 OK")
+                elif verb == 'DATA':
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = []
+                    while True:
+                        chunk = await reader.readline()
+                        if not chunk or chunk in (b".\r\n", b".\n"):
+                            break
+                        data.append(chunk[1:] if chunk.startswith(b"..") else chunk)
+                    if self.delay:
+                        await asyncio.sleep(self.delay)
+                    if self.fail_rate and random.random() < self.fail_rate:
+                        self.rejected += 1
+                        await reply("451 4.3.0 Temporary failure, try again later")
+                    else:
+                        self.messages.append({'from': mail_from, 'to': rcpts, 'data': b"".join(data),
+                                              'received_at': time.time()})
+                        await reply("250 2.0.0 OK queued")
+                    mail_from, rcpts = None, []
+                elif verb == 'RSET':
+                    mail_from, rcpts = None, []
+                    await reply("250 OK")
+                elif verb == 'NOOP':
+                    await reply("250 OK")
+                elif verb == 'QUIT':
+                    await reply("221 Bye")
+                    break
+                else:
+                    await reply("502 5.5.2 Command not implemented")
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+
+async def serve(args):
+    server = await LocalSMTPServer(args.host, args.port, args.delay_ms, args.fail_rate, args.connect_delay_ms).start()
+    try:
+        while True:
+            await asyncio.sleep(10)
+            logger.info(f"📬 {len(server.messages)} messages received, {server.rejected} rejected, "
+                        f"{server.sessions} sessions")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local SMTP stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=1025)
+    parser.add_argument('--delay-ms', type=float, default=0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--connect-delay-ms', type=float, default=0)
+    try:
+        asyncio.run(serve(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,347 @@
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from database import SessionLocal, AQIStationDB
+from utils.waqi_client import waqi_client
+
+logger = logging.getLogger(__name__)
+
+# Delhi NCR: min_lng, min_lat, max_lng, max_lat
+NCR_BOUNDS = (76.84, 28.20, 77.65, 28.90)
+POLLUTANTS = ("pm25", "pm10", "no2", "so2", "co", "o3")
+KM_PER_DEG = 111.2
+
+
+def parse_bounds(value: str) -> tuple:
+    min_lng, min_lat, max_lng, max_lat = (float(p) for p in value.split(','))
+    if not (min_lng < max_lng and min_lat < max_lat):
+        raise ValueError(f"Invalid bounds {value!r}")
+    return min_lng, min_lat, max_lng, max_lat
+
+
+def _number(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def _observed_at(*times) -> float:
+    """Epoch seconds of the first parseable ISO 8601 time, NaN if none"""
+    for value in times:
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except (TypeError, ValueError):
+            continue
+    return math.nan
+
+
+@dataclass(frozen=True)
+class StationTable:
+    """Latest reading of every station in the bounds, one numpy column per field.
+
+    Row i of every column is the same station. Shared by every request: read-only.
+    Missing values are NaN; `feeds[i]` is the station's detail feed payload, or None.
+    """
+    version: int
+    fetched_at: datetime
+    uid: np.ndarray
+    lat: np.ndarray
+    lng: np.ndarray
+    aqi: np.ndarray
+    pollutants: dict
+    observed_at: np.ndarray
+    names: tuple
+    feeds: tuple
+    source: str = "live"
+
+    def __len__(self) -> int:
+        return len(self.uid)
+
+    def nearest(self, lat: float, lng: float, max_km: float = math.inf) -> Optional[int]:
+        """Row of the closest station with an AQI, None if there is none within `max_km`"""
+        if not len(self):
+            return None
+        dx = (self.lng - lng) * math.cos(math.radians(lat))
+        d2 = np.where(np.isnan(self.aqi), np.inf, (self.lat - lat) ** 2 + dx ** 2)
+        row = int(np.argmin(d2))
+        if not math.sqrt(d2[row]) * KM_PER_DEG <= max_km:
+            return None
+        return row
+
+    def readings(self) -> tuple:
+        """(lats, lngs, aqis) of the stations that report an AQI"""
+        valid = ~np.isnan(self.aqi)
+        return self.lat[valid], self.lng[valid], self.aqi[valid]
+
+    @classmethod
+    def from_rows(cls, version: int, fetched_at: datetime, rows: list, source: str = "live") -> "StationTable":
+        """Columns from row dicts with uid, name, lat, lng, aqi, the POLLUTANTS, observed_at, feed"""
+        return cls(
+            version=version,
+            fetched_at=fetched_at,
+            uid=np.array([row['uid'] for row in rows], dtype=np.int64),
+            lat=np.array([row['lat'] for row in rows], dtype=np.float64),
+            lng=np.array([row['lng'] for row in rows], dtype=np.float64),
+            aqi=np.array([row['aqi'] for row in rows], dtype=np.float32),
+            pollutants={name: np.array([row[name] for row in rows], dtype=np.float32) for name in POLLUTANTS},
+            observed_at=np.array([row['observed_at'] for row in rows], dtype=np.float64),
+            names=tuple(row['name'] for row in rows),
+            feeds=tuple(row['feed'] for row in rows),
+            source=source
+        )
+
+
+def station_row(listing: dict, feed: Optional[dict]) -> Optional[dict]:
+    """One normalized station from its map/bounds entry and (optional) detail feed"""
+    try:
+        uid, lat, lng = int(listing['uid']), float(listing['lat']), float(listing['lon'])
+    except (KeyError, TypeError, ValueError):
+        return None
+    feed = feed or {}
+    iaqi = feed.get('iaqi') or {}
+    aqi = _number(feed.get('aqi'))
+    return {
+        'uid': uid,
+        'name': (listing.get('station') or {}).get('name') or (feed.get('city') or {}).get('name'),
+        'lat': lat,
+        'lng': lng,
+        'aqi': aqi if not math.isnan(aqi) else _number(listing.get('aqi')),
+        **{name: _number((iaqi.get(name) or {}).get('v')) for name in POLLUTANTS},
+        'observed_at': _observed_at((feed.get('time') or {}).get('iso'), (listing.get('station') or {}).get('time')),
+        'feed': feed or None
+    }
+
+
+class StationIngester:
+    """Pulls every WAQI station in the NCR bounds once per ingestion cycle.
+
+    One map/bounds request lists the stations; their detail feeds (pollutant readings)
+    are then fetched concurrently, at most `concurrency` at a time. The result is
+    published as an immutable columnar StationTable that the heatmap raster, route
+    planner and per-location forecasts read instead of calling WAQI per request.
+    The table is mirrored to SQLite (aqi_stations) so a restarted worker starts warm.
+    """
+
+    def __init__(self):
+        self.bounds = parse_bounds(os.environ['AQI_STATION_BOUNDS']) if os.environ.get('AQI_STATION_BOUNDS') else NCR_BOUNDS
+        self.concurrency = int(os.environ.get('AQI_STATION_CONCURRENCY', '8'))
+        self.max_stations = int(os.environ.get('AQI_STATION_MAX', '300'))
+        self.fetch_details = os.environ.get('AQI_STATION_DETAILS', 'true').lower() == 'true'
+        self.nearest_km = float(os.environ.get('AQI_STATION_NEAREST_KM', '15'))
+
+        self.current: Optional[StationTable] = None
+        self._listeners = []
+        self._inflight: Optional[asyncio.Future] = None
+        self._pending = None
+        self._dirty = False
+
+        self.refreshes = 0
+        self.failures = 0
+        self.detail_calls = 0
+        self.detail_failures = 0
+        self.last_refresh_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def add_listener(self, callback):
+        """Register a callable (sync or async) invoked with each newly published table"""
+        self._listeners.append(callback)
+
+    async def start(self):
+        """Restore the persisted table (without notifying listeners; they compute on demand)"""
+        persisted = await asyncio.to_thread(self._load_persisted)
+        if persisted is not None and self.current is None:
+            self.current = persisted
+            logger.info(f"✅ Restored {len(persisted)} AQI stations (v{persisted.version})")
+
+    async def get(self, snapshot=None) -> Optional[StationTable]:
+        """The latest table; only before the first one exists is it fetched on demand"""
+        if self.current is not None:
+            return self.current
+        if self._inflight is not None and not self._inflight.done():
+            return await asyncio.shield(self._inflight)
+        return await self.refresh(snapshot)
+
+    async def refresh(self, snapshot=None) -> Optional[StationTable]:
+        """Fetch and publish a new table. Single-flight: a snapshot published while a
+        fetch runs is picked up right after it, not in parallel."""
+        self._pending, self._dirty = snapshot, True
+        if self._inflight is None or self._inflight.done():
+            self._inflight = asyncio.ensure_future(self._drain())
+        return await asyncio.shield(self._inflight)
+
+    async def _drain(self) -> Optional[StationTable]:
+        table = self.current
+        while self._dirty:
+            self._dirty = False
+            table = await self._ingest(self._pending)
+        return table
+
+    async def _detail(self, semaphore: asyncio.Semaphore, uid: int) -> Optional[dict]:
+        path = f"feed/@{uid}"
+        async with semaphore:
+            waqi_client.invalidate(path)
+            self.detail_calls += 1
+            feed = await waqi_client.fetch(path)
+        if feed is None:
+            self.detail_failures += 1
+        return feed
+
+    async def _ingest(self, snapshot) -> Optional[StationTable]:
+        start = time.perf_counter()
+        try:
+            waqi_client.invalidate(waqi_client.bounds_path(self.bounds))
+            listing = await waqi_client.fetch_bounds(self.bounds)
+            if not listing:
+                self.failures += 1
+                self.last_error = "WAQI map/bounds unavailable"
+                logger.warning(f"⚠️  Station listing failed; keeping {len(self.current) if self.current else 0} stations")
+                return self.current
+
+            by_uid = {}
+            for entry in listing:
+                if entry.get('uid') is not None:
+                    by_uid.setdefault(entry['uid'], entry)
+            entries = list(by_uid.values())[:self.max_stations]
+
+            feeds = [None] * len(entries)
+            if self.fetch_details:
+                semaphore = asyncio.Semaphore(self.concurrency)
+                feeds = await asyncio.gather(*[self._detail(semaphore, entry['uid']) for entry in entries])
+
+            rows = [row for row in map(station_row, entries, feeds) if row is not None]
+            table = StationTable.from_rows(
+                version=snapshot.version if snapshot is not None else (self.current.version + 1 if self.current else 1),
+                fetched_at=datetime.now(timezone.utc),
+                rows=rows
+            )
+            self.last_refresh_ms = round((time.perf_counter() - start) * 1000, 2)
+            self.refreshes += 1
+            self.last_error = None
+            logger.info(f"✅ Ingested {len(table)} AQI stations in {self.last_refresh_ms} ms")
+            await self._publish(table)
+
+            try:
+                await asyncio.to_thread(self._persist, table)
+            except Exception as e:
+                logger.error(f"Error persisting AQI stations: {str(e)}")
+            return table
+        except Exception as e:
+            self.failures += 1
+            self.last_error = str(e)
+            logger.error(f"Station ingestion error: {str(e)}")
+            return self.current
+
+    async def _publish(self, table: StationTable):
+        # Single reference assignment: readers see either the old or the new table
+        self.current = table
+        for callback in self._listeners:
+            try:
+                result = callback(table)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.error(f"AQI station listener error: {str(e)}")
+
+    def on_snapshot(self, snapshot):
+        """AQIIngester listener: re-ingest in the background so ingestion is not held up"""
+        asyncio.ensure_future(self.refresh(snapshot))
+
+    def nearest_feed(self, lat: float, lng: float) -> Optional[dict]:
+        """Detail feed of the closest ingested station within AQI_STATION_NEAREST_KM, if any"""
+        table = self.current
+        if table is None:
+            return None
+        row = table.nearest(lat, lng, self.nearest_km)
+        return table.feeds[row] if row is not None else None
+
+    def _persist(self, table: StationTable):
+        fetched_at = table.fetched_at.astimezone(timezone.utc).replace(tzinfo=None)
+
+        def value(column, i):
+            v = float(column[i])
+            return None if math.isnan(v) else v
+
+        session = SessionLocal()
+        try:
+            for i in range(len(table)):
+                observed = table.observed_at[i]
+                session.merge(AQIStationDB(
+                    uid=int(table.uid[i]),
+                    name=table.names[i],
+                    latitude=float(table.lat[i]),
+                    longitude=float(table.lng[i]),
+                    aqi=value(table.aqi, i),
+                    **{name: value(table.pollutants[name], i) for name in POLLUTANTS},
+                    observed_at=None if math.isnan(observed) else datetime.utcfromtimestamp(observed),
+                    payload=json.dumps(table.feeds[i]) if table.feeds[i] is not None else None,
+                    version=table.version,
+                    fetched_at=fetched_at
+                ))
+            # The table mirrors the latest listing: stations that dropped out go
+            session.query(AQIStationDB).filter(AQIStationDB.uid.notin_([int(uid) for uid in table.uid])).delete(
+                synchronize_session=False)
+            session.commit()
+        finally:
+            session.close()
+
+    def _load_persisted(self) -> Optional[StationTable]:
+        session = SessionLocal()
+        try:
+            stations = session.query(AQIStationDB).order_by(AQIStationDB.uid).all()
+            if not stations:
+                return None
+
+            def number(v):
+                return math.nan if v is None else v
+
+            rows = [{
+                'uid': s.uid,
+                'name': s.name,
+                'lat': s.latitude,
+                'lng': s.longitude,
+                'aqi': number(s.aqi),
+                **{name: number(getattr(s, name)) for name in POLLUTANTS},
+                'observed_at': s.observed_at.replace(tzinfo=timezone.utc).timestamp() if s.observed_at else math.nan,
+                'feed': json.loads(s.payload) if s.payload else None
+            } for s in stations]
+            return StationTable.from_rows(
+                version=max(s.version for s in stations),
+                fetched_at=max(s.fetched_at for s in stations).replace(tzinfo=timezone.utc),
+                rows=rows,
+                source="persisted"
+            )
+        except Exception as e:
+            logger.error(f"Error loading persisted AQI stations: {str(e)}")
+            return None
+        finally:
+            session.close()
+
+    def stats(self) -> dict:
+        table = self.current
+        return {
+            'stations': len(table) if table else 0,
+            'with_aqi': int((~np.isnan(table.aqi)).sum()) if table else 0,
+            'version': table.version if table else None,
+            'source': table.source if table else None,
+            'bounds': list(self.bounds),
+            'concurrency': self.concurrency,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'detail_calls': self.detail_calls,
+            'detail_failures': self.detail_failures,
+            'last_refresh_ms': self.last_refresh_ms,
+            'last_error': self.last_error
+        }
+
+
+station_ingester = StationIngester()
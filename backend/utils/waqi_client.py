@@ -0,0 +1,170 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+from urllib.parse import parse_qsl
+
+import aiohttp
+
+from utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+WAQI_BASE_URL = os.environ.get('WAQI_BASE_URL', 'https://api.waqi.info')
+
+
+class WAQIClient:
+    """Shared WAQI client with a pooled session, TTL cache and single-flight fetches"""
+
+    def __init__(self, base_url: str = WAQI_BASE_URL, token: str = None):
+        self.base_url = base_url.rstrip('/')
+        self._token = token
+        self.cache_ttl = float(os.environ.get('WAQI_CACHE_TTL', '60'))
+        self.negative_ttl = float(os.environ.get('WAQI_NEGATIVE_CACHE_TTL', '5'))
+        self.timeout = float(os.environ.get('WAQI_TIMEOUT', '8'))
+        self.max_connections = int(os.environ.get('WAQI_MAX_CONNECTIONS', '20'))
+        self.max_entries = int(os.environ.get('WAQI_CACHE_MAX_ENTRIES', '1024'))
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+        self._cache = {}
+        self._inflight = SingleFlight()
+
+        self.hits = 0
+        self.misses = 0
+        self.upstream_calls = 0
+        self.upstream_errors = 0
+        self.sessions_discarded = 0
+
+    @property
+    def token(self) -> Optional[str]:
+        # Resolved lazily so the token from backend/.env is picked up even when
+        # this module is imported before load_dotenv() runs.
+        return self._token or os.environ.get('WAQI_API_TOKEN')
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            previous, previous_loop = self._session, self._session_loop
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                ttl_dns_cache=300,
+                keepalive_timeout=60
+            )
+            self._session = aiohttp.ClientSession(connector=connector)
+            self._session_loop = loop
+            if previous is not None and not previous.closed:
+                await self._discard_session(previous, previous_loop)
+        return self._session
+
+    async def _discard_session(self, session: aiohttp.ClientSession, loop):
+        """Close a session left by another event loop. Its pooled connections belong to that
+        loop, so a loop that still runs closes them itself."""
+        try:
+            if loop is not None and loop.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), loop)
+            else:
+                await session.close()
+        except Exception as e:
+            logger.warning(f"⚠️  Could not close the WAQI session of a previous event loop: {str(e)}")
+        self.sessions_discarded += 1
+
+    async def fetch_feed(self, station: str = 'delhi', timeout: float = None) -> Optional[dict]:
+        """Fetch a named station/city feed, e.g. feed/delhi"""
+        return await self.fetch(f"feed/{station}", timeout=timeout)
+
+    async def fetch_geo(self, lat: float, lon: float, timeout: float = None) -> Optional[dict]:
+        """Fetch the nearest station feed for a coordinate"""
+        return await self.fetch(f"feed/geo:{round(lat, 4)};{round(lon, 4)}", timeout=timeout)
+
+    async def fetch_bounds(self, bounds: tuple, timeout: float = None) -> Optional[list]:
+        """Every station inside a (min_lng, min_lat, max_lng, max_lat) box in one map/bounds call"""
+        return await self.fetch(self.bounds_path(bounds), timeout=timeout)
+
+    @staticmethod
+    def bounds_path(bounds: tuple) -> str:
+        min_lng, min_lat, max_lng, max_lat = bounds
+        return f"map/bounds?latlng={min_lat},{min_lng},{max_lat},{max_lng}"
+
+    async def fetch(self, path: str, timeout: float = None) -> Optional[dict]:
+        """Return the `data` payload for a WAQI path, served from cache when fresh"""
+        now = time.monotonic()
+        entry = self._cache.get(path)
+        if entry is not None and entry[0] > now:
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        return await self._inflight.run(path, lambda: self._load(path, timeout))
+
+    async def _load(self, path: str, timeout: float = None) -> Optional[dict]:
+        data = await self._fetch_upstream(path, timeout)
+        ttl = self.cache_ttl if data is not None else self.negative_ttl
+        if ttl > 0:
+            self._store(path, data, ttl)
+        return data
+
+    def _store(self, path: str, data: Optional[dict], ttl: float):
+        now = time.monotonic()
+        if len(self._cache) >= self.max_entries:
+            self._cache = {k: v for k, v in self._cache.items() if v[0] > now}
+            while len(self._cache) >= self.max_entries:
+                # dicts keep insertion order, so the first key is the oldest entry
+                self._cache.pop(next(iter(self._cache)))
+        self._cache[path] = (now + ttl, data)
+
+    async def _fetch_upstream(self, path: str, timeout: float = None) -> Optional[dict]:
+        if not self.token:
+            logger.warning("⚠️  WAQI_API_TOKEN not configured")
+            return None
+
+        self.upstream_calls += 1
+        route, _, query = path.partition('?')
+        url = f"{self.base_url}/{route}/"
+        try:
+            session = await self._get_session()
+            client_timeout = aiohttp.ClientTimeout(total=timeout or self.timeout)
+            async with session.get(url, params={**dict(parse_qsl(query)), 'token': self.token}, timeout=client_timeout) as response:
+                if response.status == 200:
+                    data = await response.json(content_type=None)
+                    if data.get('status') == 'ok':
+                        return data['data']
+                    logger.warning(f"WAQI returned status={data.get('status')} for {path}")
+                else:
+                    logger.warning(f"WAQI HTTP {response.status} for {path}")
+        except Exception as e:
+            logger.error(f"Error fetching WAQI {path}: {str(e)}")
+
+        self.upstream_errors += 1
+        return None
+
+    def invalidate(self, path: str = None):
+        """Drop one cached path, or everything"""
+        if path is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(path, None)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            'coalesced': self._inflight.coalesced,
+            'upstream_calls': self.upstream_calls,
+            'upstream_errors': self.upstream_errors,
+            'cached_keys': len(self._cache),
+            'inflight': len(self._inflight),
+            'sessions_discarded': self.sessions_discarded,
+            'cache_ttl_seconds': self.cache_ttl
+        }
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+waqi_client = WAQIClient()
@@ -0,0 +1,177 @@
+"""
+Local WAQI stand-in for development and tests: serves recorded API payloads on localhost
+instead of calling api.waqi.info.
+
+    cd backend && python -m utils.waqi_stub --port 8765 [--delay-ms 50] [--fail-rate 0.1]
+
+and point the app at it with WAQI_BASE_URL=http://localhost:8765 (any WAQI_API_TOKEN).
+It answers the paths the backend uses: map/bounds (?latlng= filters the recorded station
+list), feed/@<uid>, feed/geo:<lat>;<lng> (nearest recorded station) and feed/<city>.
+`delay_ms` simulates upstream latency per request and `fail_rate` answers that share of
+requests with an HTTP 500; `fail_uids` always fails the detail feeds of those stations.
+`max_concurrent` records the most requests in flight at once.
+
+The payloads file holds {"bounds": [map/bounds entries], "feeds": {uid: feed data},
+"cities": {name: uid}}. The one shipped is synthetic NCR data in WAQI's format; replace
+it with a recording of the live API (needs WAQI_API_TOKEN) with
+
+    cd backend && python -m utils.waqi_stub --record utils/waqi_payloads/ncr_stations.json
+"""
+
+import json
+import random
+import asyncio
+import argparse
+import logging
+from pathlib import Path
+
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+PAYLOADS = Path(__file__).parent / 'waqi_payloads' / 'ncr_stations.json'
+
+
+class LocalWAQIServer:
+    def __init__(self, host: str = '127.0.0.1', port: int = 8765, payloads: Path = PAYLOADS,
+                 delay_ms: float = 0, fail_rate: float = 0.0, fail_uids=()):
+        self.host = host
+        self.port = port
+        self.delay = delay_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.fail_uids = {str(uid) for uid in fail_uids}
+        with open(payloads) as f:
+            recorded = json.load(f)
+        self.stations = recorded['bounds']
+        self.feeds = {str(uid): feed for uid, feed in recorded['feeds'].items()}
+        self.cities = recorded.get('cities', {})
+
+        self.requests = {}
+        self.in_flight = 0
+        self.max_concurrent = 0
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/map/bounds/', self._bounds)
+        app.router.add_get('/map/bounds', self._bounds)
+        app.router.add_get('/feed/{station}/', self._feed)
+        app.router.add_get('/feed/{station}', self._feed)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        logger.info(f"✅ Local WAQI server listening on {self.host}:{self.port}")
+        return self
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _answer(self, request: web.Request, kind: str, data, fail: bool = False):
+        self.requests[kind] = self.requests.get(kind, 0) + 1
+        self.in_flight += 1
+        self.max_concurrent = max(self.max_concurrent, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if fail or (self.fail_rate and random.random() < self.fail_rate):
+                return web.Response(status=500, text="Internal Server Error")
+            if not request.query.get('token'):
+                return web.json_response({"status": "error", "data": "Invalid key"})
+            if data is None:
+                return web.json_response({"status": "error", "data": "Unknown station"})
+            return web.json_response({"status": "ok", "data": data})
+        finally:
+            self.in_flight -= 1
+
+    async def _bounds(self, request: web.Request):
+        try:
+            lat1, lng1, lat2, lng2 = (float(v) for v in request.query['latlng'].split(','))
+        except (KeyError, ValueError):
+            return await self._answer(request, 'bounds', None)
+        min_lat, max_lat = sorted((lat1, lat2))
+        min_lng, max_lng = sorted((lng1, lng2))
+        return await self._answer(request, 'bounds', [
+            station for station in self.stations
+            if min_lat <= station['lat'] <= max_lat and min_lng <= station['lon'] <= max_lng
+        ])
+
+    async def _feed(self, request: web.Request):
+        station = request.match_info['station']
+        if station.startswith('@'):
+            uid = station[1:]
+            return await self._answer(request, 'station', self.feeds.get(uid), fail=uid in self.fail_uids)
+        if station.startswith('geo:'):
+            try:
+                lat, lng = (float(v) for v in station[4:].split(';'))
+            except ValueError:
+                return await self._answer(request, 'geo', None)
+            nearest = min(self.stations, key=lambda s: (s['lat'] - lat) ** 2 + (s['lon'] - lng) ** 2, default=None)
+            return await self._answer(request, 'geo', nearest and self.feeds.get(str(nearest['uid'])))
+        uid = self.cities.get(station.lower())
+        return await self._answer(request, 'city', self.feeds.get(str(uid)) if uid is not None else None)
+
+
+async def record(path: Path, bounds: tuple, cities: list):
+    """Save the live map/bounds listing and every station's detail feed as a payloads file"""
+    from utils.waqi_client import WAQIClient
+
+    client = WAQIClient()
+    try:
+        stations = await client.fetch_bounds(bounds)
+        if not stations:
+            raise SystemExit("map/bounds returned nothing (is WAQI_API_TOKEN set?)")
+        feeds = await asyncio.gather(*[client.fetch(f"feed/@{station['uid']}") for station in stations])
+        recorded = {
+            'bounds': stations,
+            'feeds': {str(station['uid']): feed for station, feed in zip(stations, feeds) if feed},
+            'cities': {}
+        }
+        for city in cities:
+            feed = await client.fetch_feed(city)
+            if feed and feed.get('idx') is not None:
+                recorded['cities'][city] = feed['idx']
+                recorded['feeds'].setdefault(str(feed['idx']), feed)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(recorded, f, indent=1)
+        logger.info(f"✅ Recorded {len(stations)} stations, {len(recorded['feeds'])} feeds to {path}")
+    finally:
+        await client.close()
+
+
+async def serve(args):
+    server = await LocalWAQIServer(args.host, args.port, Path(args.payloads), args.delay_ms, args.fail_rate).start()
+    try:
+        while True:
+            await asyncio.sleep(10)
+            logger.info(f"🛰️  {server.requests} requests, at most {server.max_concurrent} concurrent")
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Local WAQI stand-in")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--payloads', default=str(PAYLOADS))
+    parser.add_argument('--delay-ms', type=float, default=0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--record', metavar='PATH', help='record the live API into PATH instead of serving')
+    args = parser.parse_args()
+    try:
+        if args.record:
+            from utils.station_ingester import NCR_BOUNDS
+            asyncio.run(record(Path(args.record), NCR_BOUNDS, ['delhi']))
+        else:
+            asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        pass
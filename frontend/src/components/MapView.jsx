@@ -3,8 +3,6 @@ import { useEffect, useState, useRef } from 'react';
 import L from 'leaflet';
 import 'leaflet/dist/leaflet.css';
 import 'leaflet.heat';
-import axios from 'axios';
-import { Loader2 } from 'lucide-react';
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
@@ -74,37 +72,9 @@ const HeatmapLayer = ({ data }) => {
   return null;
 };
 
-const MapContent = ({ viewMode, heatmapData }) => {
+const MapContent = ({ viewMode }) => {
   const mapInstance = useRef(null);
 
-  useEffect(() => {
-    if (mapInstance.current) {
-      const map = mapInstance.current;
-      if (viewMode === 'heatmap' && heatmapData && heatmapData.length > 0) {
-        // Create heat layer
-        const heatData = heatmapData.map(point => [point.lat, point.lng, point.intensity]);
-        const heatLayer = L.heatLayer(heatData, {
-          radius: 35,
-          blur: 25,
-          maxZoom: 13,
-          max: 1.0,
-          gradient: {
-            0.0: '#10B981',
-            0.2: '#F59E0B',
-            0.4: '#F97316',
-            0.6: '#EF4444',
-            0.8: '#DC2626',
-            1.0: '#7F1D1D'
-          }
-        });
-        heatLayer.addTo(map);
-        return () => {
-          map.removeLayer(heatLayer);
-        };
-      }
-    }
-  }, [viewMode, heatmapData]);
-
   return (
     <MapContainer
       center={[28.6139, 77.2090]}
@@ -117,6 +87,10 @@ const MapContent = ({ viewMode, heatmapData }) => {
         attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a>'
         url="https://{s}.basemaps.cartocdn.com/light_all/{z}/{x}/{y}{r}.png"
       />
+      {viewMode === 'heatmap' && (
+        // Interpolated AQI raster; tiles carry ETags, so panning mostly revalidates with 304s
+        <TileLayer url={`${API}/aqi/heatmap/tiles/{z}/{x}/{y}`} opacity={0.85} maxNativeZoom={16} />
+      )}
       {viewMode === 'markers' && locations.map((loc, idx) => (
         <Circle
           key={idx}
@@ -146,26 +120,6 @@ const MapContent = ({ viewMode, heatmapData }) => {
 
 export const MapView = ({ center = [28.6139, 77.2090], zoom = 11 }) => {
   const [viewMode, setViewMode] = useState('markers');
-  const [heatmapData, setHeatmapData] = useState([]);
-  const [loading, setLoading] = useState(false);
-
-  const fetchHeatmapData = async () => {
-    setLoading(true);
-    try {
-      const response = await axios.get(`${API}/aqi/heatmap`);
-      setHeatmapData(response.data.points);
-    } catch (error) {
-      console.error('Error fetching heatmap data:', error);
-    } finally {
-      setLoading(false);
-    }
-  };
-
-  useEffect(() => {
-    if (viewMode === 'heatmap') {
-      fetchHeatmapData();
-    }
-  }, [viewMode]);
 
   return (
     <div className="bg-white border border-slate-200 shadow-sm rounded-xl p-6" data-testid="map-view">
@@ -205,12 +159,7 @@ export const MapView = ({ center = [28.6139, 77.2090], zoom = 11 }) => {
       </div>
       
       <div style={{ height: '500px', width: '100%' }} className="rounded-xl overflow-hidden relative">
-        {loading && (
-          <div className="absolute inset-0 bg-white/80 z-[1000] flex items-center justify-center">
-            <Loader2 className="h-8 w-8 animate-spin text-teal-600" />
-          </div>
-        )}
-        <MapContent viewMode={viewMode} heatmapData={heatmapData} />
+        <MapContent viewMode={viewMode} />
       </div>
       
       <div className="mt-4 flex flex-wrap gap-4 text-xs">
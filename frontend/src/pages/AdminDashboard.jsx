@@ -34,9 +34,20 @@ const POLICY_OPTIONS = [
   { id: 'stubble_control', name: 'Stubble Burning Control', description: 'Incentivize farmers to avoid stubble burning' }
 ];
 
+const REPORTS_PAGE_SIZE = 50;
+
+// The reports endpoint is cursor-paginated: X-Next-Cursor is absent on the last page
+const fetchReportsPage = async (after = null) => {
+  const response = await axios.get(`${API}/reports`, { params: { limit: REPORTS_PAGE_SIZE, after } });
+  return { reports: response.data, nextCursor: response.headers['x-next-cursor'] || null };
+};
+
 export default function AdminDashboard() {
   const navigate = useNavigate();
   const [reports, setReports] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [summary, setSummary] = useState({ total: 0, status: {} });
   const [aqiData, setAqiData] = useState(null);
   const [sources, setSources] = useState(null);
   const [forecast, setForecast] = useState(null);
@@ -56,13 +67,16 @@ export default function AdminDashboard() {
 
   const fetchData = async () => {
     try {
-      const [reportsRes, aqiRes, sourcesRes, forecastRes] = await Promise.all([
-        axios.get(`${API}/reports`),
+      const [firstPage, summaryRes, aqiRes, sourcesRes, forecastRes] = await Promise.all([
+        fetchReportsPage(),
+        axios.get(`${API}/reports/summary`),
         axios.get(`${API}/aqi/current`),
         axios.get(`${API}/aqi/sources`),
         axios.get(`${API}/aqi/forecast`)
       ]);
-      setReports(reportsRes.data);
+      setReports(firstPage.reports);
+      setNextCursor(firstPage.nextCursor);
+      setSummary(summaryRes.data);
       setAqiData(aqiRes.data);
       setSources(sourcesRes.data);
       setForecast(forecastRes.data);
@@ -74,14 +88,37 @@ export default function AdminDashboard() {
     }
   };
 
+  const loadMoreReports = async () => {
+    if (!nextCursor || loadingMore) return;
+    setLoadingMore(true);
+    try {
+      const page = await fetchReportsPage(nextCursor);
+      setReports(current => [...current, ...page.reports]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      console.error('Error fetching reports:', error);
+      toast.error('Failed to load more reports');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const updateReportStatus = async (reportId, newStatus) => {
     try {
       await axios.patch(`${API}/reports/${reportId}/status`, { status: newStatus });
       toast.success(`Report status updated to ${newStatus}`);
-      fetchData();
+      // Update the loaded pages in place rather than reloading them, then refresh the totals
+      setReports(current => current.map(r => (r.id === reportId ? { ...r, status: newStatus } : r)));
     } catch (error) {
       console.error('Error updating status:', error);
       toast.error('Failed to update status');
+      return;
+    }
+    try {
+      const summaryRes = await axios.get(`${API}/reports/summary`);
+      setSummary(summaryRes.data);
+    } catch (error) {
+      console.error('Error fetching report totals:', error);
     }
   };
 
@@ -106,9 +143,10 @@ export default function AdminDashboard() {
     );
   }
 
-  const pendingReports = reports.filter(r => r.status === 'pending').length;
-  const processingReports = reports.filter(r => r.status === 'processing').length;
-  const completedReports = reports.filter(r => r.status === 'completed').length;
+  // Totals come from the server: only the pages loaded so far are in `reports`
+  const pendingReports = summary.status.pending || 0;
+  const processingReports = summary.status.processing || 0;
+  const completedReports = summary.status.completed || 0;
 
   return (
     <div className="min-h-screen bg-slate-50" data-testid="admin-dashboard-page">
@@ -155,7 +193,7 @@ export default function AdminDashboard() {
               <span className="text-sm text-slate-500">Total Reports</span>
               <FileText className="h-5 w-5 text-slate-500" />
             </div>
-            <div className="text-3xl font-bold font-['Manrope'] text-slate-900" data-testid="total-count">{reports.length}</div>
+            <div className="text-3xl font-bold font-['Manrope'] text-slate-900" data-testid="total-count">{summary.total}</div>
           </div>
         </div>
 
@@ -352,6 +390,20 @@ export default function AdminDashboard() {
                   </div>
                 );
               })}
+
+              {nextCursor && (
+                <div className="flex justify-center pt-2">
+                  <button
+                    onClick={loadMoreReports}
+                    disabled={loadingMore}
+                    className="flex items-center gap-2 px-6 py-2 border border-slate-300 hover:bg-slate-100 text-slate-700 text-sm rounded-full transition-colors disabled:opacity-50"
+                    data-testid="load-more-reports"
+                  >
+                    {loadingMore && <Loader2 className="h-4 w-4 animate-spin" />}
+                    Load more ({reports.length} of {summary.total})
+                  </button>
+                </div>
+              )}
             </div>
           )}
         </div>
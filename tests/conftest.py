@@ -0,0 +1,40 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.insert(0, str(BACKEND_DIR))
+
+# Before any backend module is imported: a throwaway SQLite file and no live services
+os.environ['SQLITE_DB_URL'] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ['GEMINI_API_KEY'] = ''
+os.environ['WAQI_API_TOKEN'] = 'test-token'
+# server.py connects lazily; tests swap its database for mongomock before any query
+os.environ['MONGO_URL'] = 'mongodb://localhost:27017'
+os.environ['DB_NAME'] = 'test'
+os.environ['AQI_INGEST_ENABLED'] = '0'
+
+from database import init_db  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture
+def anyio_backend():
+    return 'asyncio'
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """server.py with its database and the email outbox on an empty mongomock instance"""
+    from mongomock_motor import AsyncMongoMockClient
+    import server
+    from utils.email_outbox import email_outbox
+
+    db = AsyncMongoMockClient(tz_aware=True)['test']
+    monkeypatch.setattr(server, 'db', db)
+    monkeypatch.setattr(email_outbox, 'collection', db.email_outbox)
+    return server
@@ -0,0 +1,79 @@
+import math
+
+import numpy as np
+import pytest
+
+from ml_models.aqi_history import HourlyRingBuffer, LAGS, SHORT_WINDOW, LONG_WINDOW
+
+
+def reference_mean(readings: dict, last_hour: int, window: int) -> float:
+    values = [value for hour, value in readings.items() if last_hour - window < hour <= last_hour]
+    return sum(values) / len(values) if values else math.nan
+
+
+def same(a: float, b: float) -> bool:
+    return (math.isnan(a) and math.isnan(b)) or a == pytest.approx(b)
+
+
+def test_rolling_means_cover_exactly_their_windows():
+    buf = HourlyRingBuffer()
+    for hour in range(100):
+        buf.push(hour, hour)
+
+    assert buf.rolling_mean(SHORT_WINDOW) == pytest.approx(np.mean(range(100 - SHORT_WINDOW, 100)))
+    assert buf.rolling_mean(LONG_WINDOW) == pytest.approx(np.mean(range(100 - LONG_WINDOW, 100)))
+    assert [buf.lag(k) for k in LAGS] == [99 - k for k in LAGS]
+    with pytest.raises(ValueError):
+        buf.rolling_mean(12)
+
+
+def test_a_gap_longer_than_the_buffer_starts_over():
+    buf = HourlyRingBuffer()
+    for hour in range(30):
+        buf.push(hour, 100)
+
+    buf.push(30 + buf.capacity, 250)
+
+    assert len(buf) == 1
+    assert buf.rolling_mean(SHORT_WINDOW) == buf.rolling_mean(LONG_WINDOW) == 250
+    assert all(math.isnan(buf.lag(k)) for k in LAGS)
+
+
+def test_a_shorter_gap_leaves_missing_hours_out_of_the_means():
+    buf = HourlyRingBuffer()
+    buf.push(0, 100)
+    buf.push(10, 200)
+
+    assert buf.rolling_mean(SHORT_WINDOW) == 150
+    assert math.isnan(buf.lag(1)) and buf.lag(10) == 100
+
+
+def test_late_readings_fill_their_own_hour():
+    buf = HourlyRingBuffer()
+    buf.push(10, 100)
+    buf.push(12, 300)
+    buf.push(11, 200)
+    buf.push(12, 120)  # a repeat replaces
+    buf.push(12 - buf.capacity, 999)  # older than anything kept
+
+    assert (buf.lag(0), buf.lag(1), buf.lag(2)) == (120, 200, 100)
+    assert buf.last_hour == 12 and len(buf) == 3
+    assert buf.rolling_mean(SHORT_WINDOW) == pytest.approx(140)
+
+
+def test_matches_a_recount_under_random_pushes():
+    rng = np.random.default_rng(7)
+    buf, readings, hour = HourlyRingBuffer(), {}, 0
+    for _ in range(2000):
+        step = rng.choice([1, 1, 1, 0, -3, 5, 40, 200])
+        hour = max(hour + int(step), 0)
+        value = float(rng.integers(20, 500))
+        buf.push(hour, value)
+        if buf.last_hour - hour < buf.capacity:
+            readings[hour] = value
+        readings = {h: v for h, v in readings.items() if buf.last_hour - h < buf.capacity}
+
+        for window in (SHORT_WINDOW, LONG_WINDOW):
+            assert same(buf.rolling_mean(window), reference_mean(readings, buf.last_hour, window))
+        for k in LAGS:
+            assert same(buf.lag(k), readings.get(buf.last_hour - k, math.nan))
@@ -0,0 +1,105 @@
+import asyncio
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from utils.aqi_raster import AQIRaster, NCR_BOUNDS
+from utils.aqi_tiles import HeatmapTiles, TILE_SIZE
+
+pytestmark = pytest.mark.anyio
+
+# A zoom 10 tile over central Delhi, and one in the Atlantic
+DELHI_TILE = (10, 731, 427)
+OCEAN_TILE = (10, 400, 400)
+
+
+def raster(version: int = 1) -> AQIRaster:
+    values = np.linspace(50, 400, 64 * 64, dtype=np.float32).reshape(64, 64)
+    return AQIRaster(version, NCR_BOUNDS, values, 10, datetime.now(timezone.utc), 0.0, f"digest{version}")
+
+
+async def test_concurrent_misses_share_one_render_off_the_loop(monkeypatch):
+    tiles = HeatmapTiles()
+    loop_thread = threading.get_ident()
+    render_threads = []
+    sample_grid = AQIRaster.sample_grid
+
+    def sampling(self, lats, lngs):
+        render_threads.append(threading.get_ident())
+        return sample_grid(self, lats, lngs)
+
+    monkeypatch.setattr(AQIRaster, 'sample_grid', sampling)
+    current = raster()
+
+    bodies = await asyncio.gather(*(tiles.get(current, *DELHI_TILE, "u8") for _ in range(5)))
+
+    assert len(set(bodies)) == 1 and len(bodies[0]) == TILE_SIZE * TILE_SIZE
+    assert render_threads and loop_thread not in render_threads
+    assert len(render_threads) == 1
+    assert tiles.misses == 1 and tiles.stats()['coalesced'] == 4
+
+    assert await tiles.get(current, *DELHI_TILE, "u8") == bodies[0]
+    assert tiles.hits == 1
+
+
+async def test_new_raster_renders_new_tiles():
+    tiles = HeatmapTiles()
+    first = await tiles.get(raster(1), *DELHI_TILE, "f32")
+    second = await tiles.get(raster(2), *DELHI_TILE, "f32")
+
+    assert tiles.misses == 2
+    assert np.array_equal(np.frombuffer(first, '<f4'), np.frombuffer(second, '<f4'))
+
+
+async def test_lru_is_bounded():
+    tiles = HeatmapTiles()
+    tiles.max_entries = 2
+    current = raster()
+    for x in range(730, 734):
+        await tiles.get(current, 10, x, 427, "u8")
+
+    assert tiles.stats()['entries'] == 2
+    assert tiles.bytes == 2 * TILE_SIZE * TILE_SIZE
+
+
+async def test_tiles_outside_the_raster_are_empty():
+    tiles = HeatmapTiles()
+    body = await tiles.get(raster(), *OCEAN_TILE, "u8")
+
+    assert body == bytes(TILE_SIZE * TILE_SIZE)
+    assert tiles.misses == 0
+
+
+async def test_raster_render_runs_once_off_the_loop():
+    current = raster()
+    loop_thread = threading.get_ident()
+    calls = []
+
+    def render(r):
+        calls.append(threading.get_ident())
+        return b"body"
+
+    bodies = await asyncio.gather(*(current.rendered("heatmap", render) for _ in range(3)))
+
+    assert bodies == [b"body"] * 3
+    assert len(calls) == 1 and calls[0] != loop_thread
+    assert await current.rendered("heatmap", render) == b"body"
+    assert len(calls) == 1
+
+
+async def test_failed_raster_render_is_retried():
+    current = raster()
+    attempts = []
+
+    def render(r):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("render failed")
+        return b"body"
+
+    with pytest.raises(RuntimeError):
+        await current.rendered("heatmap", render)
+    assert await current.rendered("heatmap", render) == b"body"
+    assert len(attempts) == 2
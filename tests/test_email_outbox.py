@@ -0,0 +1,182 @@
+import asyncio
+from datetime import datetime, timezone, timedelta
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+from utils.email_outbox import EmailOutbox
+from utils.email_service import smtp_pool
+from utils.smtp_stub import LocalSMTPServer
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def smtp(monkeypatch):
+    """Starts a local SMTP stand-in on a free port and points the pooled sender at it"""
+    servers = []
+
+    async def start(**options):
+        server = await LocalSMTPServer(port=0, **options).start()
+        servers.append(server)
+        monkeypatch.setenv('EMAIL_HOST', server.host)
+        monkeypatch.setenv('EMAIL_PORT', str(server.port))
+        monkeypatch.setenv('EMAIL_STARTTLS', 'false')
+        monkeypatch.setenv('EMAIL_FROM', 'alerts@example.org')
+        monkeypatch.delenv('EMAIL_USER', raising=False)
+        return server
+
+    yield start
+    await smtp_pool.close()
+    for server in servers:
+        await server.stop()
+
+
+@pytest.fixture
+def outbox():
+    outbox = EmailOutbox()
+    outbox.collection = AsyncMongoMockClient()['test']['email_outbox']
+    outbox.retry_base = 30
+    outbox.retry_max = 3600
+    return outbox
+
+
+def utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+async def stored(outbox, **query) -> list:
+    return await outbox.collection.find(query).to_list(None)
+
+
+async def test_claim_leases_a_due_message_to_one_worker(outbox):
+    outbox.lease = 120
+    await outbox.enqueue('a@example.org', 'Subject', '<p>hi</p>')
+
+    claimed = await outbox._claim()
+
+    assert claimed['status'] == 'sending'
+    assert claimed['attempts'] == 1
+    lease_ends = utc(claimed['next_attempt_at']) - datetime.now(timezone.utc)
+    assert timedelta(seconds=110) < lease_ends <= timedelta(seconds=120)
+    # Leased: no other worker can take it
+    assert await outbox._claim() is None
+
+
+async def test_expired_lease_is_claimed_again(outbox):
+    await outbox.enqueue('a@example.org', 'Subject', '<p>hi</p>')
+    first = await outbox._claim()
+
+    # The worker holding it died; its lease runs out
+    await outbox.collection.update_one(
+        {"_id": first["_id"]}, {"$set": {"next_attempt_at": datetime.now(timezone.utc) - timedelta(seconds=1)}})
+    again = await outbox._claim()
+
+    assert again["_id"] == first["_id"]
+    assert again['status'] == 'sending'
+    assert again['attempts'] == 2
+
+
+async def test_claims_come_due_first(outbox):
+    now = datetime.now(timezone.utc)
+    await outbox.enqueue_many([('late@example.org', 's', 'h'), ('early@example.org', 's', 'h')])
+    await outbox.collection.update_one({"to": "late@example.org"}, {"$set": {"next_attempt_at": now - timedelta(seconds=5)}})
+    await outbox.collection.update_one({"to": "early@example.org"}, {"$set": {"next_attempt_at": now - timedelta(seconds=60)}})
+    await outbox.collection.insert_one({"to": "future@example.org", "status": "pending", "attempts": 0,
+                                        "next_attempt_at": now + timedelta(hours=1)})
+
+    assert (await outbox._claim())['to'] == 'early@example.org'
+    assert (await outbox._claim())['to'] == 'late@example.org'
+    assert await outbox._claim() is None
+
+
+async def test_delivered_batch_is_marked_sent(outbox, smtp):
+    server = await smtp()
+    await outbox.enqueue_many([(f'user{i}@example.org', f'Report {i}', '<p>ok</p>') for i in range(3)])
+
+    batch = [await outbox._claim() for _ in range(3)]
+    await outbox._deliver(batch)
+
+    assert sorted(m['to'][0] for m in server.messages) == sorted(f'<user{i}@example.org>' for i in range(3))
+    sent = await stored(outbox, status='sent')
+    assert len(sent) == 3
+    assert all('sent_at' in message and 'last_error' not in message for message in sent)
+    assert outbox.sent == 3
+    assert await outbox.depth() == {"pending": 0, "sending": 0, "dead": 0}
+
+
+async def test_failed_delivery_backs_off_with_jitter(outbox, smtp):
+    await smtp(fail_rate=1.0)
+    await outbox.enqueue_many([(f'user{i}@example.org', 's', 'h') for i in range(8)])
+
+    before = datetime.now(timezone.utc)
+    await outbox._deliver([await outbox._claim() for _ in range(8)])
+
+    retried = await stored(outbox, status='pending')
+    assert len(retried) == 8
+    assert outbox.retried == 8
+    delays = [(utc(m['next_attempt_at']) - before).total_seconds() for m in retried]
+    # First retry: retry_base * 2 ** 0, +-20 %
+    assert all(0.8 * 30 - 1 <= delay <= 1.2 * 30 + 1 for delay in delays)
+    assert len({round(delay, 3) for delay in delays}) > 1
+    assert all('451' in m['last_error'] for m in retried)
+
+    # The backoff doubles per attempt: a third failure waits retry_base * 2 ** 2
+    message = retried[0]
+    await outbox.collection.update_one({"_id": message["_id"]}, {"$set": {"next_attempt_at": before, "attempts": 2}})
+    third = await outbox._claim()
+    assert third['attempts'] == 3
+    before = datetime.now(timezone.utc)
+    await outbox._failed(third, "still failing")
+    delay = (utc((await stored(outbox, _id=message["_id"]))[0]['next_attempt_at']) - before).total_seconds()
+    assert 0.8 * 120 - 1 <= delay <= 1.2 * 120 + 1
+
+
+async def test_backoff_is_capped(outbox):
+    outbox.retry_max = 60
+    await outbox.enqueue('a@example.org', 's', 'h')
+    message = dict(await outbox._claim(), attempts=5)
+
+    before = datetime.now(timezone.utc)
+    await outbox._failed(message, "down")
+
+    delay = (utc((await stored(outbox))[0]['next_attempt_at']) - before).total_seconds()
+    assert delay <= 1.2 * 60 + 1
+
+
+async def test_dead_lettered_after_max_attempts(outbox, smtp):
+    await smtp(fail_rate=1.0)
+    outbox.max_attempts = 3
+    await outbox.enqueue('a@example.org', 's', 'h')
+
+    for attempt in range(1, 4):
+        await outbox.collection.update_many({}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}})
+        message = await outbox._claim()
+        assert message['attempts'] == attempt
+        await outbox._deliver([message])
+
+    dead = await stored(outbox, status='dead')
+    assert len(dead) == 1
+    assert dead[0]['attempts'] == 3 and 'dead_at' in dead[0]
+    assert outbox.dead == 1 and outbox.retried == 2
+    # Dead letters are never claimed again
+    await outbox.collection.update_many({}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}})
+    assert await outbox._claim() is None
+
+
+async def test_workers_deliver_queued_mail(outbox, smtp):
+    server = await smtp()
+    outbox.workers = 2
+    outbox.poll_interval = 0.05
+    outbox.start(outbox.collection)
+    try:
+        await outbox.enqueue_many([(f'user{i}@example.org', 's', 'h') for i in range(5)])
+        for _ in range(100):
+            if len(await stored(outbox, status='sent')) == 5:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await outbox.stop()
+
+    assert len(server.messages) == 5
+    assert len(await stored(outbox, status='sent')) == 5
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from ml_models import forecast_cache as cache_module
+from ml_models.feature_layout import feature_hour, time_features
+from ml_models.forecast_cache import ForecastCache, forecast_cache
+
+
+def test_keys_follow_the_local_hour_the_features_use(monkeypatch):
+    cache = ForecastCache()
+    # In IST, 09:50 and 10:10 are both 04:xx UTC, yet their calendar features differ
+    times = iter([datetime(2024, 11, 4, 9, 20), datetime(2024, 11, 4, 9, 50), datetime(2024, 11, 4, 10, 10)])
+    monkeypatch.setattr(cache_module, 'feature_hour', lambda: feature_hour(next(times)))
+
+    first, same_hour, next_hour = (cache.key('point', 28.61, 77.21, 1, 'v1') for _ in range(3))
+
+    assert first == same_hour != next_hour
+    assert (time_features(datetime(2024, 11, 4, 9, 50)) != time_features(datetime(2024, 11, 4, 10, 10))).any()
+
+
+class ConstantBooster:
+    def predict(self, dmat):
+        return np.full((dmat.num_row(), 3), 180.0, dtype=np.float32)
+
+
+@pytest.mark.anyio
+async def test_cached_point_forecasts_report_each_callers_location(monkeypatch):
+    from ml_models.aqi_forecaster import forecaster, ForecastEnsemble, FORECAST_FEATURES
+
+    monkeypatch.setattr(forecaster, 'active', None)
+    forecaster.publish(ForecastEnsemble([ConstantBooster()], FORECAST_FEATURES, 'test-constant'))
+    forecast_cache.invalidate()
+    feed = {'aqi': 150, 'idx': 'test-station', 'iaqi': {'pm25': {'v': 90}}}
+
+    first = await forecaster.predict(lat=28.6101, lon=77.2101, aqi_data=feed, snapshot_version=1)
+    hits = forecast_cache.hits
+    second = await forecaster.predict(lat=28.6102, lon=77.2102, aqi_data=feed, snapshot_version=1)
+
+    assert forecast_cache.hits == hits + 1
+    assert first['weather_conditions']['location'] == '28.6101, 77.2101'
+    assert second['weather_conditions'] == {'current_aqi': 150, 'location': '28.6102, 77.2102'}
+    assert second['aqi_48h'] == first['aqi_48h']
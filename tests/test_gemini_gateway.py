@@ -0,0 +1,119 @@
+import json
+import asyncio
+
+import pytest
+
+from utils.gemini_gateway import GeminiGateway, StubBackend
+
+pytestmark = pytest.mark.anyio
+
+PROMPT = "Give 4 recommendations as a JSON array"
+
+
+def gateway(delay_ms: float = 0, **settings) -> GeminiGateway:
+    gateway = GeminiGateway(backend=StubBackend(delay_ms))
+    for name, value in settings.items():
+        setattr(gateway, name, value)
+    return gateway
+
+
+async def test_concurrent_identical_questions_share_one_call():
+    gw = gateway(delay_ms=50)
+
+    answers = await asyncio.gather(*[gw.generate(PROMPT, key=('recs', 'poor'), parse=json.loads) for _ in range(10)])
+
+    assert gw._backend.calls == 1
+    assert gw.stats()['coalesced'] == 9
+    assert all(answer == answers[0] for answer in answers)
+    assert len(answers[0]) == 4
+
+
+async def test_cancelled_caller_does_not_abort_the_shared_call():
+    gw = gateway(delay_ms=50)
+    first = asyncio.ensure_future(gw.generate(PROMPT, key=('recs',)))
+    second = asyncio.ensure_future(gw.generate(PROMPT, key=('recs',)))
+    await asyncio.sleep(0.01)
+    first.cancel()
+
+    assert await second is not None
+    assert gw._backend.calls == 1
+
+
+async def test_answers_are_cached_until_the_ttl_runs_out():
+    gw = gateway(cache_ttl=0.2)
+
+    first = await gw.generate(PROMPT, key=('recs', 'poor'), parse=json.loads)
+    again = await gw.generate(PROMPT, key=('recs', 'poor'), parse=json.loads)
+    other = await gw.generate(PROMPT, key=('recs', 'severe'), parse=json.loads)
+
+    assert again is first
+    assert other == first and other is not first
+    assert gw._backend.calls == 2
+    assert (gw.hits, gw.misses) == (1, 2)
+
+    await asyncio.sleep(0.25)
+    await gw.generate(PROMPT, key=('recs', 'poor'), parse=json.loads)
+    assert gw._backend.calls == 3
+
+
+async def test_timeout_returns_the_fallback_and_is_briefly_remembered():
+    gw = gateway(delay_ms=500, timeout=0.05, negative_ttl=30)
+    fallback = [{"title": "fallback"}]
+
+    started = asyncio.get_running_loop().time()
+    answer = await gw.generate(PROMPT, key=('recs',), parse=json.loads, fallback=fallback)
+
+    assert answer is fallback
+    assert asyncio.get_running_loop().time() - started < 0.4
+    assert gw.timeouts == 1
+    # Not retried straight away
+    assert await gw.generate(PROMPT, key=('recs',), fallback="again") == "again"
+    assert gw._backend.calls == 1
+
+
+async def test_unparseable_answer_returns_the_fallback():
+    gw = gateway()
+
+    answer = await gw.generate("Summarize in bullet points", parse=json.loads, fallback=[])
+
+    assert answer == []
+    assert gw.parse_failures == 1
+
+
+async def test_upstream_calls_are_bounded_by_the_semaphore():
+    gw = gateway(delay_ms=30, max_concurrency=3)
+
+    answers = await asyncio.gather(*[gw.generate(f"{PROMPT} #{i}") for i in range(12)])
+
+    assert all(answers)
+    assert gw._backend.calls == 12
+    assert gw._backend.max_concurrent == 3
+
+
+async def test_waiting_for_a_slot_counts_against_the_timeout():
+    gw = gateway(delay_ms=200, max_concurrency=1, timeout=0.3)
+
+    answers = await asyncio.gather(*[gw.generate(f"{PROMPT} #{i}", fallback="fallback") for i in range(3)])
+
+    assert answers[0] != "fallback"
+    assert answers.count("fallback") == 2
+    assert gw.timeouts == 2
+
+
+async def test_stub_is_selected_by_environment(monkeypatch):
+    monkeypatch.setenv('GEMINI_STUB', 'true')
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    gw = GeminiGateway()
+
+    assert gw.enabled
+    assert json.loads(await gw.generate(PROMPT))[0]['priority'] == 'high'
+    assert isinstance(gw._backend, StubBackend)
+
+
+async def test_disabled_gateway_returns_the_fallback(monkeypatch):
+    monkeypatch.delenv('GEMINI_STUB', raising=False)
+    monkeypatch.delenv('GEMINI_API_KEY', raising=False)
+    gw = GeminiGateway()
+
+    assert await gw.generate(PROMPT, fallback="offline") == "offline"
+    assert gw.upstream_calls == 0
@@ -0,0 +1,75 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+from ml_models.inference_scheduler import MicroBatcher
+
+pytestmark = pytest.mark.anyio
+
+calls = []
+
+
+def doubled(X, key=None):
+    calls.append((len(X), key))
+    return X * 2, key
+
+
+def failing(X, key=None):
+    raise RuntimeError("booster exploded")
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+def rows(*values) -> np.ndarray:
+    return np.array([[value] for value in values], dtype=np.float32)
+
+
+async def test_rows_are_batched_per_key():
+    batcher = MicroBatcher('test', doubled, window_ms=20)
+
+    results = await asyncio.gather(
+        batcher.submit(rows(1), key='v1'),
+        batcher.submit(rows(2, 3), key='v2'),
+        batcher.submit(rows(4), key='v1'),
+    )
+
+    assert sorted(calls) == [(2, 'v1'), (2, 'v2')]
+    assert [key for _, key in results] == ['v1', 'v2', 'v1']
+    assert batcher.stats()['batches'] == 2 and batcher.stats()['rows'] == 4
+
+
+async def test_each_caller_gets_its_own_rows_in_order():
+    batcher = MicroBatcher('test', doubled, window_ms=20)
+
+    results = await asyncio.gather(*(batcher.submit(rows(*range(i, i + 3))) for i in range(0, 12, 3)))
+
+    assert calls == [(12, None)]
+    for i, (doubled_rows, key) in enumerate(results):
+        np.testing.assert_array_equal(doubled_rows, rows(*range(3 * i, 3 * i + 3)) * 2)
+        assert key is None
+
+
+async def test_a_failed_batch_fails_every_caller():
+    batcher = MicroBatcher('test', failing, window_ms=20)
+
+    results = await asyncio.gather(*(batcher.submit(rows(i)) for i in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_a_cancelled_caller_does_not_break_the_batch():
+    batcher = MicroBatcher('test', doubled, window_ms=20)
+    cancelled = asyncio.ensure_future(batcher.submit(rows(1)))
+    kept = asyncio.ensure_future(batcher.submit(rows(2)))
+    await asyncio.sleep(0)
+
+    cancelled.cancel()
+    doubled_rows, _ = await kept
+
+    np.testing.assert_array_equal(doubled_rows, rows(4))
+    assert cancelled.cancelled()
+    assert calls == [(2, None)]
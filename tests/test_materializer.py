@@ -0,0 +1,75 @@
+import asyncio
+
+import pytest
+
+from utils.materializer import Materializer
+
+pytestmark = pytest.mark.anyio
+
+
+def view(*results):
+    """Render function answering `results` in turn, counting its calls"""
+    calls = []
+
+    async def render():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return results[min(len(calls), len(results)) - 1]
+
+    return render, calls
+
+
+async def test_final_body_is_kept_for_the_generation():
+    generation = [1]
+    materializer = Materializer(lambda: generation[0])
+    render, calls = view((b"one", True), (b"two", True))
+    materializer.register("insights", render)
+
+    assert await materializer.get("insights") == b"one"
+    assert await materializer.get("insights") == b"one"
+    assert len(calls) == 1
+
+    generation[0] = 2
+    assert await materializer.get("insights") == b"two"
+    assert materializer.stats()['views']['insights']['final'] is True
+
+
+async def test_fallback_body_is_rendered_again_after_the_retry_delay():
+    materializer = Materializer(lambda: 1)
+    materializer.retry_after = 0.05
+    render, calls = view((b"fallback", False), (b"gemini", True))
+    materializer.register("insights", render)
+
+    assert await materializer.get("insights") == b"fallback"
+    assert await materializer.get("insights") == b"fallback"
+    assert len(calls) == 1
+    assert materializer.stats()['views']['insights']['final'] is False
+
+    await asyncio.sleep(0.06)
+    assert await materializer.get("insights") == b"gemini"
+    assert len(calls) == 2
+    assert materializer.stats()['provisional'] == 1
+    assert materializer.stats()['views']['insights']['final'] is True
+
+
+async def test_concurrent_misses_render_once():
+    materializer = Materializer(lambda: 1)
+    render, calls = view((b"body", True))
+    materializer.register("insights", render)
+
+    bodies = await asyncio.gather(*(materializer.get("insights") for _ in range(4)))
+
+    assert bodies == [b"body"] * 4
+    assert len(calls) == 1
+    assert materializer.stats()['coalesced'] == 3
+
+
+async def test_server_views_regenerate_with_the_feature_hour(server, monkeypatch):
+    hour = [(2024, 11, 4, 9)]
+    monkeypatch.setattr(server, 'feature_hour', lambda: hour[0])
+    before = server.materialized_generation()
+
+    hour[0] = (2024, 11, 4, 10)
+
+    assert server.materialized_generation() != before
+    assert server.materializer.generation is server.materialized_generation
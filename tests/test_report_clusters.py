@@ -0,0 +1,74 @@
+from collections import Counter
+
+import pytest
+from sqlalchemy import create_engine, text
+
+import utils.report_clusters as report_clusters
+from database import Base
+from utils.report_clusters import install_sqlite_clusters, status_key, CLUSTER_TABLE, CLUSTER_MIN_ZOOM
+
+STATUSES = ['pending', 'completed', 'in_progress', None, '', 'Pending', 'in progress', 'x' * 33, 'statüs', 'a' * 32]
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/clusters.db")
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    engine.dispose()
+
+
+def add_reports(engine, statuses, first: int = 0):
+    with engine.begin() as conn:
+        for i, status in enumerate(statuses, start=first):
+            conn.execute(text(
+                "INSERT INTO pollution_reports (report_id, name, mobile, email, location, latitude, longitude, "
+                "severity, status) VALUES (:id, 'n', 'm', 'e', 'l', 28.6, 77.2, 3, :status)"),
+                {"id": f"report-{i}", "status": status})
+
+
+def status_counts(engine) -> Counter:
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            f"SELECT status, SUM(count) FROM {CLUSTER_TABLE}_status WHERE z = :z GROUP BY status"),
+            {"z": CLUSTER_MIN_ZOOM})
+        return Counter({status: count for status, count in rows if count})
+
+
+def expected(statuses) -> Counter:
+    return Counter(status_key(status) for status in statuses)
+
+
+def test_triggers_normalize_status_like_status_key(engine):
+    install_sqlite_clusters(engine)
+    add_reports(engine, STATUSES)
+
+    assert status_counts(engine) == expected(STATUSES)
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE pollution_reports SET status = 'Completed!' WHERE status = 'pending'"))
+        conn.execute(text("UPDATE pollution_reports SET status = 'completed' WHERE status = 'in progress'"))
+    updated = ['Completed!' if s == 'pending' else 'completed' if s == 'in progress' else s for s in STATUSES]
+    assert status_counts(engine) == expected(updated)
+
+
+def test_backfill_normalizes_status_like_status_key(engine):
+    add_reports(engine, STATUSES)
+    install_sqlite_clusters(engine)
+
+    assert status_counts(engine) == expected(STATUSES)
+
+
+def test_stale_triggers_are_replaced_and_recounted(engine, monkeypatch):
+    # Counters installed before statuses were normalized
+    with monkeypatch.context() as patch:
+        patch.setattr(report_clusters, '_status_sql', lambda column: f"COALESCE({column}, 'other')")
+        install_sqlite_clusters(engine)
+        add_reports(engine, STATUSES)
+    assert status_counts(engine)['Pending'] == 1
+
+    install_sqlite_clusters(engine)
+    assert status_counts(engine) == expected(STATUSES)
+
+    add_reports(engine, ['NEW'], first=len(STATUSES))
+    assert status_counts(engine) == expected(STATUSES + ['NEW'])
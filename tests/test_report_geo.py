@@ -0,0 +1,51 @@
+import pytest
+
+from utils.report_geo import parse_bbox, parse_polygon, dense_cap
+
+
+def test_polygon_is_closed():
+    ring = parse_polygon("77.1,28.5;77.3,28.5;77.3,28.7")
+    assert ring == [[77.1, 28.5], [77.3, 28.5], [77.3, 28.7], [77.1, 28.5]]
+    assert parse_polygon("77.1,28.5;77.3,28.5;77.3,28.7;77.1,28.5") == ring
+
+
+def test_concave_polygon_is_accepted():
+    # An L shape: concave, but no edges cross
+    assert len(parse_polygon("0,0;2,0;2,1;1,1;1,2;0,2")) == 7
+
+
+@pytest.mark.parametrize("value", [
+    "181,28.5;77.3,28.5;77.3,28.7",
+    "77.1,-90.5;77.3,28.5;77.3,28.7",
+    "77.1,28.5;77.3,91;77.3,28.7",
+])
+def test_polygon_out_of_range(value):
+    with pytest.raises(ValueError, match="out of range"):
+        parse_polygon(value)
+
+
+@pytest.mark.parametrize("value", [
+    "0,0;2,2;2,0;0,2",              # bow tie
+    "0,0;4,0;4,4;2,0;0,4",          # vertex touching another edge
+    "0,0;4,0;4,2;2,0;1,0;0,2",      # edge doubling back along another
+])
+def test_self_intersecting_polygon(value):
+    with pytest.raises(ValueError, match="cross"):
+        parse_polygon(value)
+
+
+@pytest.mark.parametrize("value", ["77.1,28.5;77.3,28.5", "77.1,28.5;77.3", "a,b;c,d;e,f"])
+def test_malformed_polygon(value):
+    with pytest.raises(ValueError):
+        parse_polygon(value)
+
+
+def test_bbox_out_of_range():
+    with pytest.raises(ValueError):
+        parse_bbox("77.3,28.5,77.1,28.7")
+    assert parse_bbox("77.1,28.5,77.3,28.7") == (77.1, 28.5, 77.3, 28.7)
+
+
+def test_dense_cap_is_the_crossover():
+    assert dense_cap(100, 1_000_000) == 10_001
+    assert dense_cap(100, 0) == 1
@@ -0,0 +1,75 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def area_query(server, monkeypatch):
+    """find_reports_in_area with the area holding `matches` of `total` reports; returns the hint it chose"""
+    collection = type(server.db.pollution_reports)
+    chosen = []
+
+    async def run(matches: int, total: int, status=None):
+        async def estimated_document_count(self, **options):
+            return total
+
+        async def count_documents(self, query, limit=0, **options):
+            assert 'hint' not in options
+            return min(matches, limit)
+
+        async def find_reports_page(query, response, limit, after, hint=None):
+            chosen.append(hint)
+            return []
+
+        monkeypatch.setattr(collection, 'estimated_document_count', estimated_document_count)
+        monkeypatch.setattr(collection, 'count_documents', count_documents)
+        monkeypatch.setattr(server, 'find_reports_page', find_reports_page)
+        await server.find_reports_in_area({"geo": {}}, status, server.Response(), 100, None)
+        return chosen[-1]
+
+    return run
+
+
+async def test_area_queries_hint_only_indexes_that_exist(server, area_query, monkeypatch):
+    monkeypatch.setattr(server, 'report_indexes_ready', set())
+    assert await area_query(matches=10, total=1_000_000) is None
+    assert await area_query(matches=50_000, total=1_000_000) is None
+
+
+async def test_area_queries_pick_the_index_by_density(server, area_query, monkeypatch):
+    monkeypatch.setattr(server, 'report_indexes_ready', {options['name'] for _, options in server.REPORT_INDEXES})
+    assert await area_query(matches=10, total=1_000_000) == "geo_created_at_id"
+    assert await area_query(matches=50_000, total=1_000_000) == "created_at_id"
+    assert await area_query(matches=50_000, total=1_000_000, status='pending') == "status_created_at_id"
+
+
+async def test_created_indexes_are_recorded(server, monkeypatch):
+    monkeypatch.setattr(server, 'report_indexes_ready', set())
+    collection = type(server.db.pollution_reports)
+
+    async def create_index(self, keys, **options):
+        return options['name']
+
+    monkeypatch.setattr(collection, 'create_index', create_index)
+    await server.ensure_report_indexes()
+
+    assert server.report_indexes_ready == {options['name'] for _, options in server.REPORT_INDEXES}
+
+
+async def test_a_failing_index_does_not_stop_the_others(server, monkeypatch):
+    monkeypatch.setattr(server, 'report_indexes_ready', set())
+    collection = type(server.db.pollution_reports)
+    created = []
+
+    async def create_index(self, keys, **options):
+        if options['name'] == 'id_unique':
+            raise Exception("E11000 duplicate key error")
+        created.append((self.name, options['name']))
+        return options['name']
+
+    monkeypatch.setattr(collection, 'create_index', create_index)
+    await server.ensure_report_indexes()
+
+    names = {options['name'] for _, options in server.REPORT_INDEXES}
+    assert server.report_indexes_ready == names - {'id_unique'}
+    assert ('report_clusters', server.CLUSTER_INDEX[1]['name']) in created
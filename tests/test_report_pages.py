@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import Response
+
+pytestmark = pytest.mark.anyio
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+async def insert_reports(server, created: list) -> None:
+    await server.db.pollution_reports.insert_many([
+        {"id": f"r{i:02d}", "status": "new", "created_at": created_at, "name": "Reporter",
+         "mobile": "9876543210", "email": "reporter@example.org", "location": "Delhi",
+         "latitude": 28.61, "longitude": 77.21, "severity": 3}
+        for i, created_at in enumerate(created)
+    ])
+
+
+async def all_pages(server, limit: int) -> list:
+    """Report ids of every page of GET /reports, following X-Next-Cursor"""
+    ids, after = [], None
+    while True:
+        response = Response()
+        page = await server.get_reports(response, limit=limit, after=after)
+        ids.extend(report['id'] for report in page)
+        after = response.headers.get('X-Next-Cursor')
+        if not after:
+            return ids
+
+
+async def test_pages_run_past_reports_with_string_dates(server):
+    # r00-r02 predate the date migration and still hold isoformat() strings
+    created = [(START + timedelta(hours=i)).isoformat() for i in range(3)]
+    created += [START + timedelta(hours=i) for i in range(3, 7)]
+    await insert_reports(server, created)
+
+    ids = await all_pages(server, limit=2)
+
+    assert ids == ['r06', 'r05', 'r04', 'r03', 'r02', 'r01', 'r00']
+
+
+async def test_cursor_round_trips_the_last_report(server):
+    report = {"id": "r07", "created_at": START}
+    cursor = server.encode_report_cursor(report)
+
+    assert server.report_cursor_filter(cursor) == {"$or": [
+        {"created_at": {"$lt": START}},
+        {"created_at": START, "id": {"$lt": "r07"}},
+        {"created_at": {"$type": "string"}}
+    ]}
+
+
+async def test_equal_dates_page_by_id(server):
+    await insert_reports(server, [START] * 5)
+
+    assert await all_pages(server, limit=2) == ['r04', 'r03', 'r02', 'r01', 'r00']
+
+
+async def test_next_cursor_only_when_more_reports_follow(server):
+    await insert_reports(server, [START + timedelta(hours=i) for i in range(4)])
+
+    full, last = Response(), Response()
+    await server.get_reports(full, limit=2)
+    page = await server.get_reports(last, limit=2, after=full.headers['X-Next-Cursor'])
+
+    assert [report['id'] for report in page] == ['r01', 'r00']
+    assert 'X-Next-Cursor' not in last.headers
+    exact = Response()
+    await server.get_reports(exact, limit=4)
+    assert 'X-Next-Cursor' not in exact.headers
+
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "WzEsMiwzXQ", "WyJ4IiwicjEiXQ"])
+async def test_invalid_cursor_is_400(server, cursor):
+    with pytest.raises(server.HTTPException) as error:
+        await server.get_reports(Response(), limit=2, after=cursor)
+    assert error.value.status_code == 400
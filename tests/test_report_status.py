@@ -0,0 +1,114 @@
+from collections import Counter
+
+import pytest
+from pymongo.errors import BulkWriteError
+
+from utils.email_outbox import email_outbox
+from utils.report_clusters import CLUSTER_MIN_ZOOM, status_key
+
+pytestmark = pytest.mark.anyio
+
+
+async def add_report(server, name: str = 'Reporter', latitude: float = 28.61, longitude: float = 77.21) -> str:
+    report = await server.create_report(server.PollutionReportCreate(
+        name=name, mobile='9876543210', email=f'{name.lower()}@example.org', location='Delhi',
+        latitude=latitude, longitude=longitude, severity=3))
+    return report.id
+
+
+async def counted_statuses(server) -> Counter:
+    """Status counts at one cluster level, as /reports/clusters would report them"""
+    counts = Counter()
+    async for cell in server.db.report_clusters.find({"z": CLUSTER_MIN_ZOOM}):
+        counts.update({status: count for status, count in cell.get('status', {}).items() if count})
+    return counts
+
+
+async def stored_statuses(server) -> Counter:
+    return Counter([status_key(report['status']) async for report in server.db.pollution_reports.find()])
+
+
+async def test_single_update_counts_the_status_it_replaced(server):
+    report_id = await add_report(server)
+
+    await server.update_report_status(report_id, server.StatusUpdate(status='viewed'))
+    await server.update_report_status(report_id, server.StatusUpdate(status='completed'))
+
+    assert await stored_statuses(server) == Counter(completed=1)
+    assert await counted_statuses(server) == Counter(completed=1)
+
+
+async def test_single_update_of_a_missing_report_is_404(server):
+    with pytest.raises(server.HTTPException) as error:
+        await server.update_report_status('missing', server.StatusUpdate(status='viewed'))
+    assert error.value.status_code == 404
+
+
+async def test_bulk_update_skips_reports_changed_since_they_were_read(server, monkeypatch):
+    ids = [await add_report(server, f'Reporter{i}') for i in range(3)]
+    collection = type(server.db.pollution_reports)
+    bulk_write = collection.bulk_write
+
+    async def racing_bulk_write(self, operations, **options):
+        if self.name == 'pollution_reports':
+            # Another admin moves the first report on between the bulk read and its write
+            await server.update_report_status(ids[0], server.StatusUpdate(status='processing'))
+        return await bulk_write(self, operations, **options)
+
+    # Collections are fresh wrappers on every attribute access, so patch their class
+    monkeypatch.setattr(collection, 'bulk_write', racing_bulk_write)
+    response = await server.update_reports_status(server.BulkStatusUpdate(ids=ids, status='completed'))
+
+    results = {result.id: result for result in response.results}
+    assert results[ids[0]].result == 'failed' and 'concurrently' in results[ids[0]].error
+    assert [results[report_id].result for report_id in ids[1:]] == ['updated', 'updated']
+    assert (response.updated, response.failed) == (2, 1)
+    assert await stored_statuses(server) == Counter(processing=1, completed=2)
+    assert await counted_statuses(server) == await stored_statuses(server)
+
+
+async def test_bulk_update_reports_each_id_once_in_request_order(server):
+    ids = [await add_report(server, f'Reporter{i}') for i in range(3)]
+    await server.update_report_status(ids[1], server.StatusUpdate(status='completed'))
+
+    response = await server.update_reports_status(server.BulkStatusUpdate(
+        ids=[ids[0], 'missing', ids[1], ids[0], ids[2]], status='completed'))
+
+    assert [(result.id, result.result) for result in response.results] == [
+        (ids[0], 'updated'), ('missing', 'not_found'), (ids[1], 'unchanged'), (ids[2], 'updated')]
+    assert (response.updated, response.unchanged, response.not_found, response.failed) == (2, 1, 1, 0)
+    assert await counted_statuses(server) == Counter(completed=3)
+
+
+async def test_bulk_update_maps_write_errors_to_failed(server, monkeypatch):
+    ids = [await add_report(server, f'Reporter{i}') for i in range(2)]
+    collection = type(server.db.pollution_reports)
+    bulk_write = collection.bulk_write
+
+    async def partly_failing_bulk_write(self, operations, **options):
+        if self.name != 'pollution_reports':
+            return await bulk_write(self, operations, **options)
+        result = await bulk_write(self, operations[1:], **options)
+        raise BulkWriteError({"writeErrors": [{"index": 0, "errmsg": "disk full"}],
+                              "nMatched": result.matched_count})
+
+    monkeypatch.setattr(collection, 'bulk_write', partly_failing_bulk_write)
+    response = await server.update_reports_status(server.BulkStatusUpdate(ids=ids, status='viewed'))
+
+    assert [(result.result, result.error) for result in response.results] == [('failed', 'disk full'), ('updated', None)]
+    assert await stored_statuses(server) == await counted_statuses(server) == Counter(viewed=1, pending=1)
+
+
+async def test_bulk_update_notifies_updated_reporters_in_one_batch(server, monkeypatch):
+    ids = [await add_report(server, f'Reporter{i}') for i in range(3)]
+    await server.update_report_status(ids[2], server.StatusUpdate(status='completed'))
+    batches = []
+
+    async def enqueue_many(messages):
+        batches.append([to_email for to_email, _, _ in messages])
+        return len(messages)
+
+    monkeypatch.setattr(email_outbox, 'enqueue_many', enqueue_many)
+    await server.update_reports_status(server.BulkStatusUpdate(ids=ids, status='completed'))
+
+    assert batches == [['reporter0@example.org', 'reporter1@example.org']]
@@ -0,0 +1,115 @@
+import asyncio
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from utils.aqi_raster import AQIRaster
+from utils.road_graph import build_graph, save_graph, synthetic_grid
+from utils.route_planner import RoutePlanner, DETOUR_MIN_SAMPLES
+
+pytestmark = pytest.mark.anyio
+
+# A few km of Connaught Place: a ~40 x 40 street grid
+BOUNDS = (77.19, 28.60, 77.24, 28.64)
+
+
+@pytest.fixture(scope="module")
+def graph_dir(tmp_path_factory):
+    directory = tmp_path_factory.mktemp("road_graph")
+    save_graph(directory, build_graph(**synthetic_grid(BOUNDS)), "synthetic:test")
+    return directory
+
+
+@pytest.fixture
+def planner(graph_dir, monkeypatch):
+    monkeypatch.setenv('ROAD_GRAPH_DIR', str(graph_dir))
+    planner = RoutePlanner()
+    assert planner.load()
+    return planner
+
+
+def raster() -> AQIRaster:
+    values = np.linspace(80, 300, 32 * 32, dtype=np.float32).reshape(32, 32)
+    return AQIRaster(1, BOUNDS, values, 10, datetime.now(timezone.utc), 0.0, "test")
+
+
+def random_pairs(count: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    min_lng, min_lat, max_lng, max_lat = BOUNDS
+    return [((rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng)),
+             (rng.uniform(min_lat, max_lat), rng.uniform(min_lng, max_lng))) for _ in range(count)]
+
+
+async def test_concurrent_plans_share_the_detour_estimate(planner):
+    current = raster()
+
+    results = await asyncio.gather(*(planner.plan(current, a, b) for a, b in random_pairs(DETOUR_MIN_SAMPLES * 2)))
+
+    assert all(result is not None for result in results)
+    assert all(result["cleanest"]["route_points"] and result["fastest"]["route_points"] for result in results)
+    assert planner.plans == DETOUR_MIN_SAMPLES * 2 and planner.failures == 0
+    assert planner.search_detour() != planner.detour
+    assert planner.stats()['search_detour'] >= 1.0
+
+
+def test_detour_estimate_is_safe_to_read_while_plans_record(planner):
+    stop = threading.Event()
+    errors = []
+
+    def record():
+        rng = np.random.default_rng(1)
+        while not stop.is_set():
+            with planner._detours_lock:
+                planner._detours.append(float(rng.uniform(1.0, 2.0)))
+
+    writers = [threading.Thread(target=record) for _ in range(2)]
+    for writer in writers:
+        writer.start()
+    try:
+        for _ in range(2000):
+            try:
+                planner.search_detour()
+            except RuntimeError as e:
+                errors.append(e)
+    finally:
+        stop.set()
+        for writer in writers:
+            writer.join()
+
+    assert errors == []
+    assert 1.0 <= planner.search_detour() <= 2.0 * 1.05
+
+
+async def test_straight_line_is_scored_without_a_road_graph(tmp_path, monkeypatch):
+    monkeypatch.setenv('ROAD_GRAPH_DIR', str(tmp_path))
+    planner = RoutePlanner()
+    assert not planner.load() and not planner.ready
+
+    result = await planner.straight(raster(), (28.61, 77.20), (28.63, 77.23))
+
+    route = result["cleanest"]
+    assert result["fastest"] is route
+    assert route["route_points"][0] == {"lat": 28.61, "lng": 77.2, "aqi": route["route_points"][0]["aqi"]}
+    assert route["route_points"][-1]["lat"] == 28.63 and route["route_points"][-1]["lng"] == 77.23
+    assert len(route["route_points"]) > 3 and 80 <= route["avg_aqi"] <= route["max_aqi"] <= 300
+    assert 3 < route["distance_km"] < 4
+    assert planner.stats()['straight_plans'] == 1
+
+
+async def test_safe_route_falls_back_to_the_straight_line(server, tmp_path, monkeypatch):
+    monkeypatch.setenv('ROAD_GRAPH_DIR', str(tmp_path))
+    monkeypatch.setattr(server, 'route_planner', RoutePlanner())
+    current = raster()
+
+    async def current_raster():
+        return current
+
+    monkeypatch.setattr(server, 'current_raster', current_raster)
+    response = await server.calculate_safe_route(server.SafeRouteRequest(
+        start_lat=28.61, start_lng=77.20, end_lat=28.63, end_lng=77.23))
+
+    assert response.road_graph is False
+    assert response.route_points == response.cleanest.route_points
+    assert "fastest route" not in response.recommendation
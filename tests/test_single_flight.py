@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from utils.single_flight import SingleFlight
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_a_cancelled_caller_leaves_the_work_to_the_others():
+    flight, runs = SingleFlight(), []
+
+    async def work():
+        runs.append(1)
+        await asyncio.sleep(0.01)
+        return 'done'
+
+    leaving = asyncio.ensure_future(flight.run('key', work))
+    staying = asyncio.ensure_future(flight.run('key', work))
+    await asyncio.sleep(0)
+    leaving.cancel()
+
+    assert await staying == 'done'
+    assert leaving.cancelled() and len(runs) == 1 and flight.coalesced == 1
+    assert len(flight) == 0
+
+
+async def test_a_failed_run_is_shared_then_released():
+    flight = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0)
+        raise RuntimeError("upstream down")
+
+    results = await asyncio.gather(*(flight.run('key', failing) for _ in range(3)), return_exceptions=True)
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert len(flight) == 0
+
+    async def working():
+        return 'back'
+
+    assert await flight.run('key', working) == 'back'
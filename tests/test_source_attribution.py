@@ -0,0 +1,36 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from ml_models.source_attribution import AttributionModel, ATTRIBUTION_FEATURES
+
+
+@pytest.mark.parametrize("named", [True, False])
+def test_predict_emits_no_feature_name_warning(named):
+    rng = np.random.default_rng(0)
+    # Named: trained with its columns in a different order than prepare_input produces them.
+    # Unnamed: trained as a plain array in ATTRIBUTION_FEATURES order.
+    columns = list(ATTRIBUTION_FEATURES)[::-1] if named else list(ATTRIBUTION_FEATURES)
+    X = pd.DataFrame(rng.random((40, len(columns))), columns=columns)
+    y = X[['PM2.5', 'NO2', 'CO']].to_numpy() * [1.0, 2.0, 3.0]
+    model = AttributionModel(LinearRegression().fit(X if named else X.to_numpy(), y), "test")
+
+    row = model.layout.allocate(1)
+    row[0, model.dst] = X.iloc[0][list(ATTRIBUTION_FEATURES)].to_numpy()[model.src]
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        model.warm()
+        pred = model.predict(row)
+
+    assert pred[0] == pytest.approx(y[0])
+
+
+def test_column_index_is_built_once_at_load():
+    X = pd.DataFrame(np.random.default_rng(1).random((20, len(ATTRIBUTION_FEATURES))), columns=list(ATTRIBUTION_FEATURES))
+    model = AttributionModel(LinearRegression().fit(X, X[['PM2.5']].to_numpy()), "test")
+
+    assert isinstance(model.columns, pd.Index) and list(model.columns) == list(ATTRIBUTION_FEATURES)
+    assert model.layout.names == list(ATTRIBUTION_FEATURES)
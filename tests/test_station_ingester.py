@@ -0,0 +1,146 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+from database import SessionLocal, AQIStationDB
+from utils.waqi_client import waqi_client
+from utils.waqi_stub import LocalWAQIServer, PAYLOADS
+from utils.station_ingester import StationIngester
+
+pytestmark = pytest.mark.anyio
+
+with open(PAYLOADS) as f:
+    RECORDED = json.load(f)
+STATIONS = len(RECORDED['bounds'])
+
+
+@pytest.fixture
+async def waqi(monkeypatch):
+    """Starts a local WAQI stand-in on a free port and points the shared client at it"""
+    servers = []
+
+    async def start(**options):
+        server = await LocalWAQIServer(port=0, **options).start()
+        servers.append(server)
+        monkeypatch.setattr(waqi_client, 'base_url', server.base_url)
+        return server
+
+    waqi_client.invalidate()
+    yield start
+    for server in servers:
+        await server.stop()
+    await waqi_client.close()
+    waqi_client.invalidate()
+
+
+@pytest.fixture
+def ingester():
+    session = SessionLocal()
+    session.query(AQIStationDB).delete()
+    session.commit()
+    session.close()
+    return StationIngester()
+
+
+def mirrored():
+    session = SessionLocal()
+    try:
+        return {row.uid: row for row in session.query(AQIStationDB).all()}
+    finally:
+        session.close()
+
+
+async def test_lists_stations_with_one_bounds_call(waqi, ingester):
+    stub = await waqi()
+
+    table = await ingester.refresh()
+
+    assert stub.requests['bounds'] == 1
+    assert stub.requests['station'] == STATIONS
+    assert len(table) == STATIONS
+    assert sorted(table.uid.tolist()) == sorted(station['uid'] for station in RECORDED['bounds'])
+    assert ingester.current is table
+
+
+async def test_detail_fan_out_is_bounded_by_the_semaphore(waqi, ingester):
+    stub = await waqi(delay_ms=20)
+    ingester.concurrency = 4
+
+    table = await ingester.refresh()
+
+    assert len(table) == STATIONS
+    assert stub.requests['station'] == STATIONS
+    assert stub.max_concurrent == 4
+
+
+async def test_failed_station_feeds_keep_the_listing_reading(waqi, ingester):
+    failing = [station['uid'] for station in RECORDED['bounds'][:3]]
+    stub = await waqi(fail_uids=failing)
+
+    table = await ingester.refresh()
+
+    assert len(table) == STATIONS
+    unrecorded = [station for station in RECORDED['bounds'] if str(station['uid']) not in RECORDED['feeds']]
+    assert ingester.detail_failures == len(failing) + len(unrecorded)
+    for uid in failing:
+        row = table.uid.tolist().index(uid)
+        listing = next(station for station in RECORDED['bounds'] if station['uid'] == uid)
+        assert table.feeds[row] is None
+        assert table.aqi[row] == pytest.approx(float(listing['aqi']))
+        assert math.isnan(table.pollutants['pm25'][row])
+    healthy = table.uid.tolist().index(RECORDED['bounds'][3]['uid'])
+    assert table.feeds[healthy] is not None
+    assert stub.requests['bounds'] == 1
+
+
+async def test_failed_listing_keeps_the_previous_table(waqi, ingester):
+    await waqi()
+    table = await ingester.refresh()
+    await waqi(fail_rate=1.0)
+
+    assert await ingester.refresh() is table
+    assert ingester.failures == 1
+
+
+async def test_table_is_mirrored_to_sqlite(waqi, ingester, tmp_path):
+    await waqi()
+    table = await ingester.refresh()
+
+    rows = mirrored()
+    assert sorted(rows) == sorted(table.uid.tolist())
+    first = table.uid.tolist().index(RECORDED['bounds'][0]['uid'])
+    stored = rows[int(table.uid[first])]
+    assert stored.name == table.names[first]
+    assert stored.aqi == pytest.approx(float(table.aqi[first]))
+    assert stored.pm25 == pytest.approx(float(table.pollutants['pm25'][first]))
+    assert json.loads(stored.payload) == table.feeds[first]
+    assert stored.version == table.version
+
+    # Stations that drop out of the listing are dropped from the mirror
+    shrunk = dict(RECORDED, bounds=RECORDED['bounds'][1:])
+    payloads = tmp_path / 'payloads.json'
+    payloads.write_text(json.dumps(shrunk))
+    await waqi(payloads=payloads)
+    await ingester.refresh()
+    assert RECORDED['bounds'][0]['uid'] not in mirrored()
+    assert len(mirrored()) == STATIONS - 1
+
+    restored = StationIngester()
+    await restored.start()
+    assert restored.current.source == "persisted"
+    assert len(restored.current) == STATIONS - 1
+    assert np.allclose(np.sort(restored.current.aqi), np.sort(ingester.current.aqi), equal_nan=True)
+
+
+async def test_nearest_feed(waqi, ingester):
+    await waqi()
+    await ingester.refresh()
+    station = RECORDED['bounds'][0]
+
+    feed = ingester.nearest_feed(station['lat'] + 0.001, station['lon'] - 0.001)
+
+    assert feed['idx'] == station['uid']
+    assert ingester.nearest_feed(10.0, 10.0) is None
+    assert StationIngester().nearest_feed(station['lat'], station['lon']) is None
@@ -0,0 +1,26 @@
+import asyncio
+
+from utils.waqi_client import WAQIClient
+
+
+def test_a_new_event_loop_closes_the_previous_session():
+    client = WAQIClient(token='test-token')
+
+    first = asyncio.run(client._get_session())
+    second = asyncio.run(client._get_session())
+
+    assert first is not second and first.closed and not second.closed
+    assert client.stats()['sessions_discarded'] == 1
+    asyncio.run(client.close())
+
+
+def test_the_same_loop_keeps_its_session():
+    client = WAQIClient(token='test-token')
+
+    async def twice():
+        return await client._get_session(), await client._get_session()
+
+    first, second = asyncio.run(twice())
+
+    assert first is second and client.sessions_discarded == 0
+    asyncio.run(client.close())